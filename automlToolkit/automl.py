@@ -10,6 +10,8 @@ from automlToolkit.components.utils.constants import CLS_TASKS, REG_TASKS
 from automlToolkit.components.ensemble import EnsembleBuilder, ensemble_list
 from automlToolkit.components.feature_engineering.transformation_graph import DataNode
 from automlToolkit.components.evaluators.base_evaluator import fetch_predict_estimator
+from automlToolkit.components.evaluators.prediction_store import PredictionStore
+from automlToolkit.components.meta_learning.run_archive import RunArchive, get_solver_record
 
 # TODO: this default value should be updated.
 classification_algorithms = ['liblinear_svc', 'random_forest', 'lightgbm']
@@ -29,8 +31,17 @@ class AutoML(object):
                  random_state=1,
                  n_jobs=1,
                  evaluation='holdout',
-                 output_dir="./"):
+                 output_dir="./",
+                 archive_dir=None,
+                 fe_memory_budget=None):
+        """
+        :param archive_dir: the directory of the archive of the previous runs, which warm-starts the search
+            on the similar datasets and records this run; None disables the archive.
+        :param fe_memory_budget: the budget in MB for the features held by the FE optimizer of each algorithm,
+            the nodes beyond it are spilled to memory-mapped files; None means no limit.
+        """
         self.metric = get_metric(metric)
+        self.metric_name = metric if isinstance(metric, str) else str(metric)
         self.time_limit = time_limit
         self.seed = random_state
         self.ensemble_method = ensemble_method
@@ -40,6 +51,7 @@ class AutoML(object):
         self.output_dir = output_dir
         self.evaluation_type = evaluation
         self.n_jobs = n_jobs
+        self.fe_memory_budget = fe_memory_budget
         self.solvers = dict()
         self.task_type = task_type
         self.es = None
@@ -50,6 +62,8 @@ class AutoML(object):
         self.fe_optimizer = None
         self.stats = None
         self.timestamp = time.time()
+        self.prediction_store = None
+        self.archive = None if archive_dir is None else RunArchive(archive_dir)
 
         if include_algorithms is not None:
             self.include_algorithms = include_algorithms
@@ -110,8 +124,21 @@ class AutoML(object):
         :param train_data:
         :return:
         """
+        if self.ensemble_method is not None:
+            # The ensemble is built from the validation predictions of the trials.
+            self.prediction_store = PredictionStore(self.task_type, output_dir=self.output_dir)
+
+        # Start from the solutions found on the similar datasets in the previous runs.
+        similar_runs = list()
+        if self.archive is not None:
+            similar_runs = self.archive.query(train_data, self.task_type, self.metric_name)
+
         # Initialize each algorithm's solver.
         for _algo in self.include_algorithms:
+            seed_pipelines, seed_configs = None, None
+            if len(similar_runs) > 0:
+                seed_pipelines = self.archive.get_fe_pipelines(similar_runs, _algo)
+                seed_configs = self.archive.get_hpo_configs(similar_runs, _algo)
             self.solvers[_algo] = SecondLayerBandit(self.task_type, _algo, train_data,
                                                     metric=self.metric,
                                                     output_dir=self.output_dir,
@@ -120,7 +147,11 @@ class AutoML(object):
                                                     eval_type=self.evaluation_type,
                                                     dataset_id=dataset_id,
                                                     n_jobs=self.n_jobs,
-                                                    mth='alter_hpo')
+                                                    mth='alter_hpo',
+                                                    prediction_store=self.prediction_store,
+                                                    seed_pipelines=seed_pipelines,
+                                                    seed_configs=seed_configs,
+                                                    fe_memory_budget=self.fe_memory_budget)
 
         # Set the resource limit.
         if self.time_limit is not None:
@@ -153,6 +184,10 @@ class AutoML(object):
         self.fe_optimizer = self.solvers[self.best_algo_id].optimizer['fe']
         self.best_config = self.solvers[self.best_algo_id].inc['hpo']
 
+        if self.archive is not None:
+            records = {algo_id: get_solver_record(self.solvers[algo_id]) for algo_id in self.include_algorithms}
+            self.archive.add_run(train_data, self.task_type, self.metric_name, records)
+
         if self.ensemble_method is not None:
             self.stats = self.fetch_ensemble_members()
             # Ensembling all intermediate/ultimate models found in above optimization process.
@@ -162,12 +197,15 @@ class AutoML(object):
                                       ensemble_size=self.ensemble_size,
                                       task_type=self.task_type,
                                       metric=self.metric,
-                                      output_dir=self.output_dir)
+                                      output_dir=self.output_dir,
+                                      prediction_store=self.prediction_store)
             self.es.fit(data=train_data)
         else:
 
             best_estimator = fetch_predict_estimator(self.task_type, self.best_config, self.best_data_node.data[0],
-                                                     self.best_data_node.data[1])
+                                                     self.best_data_node.data[1],
+                                                     prediction_store=self.prediction_store,
+                                                     data_node=self.best_data_node)
             with open(os.path.join(self.output_dir, '%s-best_model' % str(self.timestamp)), 'wb') as f:
                 pkl.dump(best_estimator, f)
 
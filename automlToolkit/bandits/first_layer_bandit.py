@@ -5,12 +5,15 @@ from scipy.stats import norm
 from typing import List
 from sklearn.metrics import accuracy_score
 from sklearn.model_selection import StratifiedShuffleSplit
-from autosklearn.constants import *
+from automlToolkit.components.utils.constants import BINARY_CLS, MULTICLASS_CLS
 from automlToolkit.components.feature_engineering.transformation_graph import DataNode, TransformationGraph
+from automlToolkit.components.feature_engineering.feature_store import FeatureStore
 from automlToolkit.bandits.second_layer_bandit import SecondLayerBandit
+from automlToolkit.components.evaluators.base_evaluator import fetch_predict_estimator
+from automlToolkit.components.evaluators.prediction_store import get_trial_key
 from automlToolkit.utils.logging_utils import setup_logger, get_logger
 from automlToolkit.components.meta_learning.meta_learning import evaluate_metalearning_configs
-from automlToolkit.utils.metalearning import get_meta_learning_configs
+from automlToolkit.components.meta_learning.meta_index import get_meta_configs
 
 
 class FirstLayerBandit(object):
@@ -43,6 +46,8 @@ class FirstLayerBandit(object):
         self.optimal_algo_id = None
         self.nbest_algo_ids = None
         self.best_lower_bounds = None
+        # The estimator trained by refit for predict.
+        self.refit_cache = None
 
         # Set up backend.
         self.dataset_name = dataset_name
@@ -64,6 +69,8 @@ class FirstLayerBandit(object):
         self.evaluation_cost = dict()
         self.fe_datanodes = dict()
         self.eval_type = eval_type
+        # The global data nodes shared by the sub-bandits of this run.
+        self.feature_store = FeatureStore()
 
         for arm in self.arms:
             self.rewards[arm] = list()
@@ -73,6 +80,7 @@ class FirstLayerBandit(object):
                 arm, self.original_data, output_dir=output_dir,
                 per_run_time_limit=per_run_time_limit,
                 share_fe=self.shared_mode,
+                feature_store=self.feature_store,
                 seed=self.seed,
                 eval_type=eval_type,
                 dataset_id=dataset_name,
@@ -95,18 +103,12 @@ class FirstLayerBandit(object):
         meta_configs = None
         if num_meta_configs is not None and isinstance(num_meta_configs, int) and num_meta_configs > 0:
             try:
-                if len(set(self.original_data.data[1])) == 2:
-                    meta_configs = get_meta_learning_configs(self.original_data.data[0],
-                                                                  self.original_data.data[1],
-                                                                  BINARY_CLASSIFICATION,
-                                                                  metric='accuracy',
-                                                                  num_cfgs=num_meta_configs)
-                else:
-                    meta_configs = get_meta_learning_configs(self.original_data.data[0],
-                                                                  self.original_data.data[1],
-                                                                  MULTICLASS_CLASSIFICATION,
-                                                                  metric='accuracy',
-                                                                  num_cfgs=num_meta_configs)
+                X, y = self.original_data.data
+                task_type = BINARY_CLS if len(set(y)) == 2 else MULTICLASS_CLS
+                meta_configs = get_meta_configs(X, y, task_type, dataset_name=self.dataset_name,
+                                                metric='accuracy', num_cfgs=num_meta_configs)
+                if len(meta_configs) == 0:
+                    meta_configs = None
             except Exception as e:
                 self.logger.info('Meta-configs not found!')
         return meta_configs
@@ -153,7 +155,7 @@ class FirstLayerBandit(object):
 
             data['test_data_list'] = test_data_list
             data['train_data_list'] = train_data_list
-            print(algo_id, len(train_data_list), len(test_data_list))
+            self.logger.debug('%s: %d train nodes, %d test nodes', algo_id, len(train_data_list), len(test_data_list))
 
             configs = hpo_optimizer.configs
             perfs = hpo_optimizer.perfs
@@ -172,27 +174,38 @@ class FirstLayerBandit(object):
             stats[algo_id] = data
         return stats
 
-    def predict(self, test_data: DataNode):
-        best_arm = self.optimal_algo_id
-        sub_bandit = self.sub_bandits[best_arm]
-        fe_optimizer = sub_bandit.optimizer['fe']
+    def get_refit_signature(self):
+        sub_bandit = self.sub_bandits[self.optimal_algo_id]
+        return self.optimal_algo_id, get_trial_key(sub_bandit.inc['fe'], sub_bandit.inc['hpo'])
 
+    def refit(self):
+        """
+        Train the estimator of the optimal arm on its incumbent, and cache it until the incumbent changes.
+        """
+        sub_bandit = self.sub_bandits[self.optimal_algo_id]
+        fe_optimizer = sub_bandit.optimizer['fe']
         train_data_node = sub_bandit.inc['fe']
-        test_data_node = fe_optimizer.apply(test_data, sub_bandit.inc['fe'])
-        config = sub_bandit.inc['hpo']
 
         # Check the validity of feature engineering.
-        _train_data = fe_optimizer.apply(self.original_data, sub_bandit.inc['fe'])
+        _train_data = fe_optimizer.apply(self.original_data, train_data_node)
         assert train_data_node == _train_data
 
+        # Build the ML estimator.
         X_train, y_train = train_data_node.data
+        estimator = fetch_predict_estimator(sub_bandit.task_type, sub_bandit.inc['hpo'], X_train, y_train,
+                                            prediction_store=sub_bandit.prediction_store, data_node=train_data_node)
+        self.refit_cache = {'signature': self.get_refit_signature(), 'estimator': estimator}
+        return self
+
+    def predict(self, test_data: DataNode):
+        if self.refit_cache is None or self.refit_cache['signature'] != self.get_refit_signature():
+            self.refit()
+        sub_bandit = self.sub_bandits[self.optimal_algo_id]
+        test_data_node = sub_bandit.optimizer['fe'].apply(test_data, sub_bandit.inc['fe'])
         X_test, y_test = test_data_node.data
-        self.logger.info('X_train/test shapes: %s, %s' % (str(X_train.shape), str(X_test.shape)))
+        self.logger.info('X_test shape: %s' % str(X_test.shape))
 
-        # Build the ML estimator.
-        from automlToolkit.components.evaluators.cls_evaluator import fetch_predict_estimator
-        estimator = fetch_predict_estimator(config, X_train, y_train)
-        y_pred = estimator.predict(X_test)
+        y_pred = self.refit_cache['estimator'].predict(X_test)
         return y_pred
 
     def score(self, test_data: DataNode, metric_func=None):
@@ -502,6 +515,11 @@ class FirstLayerBandit(object):
                 beam_size = self.sub_bandits[arm_candidate[0]].optimizer['fe'].beam_width
                 # TODO: how to generate the global nodes.
                 global_nodes = TransformationGraph.sort_nodes_by_score(data_nodes)[:beam_size - 1]
+                # Keep one copy of each global node in the feature store, with the arm that produced it.
+                for _arm in arm_candidate:
+                    for node in self.fe_datanodes[_arm]:
+                        if any(node is _node for _node in global_nodes):
+                            self.feature_store.add(node, source=_arm)
                 for _arm in arm_candidate:
                     self.sub_bandits[_arm].sync_global_incumbents(global_nodes)
 
@@ -5,11 +5,15 @@ from sklearn.model_selection import StratifiedShuffleSplit
 from automlToolkit.components.evaluators.cls_evaluator import ClassificationEvaluator
 from automlToolkit.components.evaluators.reg_evaluator import RegressionEvaluator
 from automlToolkit.utils.logging_utils import get_logger
+from automlToolkit.utils.tracing import traced
+from ConfigSpace import Configuration
 from ConfigSpace.hyperparameters import UnParametrizedHyperparameter
 from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.components.feature_engineering.feature_store import FeatureStore
 from automlToolkit.components.fe_optimizers import build_fe_optimizer
 from automlToolkit.components.hpo_optimizer import build_hpo_optimizer
 from automlToolkit.components.evaluators.base_evaluator import fetch_predict_estimator
+from automlToolkit.components.evaluators.prediction_store import get_trial_key
 from automlToolkit.components.utils.constants import *
 from automlToolkit.utils.decorators import time_limit
 from automlToolkit.utils.functions import get_increasing_sequence
@@ -25,7 +29,18 @@ class SecondLayerBandit(object):
                  mth='rb', sw_size=3,
                  n_jobs=1, seed=1,
                  enable_intersection=True,
-                 number_of_unit_resource=2):
+                 number_of_unit_resource=2,
+                 prediction_store=None,
+                 seed_pipelines=None,
+                 seed_configs=None,
+                 fe_memory_budget=None,
+                 feature_store=None):
+        """
+        :param fe_memory_budget: the budget in MB for the features held by the FE optimizer,
+            the nodes beyond it are spilled to memory-mapped files; None means no limit.
+        :param feature_store: the store of the global data nodes shared with the other sub-bandits of a run,
+            a store of its own by default.
+        """
         self.task_type = task_type
         self.metric = metric
         self.number_of_unit_resource = number_of_unit_resource
@@ -41,6 +56,10 @@ class SecondLayerBandit(object):
         self.mth = mth
         self.seed = seed
         self.n_jobs = n_jobs
+        self.fe_memory_budget = fe_memory_budget
+        self.feature_store = FeatureStore() if feature_store is None else feature_store
+        # Keep the validation predictions of the trials for the ensembles.
+        self.prediction_store = prediction_store
         self.sliding_window_size = sw_size
         self.logger = get_logger('%s:%s-%d=>%s' % (
             __class__.__name__, dataset_id, seed, estimator_id))
@@ -66,6 +85,11 @@ class SecondLayerBandit(object):
         self.incumbent_perf = float("-INF")
         self.early_stopped_flag = False
         self.enable_intersection = enable_intersection
+        # The models trained by refit for predict_proba.
+        self.refit_cache = None
+        # The FE pipelines and HPO configurations to start from, e.g., the ones of the previous runs.
+        self.seed_pipelines = list() if seed_pipelines is None else seed_pipelines
+        self.seed_configs = list()
 
         # Fetch hyperparameter space.
         if self.task_type in CLS_TASKS:
@@ -96,31 +120,43 @@ class SecondLayerBandit(object):
         self.config_space = cs
         self.default_config = cs.get_default_configuration()
         self.config_space.seed(self.seed)
+        for config in (list() if seed_configs is None else seed_configs):
+            try:
+                self.seed_configs.append(Configuration(cs, values=config))
+            except Exception as e:
+                # The search space has changed since the configuration was found.
+                self.logger.info('Skip the seed configuration %s: %s' % (str(config), str(e)))
 
         # Build the Feature Engineering component.
         if self.task_type in CLS_TASKS:
             fe_evaluator = ClassificationEvaluator(self.default_config, scorer=self.metric,
                                                    name='fe', resampling_strategy=self.evaluation_type,
-                                                   seed=self.seed)
+                                                   seed=self.seed,
+                                                   prediction_store=self.prediction_store)
             hpo_evaluator = ClassificationEvaluator(self.default_config, scorer=self.metric,
                                                     data_node=self.original_data, name='hpo',
                                                     resampling_strategy=self.evaluation_type,
-                                                    seed=self.seed)
+                                                    seed=self.seed,
+                                                    prediction_store=self.prediction_store)
         elif self.task_type in REG_TASKS:
             fe_evaluator = RegressionEvaluator(self.default_config, scorer=self.metric,
                                                name='fe', resampling_strategy=self.evaluation_type,
-                                               seed=self.seed)
+                                               seed=self.seed,
+                                               prediction_store=self.prediction_store)
             hpo_evaluator = RegressionEvaluator(self.default_config, scorer=self.metric,
                                                 data_node=self.original_data, name='hpo',
                                                 resampling_strategy=self.evaluation_type,
-                                                seed=self.seed)
+                                                seed=self.seed,
+                                                prediction_store=self.prediction_store)
         else:
             raise ValueError('Invalid task type!')
 
         self.optimizer['fe'] = build_fe_optimizer(self.evaluation_type, self.task_type, self.original_data,
                                                   fe_evaluator, estimator_id, per_run_time_limit,
                                                   per_run_mem_limit, self.seed,
-                                                  shared_mode=self.share_fe, n_jobs=n_jobs)
+                                                  shared_mode=self.share_fe, n_jobs=n_jobs,
+                                                  memory_budget=self.fe_memory_budget)
+        self.optimizer['fe'].seed_pipelines = list(self.seed_pipelines)
 
         self.inc['fe'], self.local_inc['fe'] = self.original_data, self.original_data
 
@@ -131,7 +167,8 @@ class SecondLayerBandit(object):
         self.optimizer['hpo'] = build_hpo_optimizer(self.evaluation_type, hpo_evaluator, cs, output_dir=output_dir,
                                                     per_run_time_limit=per_run_time_limit,
                                                     trials_per_iter=trials_per_iter,
-                                                    seed=self.seed, n_jobs=n_jobs)
+                                                    seed=self.seed, n_jobs=n_jobs,
+                                                    initial_configs=self.seed_configs)
 
         self.inc['hpo'], self.local_inc['hpo'] = self.default_config, self.default_config
         self.local_hist['fe'].append(self.original_data)
@@ -145,7 +182,7 @@ class SecondLayerBandit(object):
             self.incumbent_perf = self.optimizer['fe'].baseline_score
             self.final_rewards.append(self.incumbent_perf)
 
-        self.logger.info('After %d-th pulling, results: %s' % (self.pull_cnt, results))
+        self.logger.info('After %d-th pulling, results: %s', self.pull_cnt, results)
 
         score, iter_cost, config = results
         if score is None:
@@ -232,6 +269,7 @@ class SecondLayerBandit(object):
         self.action_sequence.append(_arm)
         self.pull_cnt += 1
 
+    @traced('bandit.evaluate_joint_solution', category='bandit')
     def evaluate_joint_solution(self):
         # Update join incumbent from FE and HPO.
         _perf = None
@@ -241,12 +279,12 @@ class SecondLayerBandit(object):
                     _perf = ClassificationEvaluator(
                         self.local_inc['hpo'], data_node=self.local_inc['fe'], scorer=self.metric,
                         name='fe', resampling_strategy=self.evaluation_type,
-                        seed=self.seed)(self.local_inc['hpo'])
+                        seed=self.seed, prediction_store=self.prediction_store)(self.local_inc['hpo'])
                 else:
                     _perf = RegressionEvaluator(
                         self.local_inc['hpo'], data_node=self.local_inc['fe'], scorer=self.metric,
                         name='fe', resampling_strategy=self.evaluation_type,
-                        seed=self.seed)(self.local_inc['hpo'])
+                        seed=self.seed, prediction_store=self.prediction_store)(self.local_inc['hpo'])
         except Exception as e:
             self.logger.error(str(e))
         # Update INC.
@@ -255,6 +293,7 @@ class SecondLayerBandit(object):
             self.inc['fe'] = self.local_inc['fe']
             self.incumbent_perf = _perf
 
+    @traced('bandit.pull', category='bandit')
     def play_once(self):
         if self.early_stopped_flag:
             return self.incumbent_perf
@@ -278,34 +317,59 @@ class SecondLayerBandit(object):
 
     def sync_global_incumbents(self, global_nodes: typing.List[DataNode]):
         fe_optimizer = self.optimizer['fe']
-        fe_optimizer.global_datanodes = []
-        for node in global_nodes:
-            _node = node.copy_()
-            _node.depth = node.depth
-            fe_optimizer.global_datanodes.append(_node)
+        previous_nodes = fe_optimizer.global_datanodes
+        # Reference the stored features instead of copying them, the new ones are acquired first.
+        fe_optimizer.global_datanodes = [self.feature_store.acquire(self.feature_store.add(node))
+                                         for node in global_nodes]
+        for node in fe_optimizer.global_datanodes:
+            # The shared nodes enter the graph as roots.
+            fe_optimizer.graph.add_node(node)
+        for node in previous_nodes:
+            self.feature_store.release(node.feature_key)
         fe_optimizer.refresh_beam_set()
 
-    def predict_proba(self, X_test, is_weighted=False):
+    def release_global_incumbents(self):
+        """
+        Drop the references of the FE optimizer to the stored global data nodes.
+        """
+        fe_optimizer = self.optimizer.get('fe')
+        if fe_optimizer is None:
+            return
+        previous_nodes, fe_optimizer.global_datanodes = fe_optimizer.global_datanodes, list()
+        for node in previous_nodes:
+            self.feature_store.release(node.feature_key)
+
+    def get_refit_signature(self):
         """
-            weight source: ...
+        The fingerprints of the training data and configurations of the models in predict_proba.
+        """
+        return (get_trial_key(self.original_data, self.default_config),
+                get_trial_key(self.local_inc['fe'], self.local_inc['hpo']),
+                get_trial_key(self.local_inc['fe'], self.default_config))
+
+    def refit(self, is_weighted=False):
+        """
+            Train the models used by predict_proba, and cache them until the incumbents change.
             model 1: local_inc['fe'], default_hpo
             model 2: default_fe, local_inc['hpo']
             model 3: local_inc['fe'], local_inc['hpo']
-        :param X_test:
-        :param is_weighted:
-        :return:
+            model 4: default_fe, default_hpo
+        :param is_weighted: whether to compute the ensemble weights on a validation split too.
         """
         X_train_ori, y_train_ori = self.original_data.data
         X_train_inc, y_train_inc = self.local_inc['fe'].data
 
-        model1_clf = fetch_predict_estimator(self.task_type, self.default_config, X_train_inc, y_train_inc)
-        model2_clf = fetch_predict_estimator(self.task_type, self.local_inc['hpo'], X_train_ori, y_train_ori)
-        model3_clf = fetch_predict_estimator(self.task_type, self.local_inc['hpo'], X_train_inc, y_train_inc)
-        model4_clf = fetch_predict_estimator(self.task_type, self.default_config, X_train_ori, y_train_ori)
+        models = list()
+        for config, data_node in [(self.default_config, self.local_inc['fe']),
+                                  (self.local_inc['hpo'], self.original_data),
+                                  (self.local_inc['hpo'], self.local_inc['fe']),
+                                  (self.default_config, self.original_data)]:
+            models.append(fetch_predict_estimator(self.task_type, config, data_node.data[0], data_node.data[1],
+                                                  prediction_store=self.prediction_store, data_node=data_node))
 
+        weights = None
         if is_weighted:
             # Based on performance on the validation set
-            # TODO: Save the results so that the models will not be trained again
             from automlToolkit.components.ensemble.ensemble_selection import EnsembleSelection
             from autosklearn.metrics import balanced_accuracy
             sss = StratifiedShuffleSplit(n_splits=1, test_size=0.33, random_state=1)
@@ -330,7 +394,23 @@ class SecondLayerBandit(object):
                                    random_state=np.random.RandomState(self.seed))
             es.fit([pred1, pred2, pred3, pred4], y_val, None)
             weights = es.weights_
-            print("weights " + str(weights))
+            self.logger.debug('Ensemble weights: %s', weights)
+
+        self.refit_cache = {'signature': self.get_refit_signature(), 'models': models, 'weights': weights}
+        return self
+
+    def predict_proba(self, X_test, is_weighted=False):
+        """
+            Average the predictions of the four models of refit; they are trained at the first call
+            and again only after the incumbents change.
+        :param X_test:
+        :param is_weighted:
+        :return:
+        """
+        if self.refit_cache is None or self.refit_cache['signature'] != self.get_refit_signature() or \
+                (is_weighted and self.refit_cache['weights'] is None):
+            self.refit(is_weighted=is_weighted)
+        model1_clf, model2_clf, model3_clf, model4_clf = self.refit_cache['models']
 
         # Make sure that the estimator has "predict_proba"
         _test_node = DataNode(data=[X_test, None], feature_type=self.original_data.feature_types.copy())
@@ -341,6 +421,7 @@ class SecondLayerBandit(object):
         pred4 = model4_clf.predict_proba(X_test)
 
         if is_weighted:
+            weights = self.refit_cache['weights']
             final_pred = weights[0] * pred1 + weights[1] * pred2 + weights[2] * pred3 + weights[3] * pred4
         else:
             final_pred = (pred1 + pred2 + pred3 + pred4) / 4
@@ -357,17 +438,22 @@ class SecondLayerBandit(object):
             if self.task_type in CLS_TASKS:
                 fe_evaluator = ClassificationEvaluator(self.inc['hpo'], scorer=self.metric,
                                                        name='fe', resampling_strategy=self.evaluation_type,
-                                                       seed=self.seed)
+                                                       seed=self.seed,
+                                                       prediction_store=self.prediction_store)
             elif self.task_type in REG_TASKS:
                 fe_evaluator = RegressionEvaluator(self.inc['hpo'], scorer=self.metric,
                                                    name='fe', resampling_strategy=self.evaluation_type,
-                                                   seed=self.seed)
+                                                   seed=self.seed,
+                                                   prediction_store=self.prediction_store)
             else:
                 raise ValueError('Invalid task type!')
+            # The new optimizer starts without the global data nodes of the old one.
+            self.release_global_incumbents()
             self.optimizer[_arm] = build_fe_optimizer(self.evaluation_type, self.task_type, self.inc['fe'],
                                                       fe_evaluator, self.estimator_id, self.per_run_time_limit,
                                                       self.per_run_mem_limit, self.seed, n_jobs=self.n_jobs,
-                                                      shared_mode=self.share_fe)
+                                                      shared_mode=self.share_fe,
+                                                      memory_budget=self.fe_memory_budget)
         else:
             # trials_per_iter = self.optimizer['fe'].evaluation_num_last_iteration // 2
             # trials_per_iter = max(20, trials_per_iter)
@@ -376,12 +462,14 @@ class SecondLayerBandit(object):
                 hpo_evaluator = ClassificationEvaluator(self.default_config, scorer=self.metric,
                                                         data_node=self.inc['fe'], name='hpo',
                                                         resampling_strategy=self.evaluation_type,
-                                                        seed=self.seed)
+                                                        seed=self.seed,
+                                                        prediction_store=self.prediction_store)
             elif self.task_type in REG_TASKS:
                 hpo_evaluator = RegressionEvaluator(self.default_config, scorer=self.metric,
                                                     data_node=self.inc['fe'], name='hpo',
                                                     resampling_strategy=self.evaluation_type,
-                                                    seed=self.seed)
+                                                    seed=self.seed,
+                                                    prediction_store=self.prediction_store)
             else:
                 raise ValueError('Invalid task type!')
 
@@ -389,7 +477,8 @@ class SecondLayerBandit(object):
                                                        output_dir=self.output_dir,
                                                        per_run_time_limit=self.per_run_time_limit,
                                                        trials_per_iter=trials_per_iter,
-                                                       seed=self.seed, n_jobs=self.n_jobs)
+                                                       seed=self.seed, n_jobs=self.n_jobs,
+                                                       initial_configs=self.seed_configs)
 
         self.logger.info('=' * 30)
         self.logger.info('UPDATE OPTIMIZER: %s' % _arm)
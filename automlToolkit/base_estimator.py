@@ -17,7 +17,9 @@ class BaseEstimator(object):
             random_state=1,
             n_jobs=1,
             evaluation='holdout',
-            output_dir="/tmp/"):
+            output_dir="/tmp/",
+            archive_dir=None,
+            fe_memory_budget=None):
         self.metric = metric
         self.task_type = None
         self.time_limit = time_limit
@@ -30,6 +32,8 @@ class BaseEstimator(object):
         self.n_jobs = n_jobs
         self.evaluation = evaluation
         self.output_dir = output_dir
+        self.archive_dir = archive_dir
+        self.fe_memory_budget = fe_memory_budget
         self._ml_engine = None
         # Create output directory.
         if not os.path.exists(output_dir):
@@ -49,7 +53,9 @@ class BaseEstimator(object):
             random_state=self.random_state,
             n_jobs=self.n_jobs,
             evaluation=self.evaluation,
-            output_dir=self.output_dir
+            output_dir=self.output_dir,
+            archive_dir=self.archive_dir,
+            fe_memory_budget=self.fe_memory_budget
         )
         return engine
 
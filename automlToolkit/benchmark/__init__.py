@@ -0,0 +1,2 @@
+from .synthetic import make_classification_node, make_regression_node, split_node
+from .suite import run_benchmarks, compare_results, register_benchmark, default_params
@@ -0,0 +1,44 @@
+import sys
+import json
+import argparse
+
+from automlToolkit.benchmark.suite import run_benchmarks, compare_results, get_failures, default_params, \
+    _benchmarks
+
+parser = argparse.ArgumentParser(description='Benchmark the overhead of automlToolkit on synthetic data.')
+parser.add_argument('--benchmarks', type=str, default=','.join(_benchmarks.keys()))
+parser.add_argument('--output', type=str, default='benchmark_results.json')
+parser.add_argument('--baseline', type=str, default=None,
+                    help='the results of a previous run, exit with 1 if some measurement regresses.')
+# A benchmark that raises, except for a missing optional dependency, makes the run exit with 1.
+parser.add_argument('--tolerance', type=float, default=0.2)
+parser.add_argument('--trace_memory', action='store_true')
+for key, val in default_params.items():
+    parser.add_argument('--%s' % key, type=type(val), default=val)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    params = {key: getattr(args, key) for key in default_params}
+    report = run_benchmarks(args.benchmarks.split(','), params, trace_memory=args.trace_memory,
+                            output_file=args.output)
+    for name, result in report['results'].items():
+        if result.get('skipped', False):
+            print('%-20s skipped: %s' % (name, result['error']))
+        elif result.get('failed', False):
+            print('%-20s FAILED: %s' % (name, result['error']))
+        else:
+            print('%-20s wall time: %.2fs, peak rss growth: %.1fMB' % (name, result['wall_time'],
+                                                                       result['peak_rss_growth_mb']))
+    print('Results are saved to %s.' % args.output)
+    failures = get_failures(report)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, args.tolerance)
+        for name, key, base_val, val, change in regressions:
+            print('Regression in %s/%s: %.4f -> %.4f (%+.1f%%)' % (name, key, base_val, val, change * 100))
+        if len(regressions) > 0:
+            sys.exit(1)
+    if len(failures) > 0:
+        sys.exit(1)
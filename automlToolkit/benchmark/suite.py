@@ -0,0 +1,400 @@
+"""
+Benchmarks for the overhead of the toolkit itself on synthetic data.
+Each benchmark takes the data parameters and a shared state dict, and returns a dict of measurements.
+The latencies are in seconds, and the keys ending with '_per_second' are throughputs.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import tracemalloc
+from collections import OrderedDict
+import numpy as np
+
+from automlToolkit.utils.logging_utils import get_logger
+from automlToolkit.components.utils.constants import CLS_TASKS
+from automlToolkit.benchmark.synthetic import make_classification_node, make_regression_node, split_node
+
+_benchmarks = OrderedDict()
+logger = get_logger('Benchmark')
+# The dependencies a benchmark may go without, any other import error is a failure.
+optional_modules = ['smac', 'litebo', 'pyrfr', 'lightgbm', 'xgboost']
+
+
+def register_benchmark(name):
+    def decorator(func):
+        if name in _benchmarks:
+            raise ValueError('Repeated benchmark name: %s!' % name)
+        _benchmarks[name] = func
+        return func
+
+    return decorator
+
+
+def get_timing_stats(durations):
+    durations = np.asarray(durations, dtype=np.float64)
+    return {'count': int(len(durations)),
+            'total': float(np.sum(durations)),
+            'mean': float(np.mean(durations)),
+            'median': float(np.median(durations)),
+            'p90': float(np.percentile(durations, 90)),
+            'min': float(np.min(durations)),
+            'max': float(np.max(durations))}
+
+
+def get_config_space(estimator_id, task_type):
+    from ConfigSpace.hyperparameters import UnParametrizedHyperparameter
+    if task_type in CLS_TASKS:
+        from automlToolkit.components.models.classification import _classifiers as _estimators
+    else:
+        from automlToolkit.components.models.regression import _regressors as _estimators
+    cs = _estimators[estimator_id].get_hyperparameter_search_space()
+    cs.add_hyperparameter(UnParametrizedHyperparameter("estimator", estimator_id))
+    return cs
+
+
+def get_data(params, state):
+    """
+    Generate the synthetic tasks once, and share them among the benchmarks.
+    """
+    if 'cls_node' not in state:
+        state['cls_node'], state['cls_task_type'] = make_classification_node(
+            n_samples=params['n_samples'], n_features=params['n_features'], n_classes=params['n_classes'],
+            n_categorical=params['n_categorical'], seed=params['seed'])
+        state['reg_node'], state['reg_task_type'] = make_regression_node(
+            n_samples=params['n_samples'], n_features=params['n_features'],
+            n_categorical=params['n_categorical'], seed=params['seed'])
+    return state
+
+
+def get_fe_optimizer(params, state):
+    from automlToolkit.components.metrics.metric import get_metric
+    from automlToolkit.components.evaluators.cls_evaluator import ClassificationEvaluator
+    from automlToolkit.components.fe_optimizers.evaluation_based_optimizer import EvaluationBasedOptimizer
+    get_data(params, state)
+    train_node, test_node, y_test = split_node(state['cls_node'], seed=params['seed'])
+    cs = get_config_space(params['estimator'], state['cls_task_type'])
+    evaluator = ClassificationEvaluator(cs.get_default_configuration(), scorer=get_metric('acc'),
+                                        name='fe', resampling_strategy='holdout', seed=params['seed'])
+    optimizer = EvaluationBasedOptimizer(state['cls_task_type'], train_node, evaluator, params['estimator'],
+                                         time_limit_per_trans=600, mem_limit_per_trans=1024,
+                                         seed=params['seed'])
+    return optimizer, train_node, test_node, y_test, cs
+
+
+@register_benchmark('cls_evaluator')
+def bench_cls_evaluator(params, state):
+    from automlToolkit.components.metrics.metric import get_metric
+    from automlToolkit.components.evaluators.cls_evaluator import ClassificationEvaluator
+    get_data(params, state)
+    cs = get_config_space(params['estimator'], state['cls_task_type'])
+    cs.seed(params['seed'])
+    evaluator = ClassificationEvaluator(cs.get_default_configuration(), scorer=get_metric('acc'),
+                                        data_node=state['cls_node'], name='hpo',
+                                        resampling_strategy='holdout', seed=params['seed'])
+    configs = [cs.get_default_configuration()] + cs.sample_configuration(params['n_evaluations'] - 1)
+    durations = list()
+    for config in configs:
+        _start_time = time.perf_counter()
+        evaluator(config)
+        durations.append(time.perf_counter() - _start_time)
+    result = get_timing_stats(durations)
+    result['evaluations_per_second'] = len(durations) / result['total']
+    return result
+
+
+@register_benchmark('reg_evaluator')
+def bench_reg_evaluator(params, state):
+    from automlToolkit.components.metrics.metric import get_metric
+    from automlToolkit.components.evaluators.reg_evaluator import RegressionEvaluator
+    get_data(params, state)
+    cs = get_config_space(params['reg_estimator'], state['reg_task_type'])
+    cs.seed(params['seed'])
+    evaluator = RegressionEvaluator(cs.get_default_configuration(), scorer=get_metric('mse'),
+                                    data_node=state['reg_node'], name='hpo',
+                                    resampling_strategy='holdout', seed=params['seed'])
+    configs = [cs.get_default_configuration()] + cs.sample_configuration(params['n_evaluations'] - 1)
+    durations = list()
+    for config in configs:
+        _start_time = time.perf_counter()
+        evaluator(config)
+        durations.append(time.perf_counter() - _start_time)
+    result = get_timing_stats(durations)
+    result['evaluations_per_second'] = len(durations) / result['total']
+    return result
+
+
+@register_benchmark('fe_iteration')
+def bench_fe_iteration(params, state):
+    optimizer, train_node, test_node, y_test, cs = get_fe_optimizer(params, state)
+    durations = list()
+    for _ in range(params['n_fe_iterations']):
+        if optimizer.early_stopped_flag:
+            break
+        _start_time = time.perf_counter()
+        optimizer.iterate()
+        durations.append(time.perf_counter() - _start_time)
+    result = get_timing_stats(durations)
+    result['evaluation_count'] = int(optimizer.evaluation_count)
+    result['incumbent_shape'] = list(optimizer.incumbent.shape)
+    # Reused by the apply/predict benchmark.
+    state['fe_optimizer'] = (optimizer, train_node, test_node, y_test, cs)
+    return result
+
+
+@register_benchmark('fe_apply_predict')
+def bench_fe_apply_predict(params, state):
+    from automlToolkit.components.evaluators.base_evaluator import fetch_predict_estimator
+    if 'fe_optimizer' not in state:
+        optimizer, train_node, test_node, y_test, cs = get_fe_optimizer(params, state)
+        optimizer.iterate()
+    else:
+        optimizer, train_node, test_node, y_test, cs = state['fe_optimizer']
+
+    incumbent = optimizer.incumbent
+    apply_durations = list()
+    for _ in range(params['n_repeats']):
+        _start_time = time.perf_counter()
+        _test_node = optimizer.apply(test_node, incumbent)
+        apply_durations.append(time.perf_counter() - _start_time)
+
+    X_train, y_train = incumbent.data
+    estimator = fetch_predict_estimator(incumbent.task_type, cs.get_default_configuration(), X_train, y_train)
+    X_test = _test_node.data[0]
+    predict_durations = list()
+    for _ in range(params['n_repeats']):
+        _start_time = time.perf_counter()
+        estimator.predict(X_test)
+        predict_durations.append(time.perf_counter() - _start_time)
+    return {'apply': get_timing_stats(apply_durations),
+            'predict': get_timing_stats(predict_durations),
+            'transformation_depth': len(incumbent.trans_hist),
+            'test_rows_per_second': len(X_test) / float(np.median(apply_durations) + np.median(predict_durations))}
+
+
+def _bench_hpo_proposal(optimizer_class, params, state, **kwargs):
+    """
+    Run the optimizer with an evaluator that returns immediately, so the iteration time
+    is dominated by the proposal of the configurations.
+    """
+    get_data(params, state)
+    cs = get_config_space(params['estimator'], state['cls_task_type'])
+    rng = np.random.RandomState(params['seed'])
+
+    def evaluator(config, **eval_kwargs):
+        return rng.rand()
+
+    output_dir = tempfile.mkdtemp()
+    try:
+        optimizer = optimizer_class(evaluator, cs, output_dir=output_dir, seed=params['seed'], **kwargs)
+        durations, proposal_num = list(), list()
+        for _ in range(params['n_hpo_iterations']):
+            _config_num = len(optimizer.configs)
+            _start_time = time.perf_counter()
+            optimizer.iterate()
+            durations.append(time.perf_counter() - _start_time)
+            proposal_num.append(len(optimizer.configs) - _config_num)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    result = get_timing_stats(durations)
+    result['configs_per_second'] = max(np.sum(proposal_num), 1) / result['total']
+    return result
+
+
+@register_benchmark('smac_proposal')
+def bench_smac_proposal(params, state):
+    from automlToolkit.components.hpo_optimizer.smac_optimizer import SMACOptimizer
+    return _bench_hpo_proposal(SMACOptimizer, params, state)
+
+
+@register_benchmark('mfse_proposal')
+def bench_mfse_proposal(params, state):
+    from automlToolkit.components.hpo_optimizer.mfse_optimizer import MfseOptimizer
+    return _bench_hpo_proposal(MfseOptimizer, params, state, R=27, eta=3)
+
+
+@register_benchmark('ensemble_selection')
+def bench_ensemble_selection(params, state):
+    from automlToolkit.components.metrics.metric import get_metric
+    from automlToolkit.components.ensemble.ensemble_selection import EnsembleSelection
+    get_data(params, state)
+    node, task_type = state['cls_node'], state['cls_task_type']
+    cs = get_config_space(params['estimator'], task_type)
+    cs.seed(params['seed'])
+    configs = [cs.get_default_configuration()] + cs.sample_configuration(params['n_ensemble_models'] - 1)
+    stats = {'include_algorithms': [params['estimator']],
+             'split_seed': params['seed'],
+             params['estimator']: {'train_data_list': [node], 'configurations': configs}}
+
+    output_dir = tempfile.mkdtemp()
+    try:
+        _start_time = time.perf_counter()
+        ensemble = EnsembleSelection(stats, ensemble_size=params['ensemble_size'], task_type=task_type,
+                                     metric=get_metric('acc'), output_dir=output_dir)
+        build_time = time.perf_counter() - _start_time
+        fit_durations = list()
+        for _ in range(params['n_repeats']):
+            _start_time = time.perf_counter()
+            ensemble.fit(None)
+            fit_durations.append(time.perf_counter() - _start_time)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return {'base_model_build_time': build_time, 'fit': get_timing_stats(fit_durations),
+            'model_num': len(configs)}
+
+
+default_params = {'n_samples': 2000,
+                  'n_features': 20,
+                  'n_classes': 2,
+                  'n_categorical': 4,
+                  'seed': 1,
+                  'estimator': 'random_forest',
+                  'reg_estimator': 'random_forest',
+                  'n_evaluations': 10,
+                  'n_fe_iterations': 3,
+                  'n_hpo_iterations': 10,
+                  'n_ensemble_models': 10,
+                  'ensemble_size': 20,
+                  'n_repeats': 5}
+
+
+def get_peak_rss():
+    """
+    :return: the peak resident set size of the process so far in MB, which never decreases.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # The unit is bytes on macOS and kilobytes on Linux.
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def get_environment():
+    import sklearn
+    import ConfigSpace
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'ConfigSpace': ConfigSpace.__version__}
+
+
+def run_benchmarks(names=None, params=None, trace_memory=False, output_file=None):
+    """
+    Run the benchmarks and collect the results in a JSON-serializable dict.
+    :param names: the benchmarks to run, all of them by default.
+    :param params: overrides of default_params.
+    :param trace_memory: if True, each benchmark runs a second time under tracemalloc
+        to measure its own peak allocation, which the timings do not include.
+    :param output_file: if given, the results are written to it in JSON.
+    :return: dict with the environment, the parameters and the results.
+    """
+    _params = default_params.copy()
+    _params.update(params or {})
+    if names is None:
+        names = list(_benchmarks.keys())
+    for name in names:
+        if name not in _benchmarks:
+            raise ValueError('Invalid benchmark: %s!' % name)
+
+    state = dict()
+    results = OrderedDict()
+    for name in names:
+        logger.info('Running benchmark: %s', name)
+        _start_time = time.perf_counter()
+        _peak_rss = get_peak_rss()
+        try:
+            result = _benchmarks[name](_params, state)
+        except ImportError as e:
+            if e.name is not None and e.name.split('.')[0] in optional_modules:
+                logger.warning('Skip benchmark %s: %s', name, str(e))
+                results[name] = {'skipped': True, 'error': str(e)}
+            else:
+                logger.exception('Benchmark %s failed: %s', name, str(e))
+                results[name] = {'failed': True, 'error': '%s: %s' % (type(e).__name__, str(e))}
+            continue
+        except Exception as e:
+            logger.exception('Benchmark %s failed: %s', name, str(e))
+            results[name] = {'failed': True, 'error': '%s: %s' % (type(e).__name__, str(e))}
+            continue
+        result['wall_time'] = time.perf_counter() - _start_time
+        # The peak of the process covers the benchmarks run before, only its growth is due to this one.
+        result['process_peak_rss_mb'] = get_peak_rss()
+        result['peak_rss_growth_mb'] = result['process_peak_rss_mb'] - _peak_rss
+
+        if trace_memory:
+            tracemalloc.start()
+            try:
+                _benchmarks[name](_params, dict(state))
+                result['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            finally:
+                tracemalloc.stop()
+        results[name] = result
+
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'environment': get_environment(),
+              'params': _params,
+              'results': results}
+    if output_file is not None:
+        with open(output_file, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def _flatten(result, prefix=''):
+    items = dict()
+    for key, val in result.items():
+        if isinstance(val, dict):
+            items.update(_flatten(val, prefix + key + '.'))
+        elif isinstance(val, (int, float)) and not isinstance(val, bool):
+            items[prefix + key] = val
+    return items
+
+
+def get_failures(report):
+    """
+    :return: dict from the name of each failed benchmark in a report to its error.
+    """
+    return {name: result['error'] for name, result in report['results'].items() if result.get('failed', False)}
+
+
+def compare_results(baseline, current, tolerance=0.2):
+    """
+    Compare two reports of run_benchmarks on the median latencies and the throughputs.
+    A benchmark that fails in the current report, or that is measured in the baseline but skipped
+    or missing in the current one, counts as a regression with an infinite change.
+    :param tolerance: relative slowdown above which a measurement counts as a regression.
+    :return: list of (benchmark, measurement, baseline value, current value, relative change),
+        where a positive change is a slowdown.
+    """
+    regressions = list()
+    for name, result in current['results'].items():
+        if result.get('failed', False):
+            regressions.append((name, 'error', np.nan, np.nan, np.inf))
+            continue
+        if name not in baseline['results']:
+            continue
+        base_items = _flatten(baseline['results'][name])
+        for key, val in _flatten(result).items():
+            if key not in base_items or base_items[key] <= 0 or val <= 0:
+                continue
+            if key.endswith('median'):
+                change = val / base_items[key] - 1.
+            elif key.endswith('_per_second'):
+                change = base_items[key] / val - 1.
+            else:
+                continue
+            if change > tolerance:
+                regressions.append((name, key, base_items[key], val, change))
+    for name, result in baseline['results'].items():
+        if result.get('skipped', False) or result.get('failed', False):
+            continue
+        if name not in current['results']:
+            regressions.append((name, 'missing', np.nan, np.nan, np.inf))
+        elif current['results'][name].get('skipped', False):
+            regressions.append((name, 'skipped', np.nan, np.nan, np.inf))
+    return regressions
@@ -0,0 +1,61 @@
+import numpy as np
+from automlToolkit.components.utils.constants import NUMERICAL, CATEGORICAL, BINARY_CLS, MULTICLASS_CLS, REGRESSION
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+
+
+def _add_categorical_columns(X, n_categorical, n_categories, rng):
+    """
+    Discretize the first n_categorical columns into integer codes.
+    """
+    n_categorical = min(n_categorical, X.shape[1])
+    for idx in range(n_categorical):
+        bins = np.quantile(X[:, idx], np.linspace(0, 1, n_categories + 1)[1:-1])
+        X[:, idx] = np.digitize(X[:, idx], bins)
+    # Shuffle the columns, so the categorical ones are not all in front.
+    order = rng.permutation(X.shape[1])
+    feature_types = np.array([CATEGORICAL] * n_categorical + [NUMERICAL] * (X.shape[1] - n_categorical))
+    return X[:, order], list(feature_types[order])
+
+
+def make_classification_node(n_samples=1000, n_features=20, n_classes=2, n_categorical=0, n_categories=5,
+                             seed=1):
+    """
+    Generate a synthetic classification task, a third of the features are informative.
+    :return: the DataNode, and its task type.
+    """
+    from sklearn.datasets import make_classification
+    rng = np.random.RandomState(seed)
+    n_informative = max(2, n_features // 3)
+    X, y = make_classification(n_samples=n_samples, n_features=n_features, n_informative=n_informative,
+                               n_redundant=min(n_features - n_informative, n_features // 6),
+                               n_classes=n_classes, n_clusters_per_class=1, random_state=seed)
+    X, feature_types = _add_categorical_columns(X, n_categorical, n_categories, rng)
+    task_type = BINARY_CLS if n_classes == 2 else MULTICLASS_CLS
+    return DataNode((X, y), feature_types, task_type), task_type
+
+
+def make_regression_node(n_samples=1000, n_features=20, n_categorical=0, n_categories=5, noise=0.1, seed=1):
+    """
+    Generate a synthetic regression task, a third of the features are informative.
+    :return: the DataNode, and its task type.
+    """
+    from sklearn.datasets import make_regression
+    rng = np.random.RandomState(seed)
+    X, y = make_regression(n_samples=n_samples, n_features=n_features, n_informative=max(2, n_features // 3),
+                           noise=noise, random_state=seed)
+    X, feature_types = _add_categorical_columns(X, n_categorical, n_categories, rng)
+    return DataNode((X, y), feature_types, REGRESSION), REGRESSION
+
+
+def split_node(node: DataNode, test_size=0.2, seed=1):
+    """
+    Split a DataNode into train and test nodes.
+    """
+    X, y = node.data
+    rng = np.random.RandomState(seed)
+    order = rng.permutation(len(X))
+    n_test = int(len(X) * test_size)
+    test_idx, train_idx = order[:n_test], order[n_test:]
+    train_node = DataNode((X[train_idx], y[train_idx]), node.feature_types.copy(), node.task_type)
+    test_node = DataNode((X[test_idx], None), node.feature_types.copy(), node.task_type)
+    return train_node, test_node, y[test_idx]
@@ -0,0 +1,466 @@
+import os
+import copy
+import time
+import pickle
+import socket
+import hashlib
+import secrets
+import argparse
+import ipaddress
+import threading
+import numpy as np
+from collections import deque, OrderedDict
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from multiprocessing.connection import Listener, Client, AuthenticationError
+from ConfigSpace import Configuration
+
+from automlToolkit.components.computation.resource_manager import get_resource_manager, set_core_budget
+from automlToolkit.utils.logging_utils import get_logger
+
+# The protocol between the coordinator and the workers, each message is a pickled tuple
+# sent over an authenticated connection:
+#     worker -> coordinator: ('register', info), ('request',), ('fetch', key), ('heartbeat',),
+#                            ('result', trial_id, score, time_taken)
+#     coordinator -> worker: ('trial', trial_id, spec), ('object', key, payload), ('stop',)
+# A trial spec holds the keys of the evaluator and the data node, the configuration and the subsample ratio.
+# The evaluators and the data nodes are content-addressed objects: a worker loads each one once,
+# from the shared directory, its cache directory or the coordinator, and keeps it in memory.
+# The messages are unpickled, so the authkey is the only guard: there is no default one.
+
+AUTHKEY_ENV = 'AUTOML_TOOLKIT_AUTHKEY'
+
+
+def get_object_key(payload):
+    return hashlib.sha1(payload).hexdigest()
+
+
+def get_authkey(authkey=None):
+    """
+    :return: the explicit authkey, else the one in the environment variable AUTOML_TOOLKIT_AUTHKEY, else None.
+    """
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_ENV) or None
+    if isinstance(authkey, str):
+        authkey = authkey.encode()
+    return authkey
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+class Coordinator(object):
+    """
+    Hand out the trials to the workers that connect to it, and collect their results.
+    A worker that sends no heartbeat within heartbeat_timeout is lost, and its trial is queued again.
+    Usage:
+        coordinator = Coordinator(('0.0.0.0', 9000), authkey=b'<secret>')
+        executor = DistributedExecutor(evaluator, coordinator)
+        # On each node, with AUTOML_TOOLKIT_AUTHKEY=<secret>:
+        #     python -m automlToolkit.components.computation.distributed --host <host> --port 9000
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), authkey=None, heartbeat_timeout=30.,
+                 max_retries=2, shared_dir=None):
+        """
+        :param address: the address to listen on, port 0 picks a free port.
+        :param authkey: the key shared with the workers, AUTOML_TOOLKIT_AUTHKEY by default. Without one,
+            a random key is generated on a loopback address and kept in self.authkey, and any other address is refused.
+        :param max_retries: the number of times a lost trial is queued again before it fails.
+        :param shared_dir: a directory the workers can read, e.g., on a network file system.
+        """
+        self.logger = get_logger('Coordinator')
+        authkey = get_authkey(authkey)
+        if authkey is None:
+            if not is_loopback(address[0]):
+                raise ValueError('Invalid authkey: an explicit one is required to listen on %s!' % address[0])
+            # The local workers take it from self.authkey.
+            authkey = secrets.token_hex(16).encode()
+            self.logger.info('Generated a random authkey for the coordinator on %s.', address[0])
+        self.authkey = authkey
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_retries = max_retries
+        self.shared_dir = shared_dir
+        if shared_dir is not None and not os.path.exists(shared_dir):
+            os.makedirs(shared_dir)
+
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.objects = dict()
+        self.object_refs = dict()
+        self.pending = deque()
+        # trial_id -> [spec, future, retry_cnt].
+        self.trials = dict()
+        self.workers = dict()
+        self.trial_cnt = 0
+        self.worker_cnt = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._accept_thread.start()
+
+    def get_worker_count(self):
+        with self._cond:
+            return len(self.workers)
+
+    def wait_for_workers(self, n_workers, timeout=None):
+        """
+        Block until n_workers workers have registered.
+        :return: whether they did before the timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self.workers) >= n_workers, timeout=timeout)
+
+    def put_object(self, obj):
+        """
+        Publish an object to the workers, until each put is matched by a drop.
+        :return: the content key of the object.
+        """
+        payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        key = get_object_key(payload)
+        with self._cond:
+            self.object_refs[key] = self.object_refs.get(key, 0) + 1
+            if key in self.objects:
+                return key
+            self.objects[key] = payload
+        if self.shared_dir is not None:
+            path = os.path.join(self.shared_dir, '%s.pkl' % key)
+            if not os.path.exists(path):
+                tmp_path = '%s.%d.tmp' % (path, os.getpid())
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+        return key
+
+    def drop_object(self, key):
+        with self._cond:
+            self.object_refs[key] = self.object_refs.get(key, 1) - 1
+            if self.object_refs[key] <= 0:
+                self.object_refs.pop(key)
+                self.objects.pop(key, None)
+
+    def submit(self, spec):
+        """
+        Queue a trial.
+        :return: a future of (score, time_taken).
+        """
+        future = Future()
+        with self._cond:
+            if self.closed:
+                raise ValueError('Invalid coordinator: it is closed!')
+            trial_id = self.trial_cnt
+            self.trial_cnt += 1
+            self.trials[trial_id] = [spec, future, 0]
+            self.pending.append(trial_id)
+            self._cond.notify_all()
+        return future
+
+    def _next_trial(self):
+        with self._cond:
+            while True:
+                while len(self.pending) == 0 and not self.closed:
+                    self._cond.wait()
+                if self.closed:
+                    return None, None
+                trial_id = self.pending.popleft()
+                spec, future, _ = self.trials[trial_id]
+                if future.running() or future.set_running_or_notify_cancel():
+                    return trial_id, spec
+                # Cancelled by the caller.
+                del self.trials[trial_id]
+
+    def _requeue(self, trial_id):
+        with self._cond:
+            if trial_id not in self.trials:
+                return
+            spec, future, retry_cnt = self.trials[trial_id]
+            if retry_cnt < self.max_retries:
+                self.trials[trial_id][2] += 1
+                self.pending.appendleft(trial_id)
+                self._cond.notify_all()
+                self.logger.info('Queue the lost trial %d again.', trial_id)
+                return
+            del self.trials[trial_id]
+        self.logger.warning('The trial %d is lost %d times, give it up.', trial_id, retry_cnt + 1)
+        future.set_result((-np.inf, 0.))
+
+    def _finish(self, trial_id, score, time_taken):
+        with self._cond:
+            if trial_id not in self.trials:
+                return
+            _, future, _ = self.trials.pop(trial_id)
+        future.set_result((score, time_taken))
+
+    def _accept_loop(self):
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError as e:
+                self.logger.warning('Reject a worker: %s', str(e))
+                continue
+            except OSError:
+                # The listener is closed.
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with self._cond:
+            worker_id = self.worker_cnt
+            self.worker_cnt += 1
+        trial_id = None
+        try:
+            if not conn.poll(self.heartbeat_timeout):
+                return
+            message = conn.recv()
+            if message[0] != 'register':
+                return
+            with self._cond:
+                self.workers[worker_id] = message[1]
+                self._cond.notify_all()
+            self.logger.info('Worker %d registered: %s', worker_id, message[1])
+
+            while not self.closed:
+                if not conn.poll(self.heartbeat_timeout):
+                    self.logger.warning('Worker %d sent no heartbeat for %.1f seconds.',
+                                        worker_id, self.heartbeat_timeout)
+                    break
+                message = conn.recv()
+                if message[0] == 'request':
+                    trial_id, spec = self._next_trial()
+                    if trial_id is None:
+                        conn.send(('stop',))
+                        break
+                    conn.send(('trial', trial_id, spec))
+                elif message[0] == 'fetch':
+                    with self._cond:
+                        payload = self.objects.get(message[1])
+                    conn.send(('object', message[1], payload))
+                elif message[0] == 'result':
+                    _, _trial_id, score, time_taken = message
+                    self._finish(_trial_id, score, time_taken)
+                    trial_id = None
+        except (EOFError, OSError) as e:
+            self.logger.warning('Lost worker %d: %s', worker_id, type(e).__name__)
+        finally:
+            with self._cond:
+                self.workers.pop(worker_id, None)
+            if trial_id is not None:
+                self._requeue(trial_id)
+            conn.close()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            trials, self.trials, self.pending = self.trials, dict(), deque()
+        self.listener.close()
+        for _, future, _ in trials.values():
+            # The queued trials are cancelled, the running ones fail.
+            if not future.cancel() and not future.done():
+                future.set_result((-np.inf, 0.))
+
+
+class Worker(object):
+    """
+    Pull the trials from a coordinator and run them, one at a time.
+    """
+
+    def __init__(self, address, authkey=None, heartbeat_interval=5., shared_dir=None,
+                 cache_dir=None, max_cached=16, n_cores=None):
+        """
+        :param authkey: the key of the coordinator, AUTOML_TOOLKIT_AUTHKEY by default.
+        :param shared_dir: the shared directory of the coordinator, if mounted on this node.
+        :param cache_dir: a local directory for the objects fetched from the coordinator.
+        :param max_cached: the number of objects kept in memory.
+        :param n_cores: the core budget of this worker, all the cores by default.
+        """
+        self.address = address
+        self.authkey = get_authkey(authkey)
+        if self.authkey is None:
+            raise ValueError('Invalid authkey: pass one or set %s!' % AUTHKEY_ENV)
+        self.heartbeat_interval = heartbeat_interval
+        self.shared_dir = shared_dir
+        self.cache_dir = cache_dir
+        if cache_dir is not None and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.max_cached = max_cached
+        self.n_cores = n_cores
+        self.objects = OrderedDict()
+        self.conn = None
+        self.trial_cnt = 0
+        self._send_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.logger = get_logger('Worker')
+
+    def _send(self, message):
+        with self._send_lock:
+            self.conn.send(message)
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self._send(('heartbeat',))
+            except (OSError, ValueError):
+                break
+
+    def get_object(self, key):
+        if key is None:
+            return None
+        if key in self.objects:
+            self.objects.move_to_end(key)
+            return self.objects[key]
+
+        payload = None
+        for _dir in [self.shared_dir, self.cache_dir]:
+            path = None if _dir is None else os.path.join(_dir, '%s.pkl' % key)
+            if path is not None and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    payload = f.read()
+                break
+        if payload is None:
+            self._send(('fetch', key))
+            _, _, payload = self.conn.recv()
+            if payload is None:
+                raise ValueError('Invalid object key: %s!' % key)
+            if self.cache_dir is not None:
+                path = os.path.join(self.cache_dir, '%s.pkl' % key)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(payload)
+                os.replace(path + '.tmp', path)
+
+        obj = pickle.loads(payload)
+        self.objects[key] = obj
+        while len(self.objects) > self.max_cached:
+            self.objects.popitem(last=False)
+        return obj
+
+    def run_trial(self, spec):
+        start_time = time.time()
+        try:
+            evaluator = self.get_object(spec['evaluator'])
+            data_node = self.get_object(spec['data'])
+            with get_resource_manager().allot():
+                if spec['config'] is not None:
+                    score = evaluator(spec['config'], name='hpo', data_node=data_node,
+                                      data_subsample_ratio=spec['subsample_ratio'])
+                else:
+                    score = evaluator(None, data_node=data_node, name='fe',
+                                      data_subsample_ratio=spec['subsample_ratio'])
+        except (EOFError, OSError):
+            raise
+        except Exception as e:
+            self.logger.info('Trial failed: %s', str(e))
+            score = -np.inf
+        return score, time.time() - start_time
+
+    def run(self):
+        """
+        Serve the coordinator until it stops the worker or goes away.
+        """
+        if self.n_cores is not None:
+            set_core_budget(self.n_cores)
+        self.conn = Client(self.address, authkey=self.authkey)
+        self._send(('register', {'host': socket.gethostname(), 'pid': os.getpid(),
+                                 'n_cores': get_resource_manager().n_cores}))
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat_thread.start()
+        try:
+            while True:
+                self._send(('request',))
+                message = self.conn.recv()
+                if message[0] == 'stop':
+                    break
+                _, trial_id, spec = message
+                score, time_taken = self.run_trial(spec)
+                self._send(('result', trial_id, score, time_taken))
+                self.trial_cnt += 1
+        except (EOFError, OSError):
+            self.logger.info('The coordinator is gone.')
+        finally:
+            self._stopped.set()
+            self.conn.close()
+        return self.trial_cnt
+
+
+class DistributedExecutor(object):
+    """
+    The execution backend of the optimizers on the workers of a coordinator,
+    with the same interface as ParallelExecutor.
+    """
+
+    def __init__(self, evaluator, coordinator: Coordinator, n_worker=None):
+        """
+        :param n_worker: the number of trials kept in flight, the number of registered workers by default.
+        """
+        self.coordinator = coordinator
+        self._n_worker = n_worker
+        self.evaluator_key, self.data_key = None, None
+        self.update_evaluator(evaluator)
+
+    @property
+    def n_worker(self):
+        if self._n_worker is not None:
+            return self._n_worker
+        return max(1, self.coordinator.get_worker_count())
+
+    def update_evaluator(self, evaluator):
+        for key in [self.evaluator_key, self.data_key]:
+            if key is not None:
+                self.coordinator.drop_object(key)
+        self.evaluator = evaluator
+        remote_evaluator = copy.copy(evaluator)
+        data_node = getattr(evaluator, 'data_node', None)
+        if data_node is not None:
+            # The data node travels once as an object of its own.
+            remote_evaluator.data_node = None
+        if getattr(remote_evaluator, 'prediction_store', None) is not None:
+            # The store lives in a local directory.
+            remote_evaluator.prediction_store = None
+        self.evaluator_key = self.coordinator.put_object(remote_evaluator)
+        self.data_key = None if data_node is None else self.coordinator.put_object(data_node)
+
+    def submit(self, param, subsample_ratio=1.):
+        """
+        Queue the evaluation of a configuration or a data node.
+        :return: a future of (score, time_taken).
+        """
+        spec = {'evaluator': self.evaluator_key, 'subsample_ratio': subsample_ratio}
+        if isinstance(param, Configuration):
+            spec['config'], spec['data'] = param, self.data_key
+            return self.coordinator.submit(spec)
+
+        spec['config'], spec['data'] = None, self.coordinator.put_object(param)
+        future = self.coordinator.submit(spec)
+        # The candidate nodes are dropped once evaluated.
+        future.add_done_callback(lambda _, key=spec['data']: self.coordinator.drop_object(key))
+        return future
+
+    @staticmethod
+    def wait_any(futures, timeout=None):
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        return done
+
+    def parallel_execute(self, param_list, subsample_ratio=1.):
+        execution_stats = [self.submit(_param, subsample_ratio) for _param in param_list]
+        return [trial.result()[0] for trial in execution_stats]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a worker of automlToolkit.')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--authkey', type=str, default=None,
+                        help='the key of the coordinator, %s by default' % AUTHKEY_ENV)
+    parser.add_argument('--shared_dir', type=str, default=None)
+    parser.add_argument('--cache_dir', type=str, default=None)
+    parser.add_argument('--n_cores', type=int, default=None)
+    parser.add_argument('--heartbeat_interval', type=float, default=5.)
+    args = parser.parse_args()
+    worker = Worker((args.host, args.port), authkey=args.authkey,
+                    heartbeat_interval=args.heartbeat_interval, shared_dir=args.shared_dir,
+                    cache_dir=args.cache_dir, n_cores=args.n_cores)
+    worker.run()
@@ -1,8 +1,10 @@
 import time
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from ConfigSpace import Configuration
 
+from automlToolkit.components.computation.resource_manager import get_resource_manager
+
 
 def execute_func(params):
     start_time = time.time()
@@ -28,33 +30,28 @@ class ParallelExecutor(object):
     def update_evaluator(self, evaluator):
         self.evaluator = evaluator
 
-    def wait_tasks_finish(self, trial_stats):
-        all_completed = False
-        while not all_completed:
-            all_completed = True
-            for trial in trial_stats:
-                if not trial.done():
-                    all_completed = False
-                    time.sleep(0.1)
-                    break
+    def submit(self, param, subsample_ratio=1.):
+        """
+        Start the evaluation of a configuration or a data node as soon as a worker is free.
+        :return: a future of (score, time_taken).
+        """
+        return self.thread_pool.submit(self._execute, (self.evaluator, param, subsample_ratio))
+
+    def _execute(self, params):
+        # The workers share the core budget.
+        with get_resource_manager().allot(n_parallel=self.n_worker):
+            return execute_func(params)
+
+    @staticmethod
+    def wait_any(futures, timeout=None):
+        """
+        Block until at least one of the futures finishes.
+        :return: the set of finished futures.
+        """
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        return done
 
     def parallel_execute(self, param_list, subsample_ratio=1.):
-        n_configuration = len(param_list)
-        batch_size = self.n_worker
-        n_batch = n_configuration // batch_size + (1 if n_configuration % batch_size != 0 else 0)
-        evaluation_result = list()
-
-        for i in range(n_batch):
-            execution_stats = list()
-            for _param in param_list[i * batch_size: (i + 1) * batch_size]:
-                execution_stats.append(self.thread_pool.submit(execute_func,
-                                       (self.evaluator, _param, subsample_ratio)))
-            # wait a batch of trials finish
-            self.wait_tasks_finish(execution_stats)
-
-            # get the evaluation statistics
-            for trial in execution_stats:
-                assert (trial.done())
-                perf = trial.result()[0]
-                evaluation_result.append(perf)
-        return evaluation_result
+        # Submit all the trials at once, the pool hands the next one to a worker as soon as it is free.
+        execution_stats = [self.submit(_param, subsample_ratio) for _param in param_list]
+        return [trial.result()[0] for trial in execution_stats]
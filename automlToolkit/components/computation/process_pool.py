@@ -0,0 +1,189 @@
+import time
+import multiprocessing
+from collections import OrderedDict, deque
+from multiprocessing.connection import wait
+
+from automlToolkit.components.utils.constants import SUCCESS, ERROR, TIMEOUT
+from automlToolkit.utils.logging_utils import get_logger
+
+
+def _worker_loop(conn):
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+        task_id, func, args = task
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, '%s: %s' % (type(e).__name__, str(e))
+        try:
+            conn.send((task_id, result, error))
+        except Exception as e:
+            # E.g., the result cannot be pickled.
+            conn.send((task_id, None, '%s: %s' % (type(e).__name__, str(e))))
+
+
+class _Worker(object):
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn,))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        self.task_id = None
+        self.start_time = None
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class KillableProcessPool(object):
+    """
+    A pool of long-lived worker processes. Unlike ProcessPoolExecutor, a task that runs over
+    its time limit is stopped by terminating its worker, which is then replaced by a new one.
+    Usage:
+        task_id = pool.submit(func, *args)
+        for task_id, status, result, duration in pool.as_completed(time_limit=60):
+            ...
+    """
+
+    def __init__(self, n_workers=1, start_method=None):
+        self.n_workers = max(1, n_workers)
+        self.context = multiprocessing.get_context(start_method)
+        self.workers = list()
+        self.pending = deque()
+        self.running = OrderedDict()
+        self.task_cnt = 0
+        self.logger = get_logger('KillableProcessPool')
+
+    def _ensure_workers(self):
+        self.workers = [worker for worker in self.workers if worker.process.is_alive() or worker.task_id is not None]
+        while len(self.workers) < self.n_workers:
+            self.workers.append(_Worker(self.context))
+
+    def submit(self, func, *args):
+        """
+        Queue a call of func(*args). The function and its arguments must be picklable.
+        :return: the id of the task.
+        """
+        task_id = self.task_cnt
+        self.task_cnt += 1
+        self.pending.append((task_id, func, args))
+        return task_id
+
+    def cancel_pending(self):
+        """
+        Drop the tasks that have not started yet.
+        :return: the ids of the cancelled tasks.
+        """
+        cancelled = [task[0] for task in self.pending]
+        self.pending.clear()
+        return cancelled
+
+    def kill_running(self):
+        """
+        Stop the running tasks by terminating their workers.
+        :return: the ids of the killed tasks.
+        """
+        killed = list()
+        for worker in list(self.workers):
+            if worker.task_id is not None:
+                killed.append(worker.task_id)
+                self._replace(worker)
+        self.running.clear()
+        return killed
+
+    def _replace(self, worker):
+        worker.kill()
+        if worker in self.workers:
+            self.workers.remove(worker)
+            self.workers.append(_Worker(self.context))
+
+    def _dispatch(self):
+        self._ensure_workers()
+        for worker in self.workers:
+            if len(self.pending) == 0:
+                break
+            if worker.task_id is not None:
+                continue
+            task = self.pending.popleft()
+            try:
+                worker.conn.send(task)
+            except Exception as e:
+                # The task cannot be pickled or the worker is broken.
+                self.pending.appendleft(task)
+                if not worker.process.is_alive():
+                    self._replace(worker)
+                    return self._dispatch()
+                raise e
+            worker.task_id, worker.start_time = task[0], time.time()
+            self.running[task[0]] = worker
+
+    def as_completed(self, time_limit=None):
+        """
+        Run the queued tasks, and yield each one as soon as it finishes.
+        The caller may call cancel_pending or kill_running between two results.
+        :param time_limit: the time limit of each task in seconds, None means no limit.
+        :return: generator of (task_id, status, result or error message, duration).
+        """
+        while len(self.pending) > 0 or len(self.running) > 0:
+            self._dispatch()
+            busy_workers = list(self.running.values())
+            wait_time = None
+            if time_limit is not None:
+                deadline = min(worker.start_time for worker in busy_workers) + time_limit
+                wait_time = max(deadline - time.time(), 0.)
+            ready_conns = wait([worker.conn for worker in busy_workers] +
+                               [worker.process.sentinel for worker in busy_workers], timeout=wait_time)
+
+            for worker in busy_workers:
+                task_id, duration = worker.task_id, time.time() - worker.start_time
+                if task_id is None or self.running.get(task_id) is not worker:
+                    # Killed by the caller in the meantime.
+                    continue
+                if worker.conn in ready_conns:
+                    try:
+                        _, result, error = worker.conn.recv()
+                    except (EOFError, OSError):
+                        result, error = None, 'The worker exited unexpectedly.'
+                        self._replace(worker)
+                    worker.task_id = None
+                    del self.running[task_id]
+                    if error is None:
+                        yield task_id, SUCCESS, result, duration
+                    else:
+                        yield task_id, ERROR, error, duration
+                elif worker.process.sentinel in ready_conns:
+                    del self.running[task_id]
+                    self._replace(worker)
+                    yield task_id, ERROR, 'The worker exited with code %s.' % worker.process.exitcode, duration
+                elif time_limit is not None and duration >= time_limit:
+                    self.logger.info('Kill task %d after %.1f seconds.', task_id, duration)
+                    del self.running[task_id]
+                    self._replace(worker)
+                    yield task_id, TIMEOUT, 'Timed out!', duration
+
+                if task_id not in self.running and len(self.pending) > 0:
+                    # Keep the workers busy while the caller handles the results.
+                    self._dispatch()
+
+    def shutdown(self):
+        self.cancel_pending()
+        for worker in self.workers:
+            if worker.task_id is None and worker.process.is_alive():
+                try:
+                    worker.conn.send(None)
+                except (OSError, BrokenPipeError):
+                    pass
+        for worker in self.workers:
+            worker.process.join(timeout=1)
+            worker.kill()
+        self.workers = list()
+        self.running.clear()
@@ -0,0 +1,150 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from automlToolkit.utils.logging_utils import get_logger
+
+
+def get_cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_available_memory():
+    """
+    The available physical memory in bytes, or None if unknown.
+    """
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class ResourceManager(object):
+    """
+    Own the core budget of the process, and share it among the trials in flight.
+    A trial runs inside `allot`, which gives it a thread allotment: the estimators take it as n_jobs
+    through `get_n_jobs`, and the BLAS/OpenMP pools are limited to it with threadpoolctl, if installed.
+    The allotment shrinks as more trials start and grows back as they finish.
+    Usage:
+        with get_resource_manager().allot(n_parallel=n_workers):
+            score = evaluator(config)
+    """
+
+    def __init__(self, n_cores=None, limit_blas=True):
+        """
+        :param n_cores: the core budget, all the usable cores by default.
+        :param limit_blas: whether to limit the BLAS/OpenMP pools to the allotment.
+        """
+        self.n_cores = get_cpu_count() if n_cores is None else max(1, int(n_cores))
+        self.limit_blas = limit_blas
+        self.pid = os.getpid()
+        self.n_running = 0
+        self.n_parallel = dict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._blas_limiter = None
+        self._blas_limit = None
+        self.logger = get_logger('ResourceManager')
+
+    def get_allotment(self):
+        with self._lock:
+            return self._get_allotment()
+
+    def _get_allotment(self):
+        # The expected parallelism counts the trials that are about to start as well.
+        n_parallel = max([self.n_running] + list(self.n_parallel.values()))
+        return max(1, self.n_cores // max(1, n_parallel))
+
+    def get_n_jobs(self, n_jobs=-1):
+        """
+        The number of threads for an estimator of the current trial.
+        :param n_jobs: the number requested by the estimator, None or -1 means as many as possible.
+        """
+        allotment = getattr(self._local, 'allotment', None)
+        if allotment is None:
+            allotment = self.get_allotment()
+        if n_jobs is None or n_jobs < 0:
+            return allotment
+        return max(1, min(n_jobs, allotment))
+
+    @contextmanager
+    def allot(self, n_parallel=1):
+        """
+        Run a trial with its share of the core budget.
+        :param n_parallel: the number of trials expected to run alongside, e.g., the number of workers.
+        :return: the thread allotment of the trial.
+        """
+        token = object()
+        with self._lock:
+            self.n_running += 1
+            self.n_parallel[id(token)] = n_parallel
+            allotment = self._get_allotment()
+            self._update_blas_limit()
+        previous = getattr(self._local, 'allotment', None)
+        self._local.allotment = allotment if previous is None else min(previous, allotment)
+        try:
+            yield self._local.allotment
+        finally:
+            self._local.allotment = previous
+            with self._lock:
+                self.n_running -= 1
+                self.n_parallel.pop(id(token), None)
+                self._update_blas_limit()
+
+    def _update_blas_limit(self):
+        # The BLAS/OpenMP pools are shared by the threads of the process, so they follow the current allotment.
+        if not self.limit_blas:
+            return
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            self.logger.debug('threadpoolctl is not installed, the BLAS/OpenMP pools are not limited.')
+            self.limit_blas = False
+            return
+
+        if self.n_running == 0:
+            if self._blas_limiter is not None:
+                self._blas_limiter.restore_original_limits()
+                self._blas_limiter, self._blas_limit = None, None
+            return
+        limit = self._get_allotment()
+        if limit == self._blas_limit:
+            return
+        limiter = threadpool_limits(limits=limit)
+        if self._blas_limiter is None:
+            # Keep the first limiter, it holds the original limits.
+            self._blas_limiter = limiter
+        self._blas_limit = limit
+
+
+_resource_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_resource_manager():
+    global _resource_manager
+    with _manager_lock:
+        if _resource_manager is None:
+            _resource_manager = ResourceManager()
+        elif _resource_manager.pid != os.getpid():
+            # A forked worker starts with no trial in flight, and its own share of the budget.
+            _resource_manager = ResourceManager(_resource_manager.n_cores, _resource_manager.limit_blas)
+        return _resource_manager
+
+
+def set_core_budget(n_cores=None, limit_blas=True):
+    """
+    Set the number of cores shared by the trials of this process.
+    """
+    global _resource_manager
+    with _manager_lock:
+        _resource_manager = ResourceManager(n_cores, limit_blas=limit_blas)
+        return _resource_manager
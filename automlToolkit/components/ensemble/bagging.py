@@ -14,13 +14,15 @@ class Bagging(BaseEnsembleModel):
                  ensemble_size: int,
                  task_type: int,
                  metric: _BaseScorer,
-                 output_dir=None):
+                 output_dir=None,
+                 prediction_store=None):
         super().__init__(stats=stats,
                          ensemble_method='bagging',
                          ensemble_size=ensemble_size,
                          task_type=task_type,
                          metric=metric,
-                         output_dir=output_dir)
+                         output_dir=output_dir,
+                         prediction_store=prediction_store)
 
     def fit(self, datanode):
         model_cnt = 0
@@ -31,7 +33,9 @@ class Bagging(BaseEnsembleModel):
                 X, y = train_list[idx].data
                 for _config in configs:
                     if self.base_model_mask[model_cnt] == 1:
-                        estimator = fetch_predict_estimator(self.task_type, _config, X, y)
+                        estimator = fetch_predict_estimator(self.task_type, _config, X, y,
+                                                            prediction_store=self.prediction_store,
+                                                            trial_key=self.model_keys[model_cnt])
                         with open(os.path.join(self.output_dir, '%s-bagging-model%d' % (self.timestamp, model_cnt)), 'wb') as f:
                             pkl.dump(estimator, f)
                     model_cnt += 1
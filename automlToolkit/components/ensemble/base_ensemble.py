@@ -7,6 +7,7 @@ import time
 
 from automlToolkit.components.utils.constants import CLS_TASKS
 from automlToolkit.components.evaluators.base_evaluator import fetch_predict_estimator
+from automlToolkit.components.evaluators.prediction_store import get_trial_key
 from automlToolkit.components.ensemble.unnamed_ensemble import choose_base_models_classification, \
     choose_base_models_regression
 
@@ -19,7 +20,8 @@ class BaseEnsembleModel(object):
                  task_type: int,
                  metric: _BaseScorer,
                  save_model=False,
-                 output_dir=None):
+                 output_dir=None,
+                 prediction_store=None):
         self.stats = stats
         self.ensemble_method = ensemble_method
         self.ensemble_size = ensemble_size
@@ -35,23 +37,25 @@ class BaseEnsembleModel(object):
         self.train_labels = None
         self.seed = self.stats['split_seed']
         self.timestamp = str(time.time())
+        self.prediction_store = prediction_store
+
+        # The trial keys of the candidates in the prediction store.
+        self.model_keys = []
+        for algo_id in self.stats["include_algorithms"]:
+            for train_node in self.stats[algo_id]['train_data_list']:
+                for _config in self.stats[algo_id]['configurations']:
+                    key = None if prediction_store is None else get_trial_key(train_node, _config)
+                    self.model_keys.append(key)
+        self.valid_index = self.get_valid_index()
+
         for algo_id in self.stats["include_algorithms"]:
             train_list = self.stats[algo_id]['train_data_list']
             configs = self.stats[algo_id]['configurations']
             for idx in range(len(train_list)):
                 X, y = train_list[idx].data
-
-                # TODO: Hyperparameter
-                test_size = 0.2
-
-                if self.task_type in CLS_TASKS:
-                    ss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
-                else:
-                    ss = ShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
-
-                for train_index, test_index in ss.split(X, y):
-                    X_train, X_valid = X[train_index], X[test_index]
-                    y_train, y_valid = y[train_index], y[test_index]
+                train_index = np.setdiff1d(np.arange(len(y)), self.valid_index)
+                X_train, X_valid = X[train_index], X[self.valid_index]
+                y_train, y_valid = y[train_index], y[self.valid_index]
 
                 if self.train_labels is not None:
                     assert (self.train_labels == y_valid).all()
@@ -61,16 +65,22 @@ class BaseEnsembleModel(object):
                 for _config in configs:
                     self.config_list.append(_config)
                     self.train_data_dict[self.model_cnt] = (X, y)
-                    estimator = fetch_predict_estimator(self.task_type, _config, X_train, y_train)
-                    if self.save_model:
-                        with open(os.path.join(self.output_dir, '%s-model%d' % (self.timestamp, self.model_cnt)),
-                                  'wb') as f:
-                            pkl.dump(estimator, f)
-                    if self.task_type in CLS_TASKS:
-                        y_valid_pred = estimator.predict_proba(X_valid)
-                    else:
-                        y_valid_pred = estimator.predict(X_valid)
-                    self.train_predictions.append(y_valid_pred)
+                    y_valid_pred = None
+                    if self.model_keys[self.model_cnt] is not None:
+                        y_valid_pred = prediction_store.get_predictions(self.model_keys[self.model_cnt],
+                                                                        self.valid_index)
+                    if y_valid_pred is None:
+                        estimator = fetch_predict_estimator(self.task_type, _config, X_train, y_train,
+                                                            prediction_store=prediction_store,
+                                                            trial_key=self.model_keys[self.model_cnt])
+                        if self.save_model:
+                            with open(self.get_model_path(self.model_cnt), 'wb') as f:
+                                pkl.dump([estimator], f)
+                        if self.task_type in CLS_TASKS:
+                            y_valid_pred = estimator.predict_proba(X_valid)
+                        else:
+                            y_valid_pred = estimator.predict(X_valid)
+                    self.train_predictions.append(np.asarray(y_valid_pred, dtype=np.float64))
                     self.model_cnt += 1
         if len(self.train_predictions) < self.ensemble_size:
             self.ensemble_size = len(self.train_predictions)
@@ -82,10 +92,69 @@ class BaseEnsembleModel(object):
             self.base_model_mask = choose_base_models_classification(np.array(self.train_predictions),
                                                                      self.ensemble_size)
         else:
-            self.base_model_mask = choose_base_models_regression(np.array(self.train_predictions), np.array(y_valid),
+            self.base_model_mask = choose_base_models_regression(np.array(self.train_predictions),
+                                                                 np.array(self.train_labels),
                                                                  self.ensemble_size)
         self.ensemble_size = sum(self.base_model_mask)
 
+    def get_valid_index(self):
+        """
+        Choose the validation rows shared by all the candidates. The holdout rows of the recorded trials
+        are preferred, so their predictions are used as they are; the out-of-fold predictions cover any rows.
+        """
+        first_algo_id = self.stats["include_algorithms"][0]
+        y = self.stats[first_algo_id]['train_data_list'][0].data[1]
+        for key in self.model_keys:
+            if key is None:
+                continue
+            index = self.prediction_store.get_index(key)
+            if index is not None and 0 < len(index) < len(y):
+                return index
+
+        # TODO: Hyperparameter
+        test_size = 0.2
+
+        if self.task_type in CLS_TASKS:
+            ss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
+        else:
+            ss = ShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
+        _, test_index = next(ss.split(y, y))
+        return np.sort(test_index)
+
+    def get_model_path(self, model_cnt):
+        return os.path.join(self.output_dir, '%s-model%d' % (self.timestamp, model_cnt))
+
+    def fetch_estimators(self, model_cnt):
+        """
+        Get the fitted models of a candidate: saved by the ensemble, recorded by the evaluators,
+        or else trained on the rows out of the validation set.
+        :return: a list of estimators, whose predictions are averaged.
+        """
+        path = self.get_model_path(model_cnt)
+        if self.output_dir is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                return pkl.load(f)
+
+        estimators = None
+        if self.model_keys[model_cnt] is not None:
+            estimators = self.prediction_store.get_models(self.model_keys[model_cnt])
+        if not estimators:
+            X, y = self.train_data_dict[model_cnt]
+            train_index = np.setdiff1d(np.arange(len(y)), self.valid_index)
+            estimators = [fetch_predict_estimator(self.task_type, self.config_list[model_cnt],
+                                                  X[train_index], y[train_index],
+                                                  prediction_store=self.prediction_store,
+                                                  trial_key=self.model_keys[model_cnt])]
+        if self.save_model:
+            with open(path, 'wb') as f:
+                pkl.dump(estimators, f)
+        return estimators
+
+    def predict_with_estimators(self, estimators, X):
+        if self.task_type in CLS_TASKS:
+            return np.mean([estimator.predict_proba(X) for estimator in estimators], axis=0)
+        return np.mean([estimator.predict(X) for estimator in estimators], axis=0)
+
     def fit(self, data):
         raise NotImplementedError
 
@@ -1,13 +1,9 @@
 import numpy as np
 import warnings
-import os
-import pickle as pkl
-from sklearn.model_selection import train_test_split
 from sklearn.metrics.scorer import _BaseScorer
 
 from automlToolkit.components.ensemble.base_ensemble import BaseEnsembleModel
 from automlToolkit.components.utils.constants import CLS_TASKS
-from automlToolkit.components.evaluators.base_evaluator import fetch_predict_estimator
 
 
 class Blending(BaseEnsembleModel):
@@ -16,13 +12,17 @@ class Blending(BaseEnsembleModel):
                  task_type: int,
                  metric: _BaseScorer,
                  output_dir=None,
-                 meta_learner='xgboost'):
+                 meta_learner='xgboost',
+                 prediction_store=None):
+        # The base models are kept, they make the features of the meta-learner at prediction.
         super().__init__(stats=stats,
                          ensemble_method='blending',
                          ensemble_size=ensemble_size,
                          task_type=task_type,
                          metric=metric,
-                         output_dir=output_dir)
+                         save_model=True,
+                         output_dir=output_dir,
+                         prediction_store=prediction_store)
         try:
             from xgboost import XGBClassifier
         except:
@@ -50,55 +50,36 @@ class Blending(BaseEnsembleModel):
                 self.meta_learner = XGBRegressor(max_depth=4, learning_rate=0.05, n_estimators=70)
 
     def fit(self, data):
-        # Split training data for phase 1 and phase 2
-        test_size = 0.2
-
-        # Train basic models using a part of training data
-        model_cnt = 0
-        suc_cnt = 0
+        # The base models are trained out of the validation rows (or recorded by the evaluators),
+        # and their validation predictions are the training data of the meta-learner.
         feature_p2 = None
-        for algo_id in self.stats["include_algorithms"]:
-            train_list = self.stats[algo_id]['train_data_list']
-            configs = self.stats[algo_id]['configurations']
-            for idx in range(len(train_list)):
-                X, y = train_list[idx].data
-                if self.task_type in CLS_TASKS:
-                    x_p1, x_p2, y_p1, y_p2 = train_test_split(X, y, test_size=test_size,
-                                                              stratify=data.data[1], random_state=self.seed)
+        suc_cnt = 0
+        for model_cnt, pred in enumerate(self.train_predictions):
+            if self.base_model_mask[model_cnt] != 1:
+                continue
+            if self.task_type in CLS_TASKS:
+                n_dim = np.array(pred).shape[1]
+                if n_dim == 2:
+                    # Binary classificaion
+                    n_dim = 1
+                # Initialize training matrix for phase 2
+                if feature_p2 is None:
+                    num_samples = len(pred)
+                    feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
+                if n_dim == 1:
+                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred[:, 1:2]
                 else:
-                    x_p1, x_p2, y_p1, y_p2 = train_test_split(X, y, test_size=test_size,
-                                                              random_state=self.seed)
-                for _config in configs:
-                    if self.base_model_mask[model_cnt] == 1:
-                        estimator = fetch_predict_estimator(self.task_type, _config, x_p1, y_p1)
-                        with open(os.path.join(self.output_dir, '%s-blending-model%d' % (self.timestamp, model_cnt)),
-                                  'wb') as f:
-                            pkl.dump(estimator, f)
-                        if self.task_type in CLS_TASKS:
-                            pred = estimator.predict_proba(x_p2)
-                            n_dim = np.array(pred).shape[1]
-                            if n_dim == 2:
-                                # Binary classificaion
-                                n_dim = 1
-                            # Initialize training matrix for phase 2
-                            if feature_p2 is None:
-                                num_samples = len(x_p2)
-                                feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                            if n_dim == 1:
-                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred[:, 1:2]
-                            else:
-                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
-                        else:
-                            pred = estimator.predict(x_p2).reshape(-1, 1)
-                            n_dim = 1
-                            # Initialize training matrix for phase 2
-                            if feature_p2 is None:
-                                num_samples = len(x_p2)
-                                feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                            feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
-                        suc_cnt += 1
-                    model_cnt += 1
-        self.meta_learner.fit(feature_p2, y_p2)
+                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
+            else:
+                pred = pred.reshape(-1, 1)
+                n_dim = 1
+                # Initialize training matrix for phase 2
+                if feature_p2 is None:
+                    num_samples = len(pred)
+                    feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
+                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
+            suc_cnt += 1
+        self.meta_learner.fit(feature_p2, self.train_labels)
 
         return self
 
@@ -114,11 +95,8 @@ class Blending(BaseEnsembleModel):
                 test_node = solvers[algo_id].optimizer['fe'].apply(data, train_node)
                 for _ in configs:
                     if self.base_model_mask[model_cnt] == 1:
-                        with open(os.path.join(self.output_dir, '%s-blending-model%d' % (self.timestamp, model_cnt)),
-                                  'rb') as f:
-                            estimator = pkl.load(f)
+                        pred = self.predict_with_estimators(self.fetch_estimators(model_cnt), test_node.data[0])
                         if self.task_type in CLS_TASKS:
-                            pred = estimator.predict_proba(test_node.data[0])
                             n_dim = np.array(pred).shape[1]
                             if n_dim == 2:
                                 # Binary classificaion
@@ -132,7 +110,7 @@ class Blending(BaseEnsembleModel):
                             else:
                                 feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
                         else:
-                            pred = estimator.predict(test_node.data[0]).reshape(-1, 1)
+                            pred = pred.reshape(-1, 1)
                             n_dim = 1
                             # Initialize training matrix for phase 2
                             if feature_p2 is None:
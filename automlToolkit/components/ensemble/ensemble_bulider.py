@@ -14,32 +14,37 @@ class EnsembleBuilder:
                  ensemble_size: int,
                  task_type: int,
                  metric: _BaseScorer,
-                 output_dir=None):
+                 output_dir=None,
+                 prediction_store=None):
         self.model = None
         if ensemble_method == 'bagging':
             self.model = Bagging(stats=stats,
                                  ensemble_size=ensemble_size,
                                  task_type=task_type,
                                  metric=metric,
-                                 output_dir=output_dir)
+                                 output_dir=output_dir,
+                                 prediction_store=prediction_store)
         elif ensemble_method == 'blending':
             self.model = Blending(stats=stats,
                                   ensemble_size=ensemble_size,
                                   task_type=task_type,
                                   metric=metric,
-                                  output_dir=output_dir)
+                                  output_dir=output_dir,
+                                  prediction_store=prediction_store)
         elif ensemble_method == 'stacking':
             self.model = Stacking(stats=stats,
                                   ensemble_size=ensemble_size,
                                   task_type=task_type,
                                   metric=metric,
-                                  output_dir=output_dir)
+                                  output_dir=output_dir,
+                                  prediction_store=prediction_store)
         elif ensemble_method == 'ensemble_selection':
             self.model = EnsembleSelection(stats=stats,
                                            ensemble_size=ensemble_size,
                                            task_type=task_type,
                                            metric=metric,
-                                           output_dir=output_dir)
+                                           output_dir=output_dir,
+                                           prediction_store=prediction_store)
         else:
             raise ValueError("%s is not supported for ensemble!" % ensemble_method)
 
@@ -1,7 +1,5 @@
 from collections import Counter
-import os
 import numpy as np
-import pickle as pkl
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.metrics.scorer import _BaseScorer, _PredictScorer, _ThresholdScorer
 
@@ -18,7 +16,8 @@ class EnsembleSelection(BaseEnsembleModel):
             output_dir=None,
             sorted_initialization: bool = False,
             bagging: bool = False,
-            mode: str = 'fast'
+            mode: str = 'fast',
+            prediction_store=None
     ):
         super().__init__(stats=stats,
                          ensemble_method='ensemble_selection',
@@ -26,7 +25,8 @@ class EnsembleSelection(BaseEnsembleModel):
                          task_type=task_type,
                          metric=metric,
                          save_model=True,
-                         output_dir=output_dir)
+                         output_dir=output_dir,
+                         prediction_store=prediction_store)
         self.sorted_initialization = sorted_initialization
         self.bagging = bagging
         self.mode = mode
@@ -62,6 +62,9 @@ class EnsembleSelection(BaseEnsembleModel):
             self._fit(self.train_predictions, self.train_labels)
         self._calculate_weights()
         self.identifiers_ = None
+        # Only the selected models are needed for prediction.
+        for model_cnt in np.nonzero(self.weights_)[0]:
+            self.fetch_estimators(model_cnt)
         return self
 
     def _fit(self, predictions, labels):
@@ -200,15 +203,15 @@ class EnsembleSelection(BaseEnsembleModel):
         cur_idx = 0
         for algo_id in self.stats["include_algorithms"]:
             for train_node in self.stats[algo_id]['train_data_list']:
+                n_configs = len(self.stats[algo_id]['configurations'])
+                if np.count_nonzero(self.weights_[cur_idx: cur_idx + n_configs]) == 0:
+                    cur_idx += n_configs
+                    continue
                 test_node = solvers[algo_id].optimizer['fe'].apply(data, train_node)
                 X_test, _ = test_node.data
-                for _ in self.stats[algo_id]['configurations']:
-                    with open(os.path.join(self.output_dir, '%s-model%d' % (self.timestamp, cur_idx)), 'rb') as f:
-                        estimator = pkl.load(f)
-                        if self.task_type in CLS_TASKS:
-                            predictions.append(estimator.predict_proba(X_test))
-                        else:
-                            predictions.append(estimator.predict(X_test))
+                for _ in range(n_configs):
+                    if self.weights_[cur_idx] > 0:
+                        predictions.append(self.predict_with_estimators(self.fetch_estimators(cur_idx), X_test))
                     cur_idx += 1
         predictions = np.asarray(predictions)
 
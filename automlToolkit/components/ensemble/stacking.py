@@ -17,13 +17,15 @@ class Stacking(BaseEnsembleModel):
                  metric: _BaseScorer,
                  output_dir=None,
                  meta_learner='xgboost',
-                 kfold=5):
+                 kfold=5,
+                 prediction_store=None):
         super().__init__(stats=stats,
                          ensemble_method='blending',
                          ensemble_size=ensemble_size,
                          task_type=task_type,
                          metric=metric,
-                         output_dir=output_dir)
+                         output_dir=output_dir,
+                         prediction_store=prediction_store)
 
         self.kfold = kfold
         try:
@@ -52,6 +54,30 @@ class Stacking(BaseEnsembleModel):
                 from xgboost import XGBRegressor
                 self.meta_learner = XGBRegressor(max_depth=4, learning_rate=0.05, n_estimators=70)
 
+    def get_oof_predictions(self, model_cnt, kf):
+        """
+        Get the out-of-fold predictions of a candidate on all the rows and its fold models.
+        The cross-validation records of the evaluators are used when available.
+        """
+        X, y = self.train_data_dict[model_cnt]
+        key = self.model_keys[model_cnt]
+        if key is not None:
+            oof_pred = self.prediction_store.get_predictions(key, np.arange(len(y)))
+            estimators = self.prediction_store.get_models(key)
+            if oof_pred is not None and estimators:
+                return np.asarray(oof_pred, dtype=np.float64), estimators
+
+        oof_pred, estimators = None, list()
+        for train, test in kf.split(X, y):
+            estimator = fetch_predict_estimator(self.task_type, self.config_list[model_cnt], X[train], y[train],
+                                                prediction_store=self.prediction_store, trial_key=key)
+            estimators.append(estimator)
+            pred = self.predict_with_estimators([estimator], X[test])
+            if oof_pred is None:
+                oof_pred = np.zeros((len(y),) + pred.shape[1:])
+            oof_pred[test] = pred
+        return oof_pred, estimators
+
     def fit(self, data):
         # Split training data for phase 1 and phase 2
         if self.task_type in CLS_TASKS:
@@ -60,47 +86,35 @@ class Stacking(BaseEnsembleModel):
             kf = KFold(n_splits=self.kfold)
 
         # Train basic models using a part of training data
-        model_cnt = 0
         suc_cnt = 0
         feature_p2 = None
-        for algo_id in self.stats["include_algorithms"]:
-            train_list = self.stats[algo_id]['train_data_list']
-            configs = self.stats[algo_id]['configurations']
-            for idx in range(len(train_list)):
-                X, y = train_list[idx].data
-                for _config in configs:
-                    if self.base_model_mask[model_cnt] == 1:
-                        for j, (train, test) in enumerate(kf.split(X, y)):
-                            x_p1, x_p2, y_p1, _ = X[train], X[test], y[train], y[test]
-                            estimator = fetch_predict_estimator(self.task_type, _config, x_p1, y_p1)
-                            with open(
-                                    os.path.join(self.output_dir, '%s-model%d_part%d' % (self.timestamp, model_cnt, j)),
-                                    'wb') as f:
-                                pkl.dump(estimator, f)
-                            if self.task_type in CLS_TASKS:
-                                pred = estimator.predict_proba(x_p2)
-                                n_dim = np.array(pred).shape[1]
-                                if n_dim == 2:
-                                    # Binary classificaion
-                                    n_dim = 1
-                                # Initialize training matrix for phase 2
-                                if feature_p2 is None:
-                                    num_samples = len(train) + len(test)
-                                    feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                                if n_dim == 1:
-                                    feature_p2[test, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred[:, 1:2]
-                                else:
-                                    feature_p2[test, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
-                            else:
-                                pred = estimator.predict(x_p2).reshape(-1, 1)
-                                n_dim = 1
-                                # Initialize training matrix for phase 2
-                                if feature_p2 is None:
-                                    num_samples = len(train) + len(test)
-                                    feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                                feature_p2[test, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
-                        suc_cnt += 1
-                    model_cnt += 1
+        y = None
+        for model_cnt in range(self.model_cnt):
+            if self.base_model_mask[model_cnt] != 1:
+                continue
+            y = self.train_data_dict[model_cnt][1]
+            pred, estimators = self.get_oof_predictions(model_cnt, kf)
+            with open(os.path.join(self.output_dir, '%s-model%d_parts' % (self.timestamp, model_cnt)), 'wb') as f:
+                pkl.dump(estimators, f)
+            if self.task_type in CLS_TASKS:
+                n_dim = np.array(pred).shape[1]
+                if n_dim == 2:
+                    # Binary classificaion
+                    n_dim = 1
+                # Initialize training matrix for phase 2
+                if feature_p2 is None:
+                    feature_p2 = np.zeros((len(y), self.ensemble_size * n_dim))
+                if n_dim == 1:
+                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred[:, 1:2]
+                else:
+                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
+            else:
+                n_dim = 1
+                # Initialize training matrix for phase 2
+                if feature_p2 is None:
+                    feature_p2 = np.zeros((len(y), self.ensemble_size * n_dim))
+                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred.reshape(-1, 1)
+            suc_cnt += 1
         # Train model for stacking using the other part of training data
         self.meta_learner.fit(feature_p2, y)
         return self
@@ -117,37 +131,29 @@ class Stacking(BaseEnsembleModel):
                 test_node = solvers[algo_id].optimizer['fe'].apply(data, train_node)
                 for _ in configs:
                     if self.base_model_mask[model_cnt] == 1:
-                        for j in range(self.kfold):
-                            with open(
-                                    os.path.join(self.output_dir, '%s-model%d_part%d' % (self.timestamp, model_cnt, j)),
-                                    'rb') as f:
-                                estimator = pkl.load(f)
-                            if self.task_type in CLS_TASKS:
-                                pred = estimator.predict_proba(test_node.data[0])
-                                n_dim = np.array(pred).shape[1]
-                                if n_dim == 2:
-                                    n_dim = 1
-                                if feature_p2 is None:
-                                    num_samples = len(test_node.data[0])
-                                    feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                                # Get average predictions
-                                if n_dim == 1:
-                                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = \
-                                        feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] + pred[:,
-                                                                                               1:2] / self.kfold
-                                else:
-                                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = \
-                                        feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] + pred / self.kfold
-                            else:
-                                pred = estimator.predict(test_node.data[0]).reshape(-1, 1)
+                        with open(os.path.join(self.output_dir, '%s-model%d_parts' % (self.timestamp, model_cnt)),
+                                  'rb') as f:
+                            estimators = pkl.load(f)
+                        # Get average predictions of the fold models
+                        pred = self.predict_with_estimators(estimators, test_node.data[0])
+                        if self.task_type in CLS_TASKS:
+                            n_dim = np.array(pred).shape[1]
+                            if n_dim == 2:
                                 n_dim = 1
-                                # Initialize training matrix for phase 2
-                                if feature_p2 is None:
-                                    num_samples = len(test_node.data[0])
-                                    feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                                # Get average predictions
-                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = \
-                                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] + pred / self.kfold
+                            if feature_p2 is None:
+                                num_samples = len(test_node.data[0])
+                                feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
+                            if n_dim == 1:
+                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred[:, 1:2]
+                            else:
+                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
+                        else:
+                            n_dim = 1
+                            # Initialize training matrix for phase 2
+                            if feature_p2 is None:
+                                num_samples = len(test_node.data[0])
+                                feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
+                            feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred.reshape(-1, 1)
                         suc_cnt += 1
                     model_cnt += 1
         return feature_p2
@@ -32,7 +32,14 @@ def holdout_validation(estimator, scorer, X, y, train_size=0.3, random_state=1):
         return scorer(estimator, X_test, y_test)
 
 
-def fetch_predict_estimator(task_type, config, X_train, y_train):
+def fetch_predict_estimator(task_type, config, X_train, y_train, prediction_store=None, data_node=None,
+                            trial_key=None):
+    """
+    Train the estimator of a configuration.
+    :param prediction_store: the store of the trials, if given, a boosting model trains as many rounds as
+        the early stopping kept in the trial of the configuration on data_node.
+    :param trial_key: the key of the trial, computed from data_node and config if not given.
+    """
     # Build the ML estimator.
     from automlToolkit.components.utils.balancing import get_weights
     _init_params, _fit_params = get_weights(
@@ -46,6 +53,14 @@ def fetch_predict_estimator(task_type, config, X_train, y_train):
     else:
         from automlToolkit.components.evaluators.reg_evaluator import get_estimator
     _, estimator = get_estimator(config_dict)
+    best_iteration = None
+    if prediction_store is not None and (trial_key is not None or data_node is not None):
+        from automlToolkit.components.evaluators.prediction_store import get_trial_key
+        trial_key = get_trial_key(data_node, config) if trial_key is None else trial_key
+        best_iteration = prediction_store.get_best_iteration(trial_key)
+    if best_iteration is not None and hasattr(estimator, 'n_estimators'):
+        # Train as many rounds as the early stopping kept during the search.
+        estimator.n_estimators = best_iteration
 
     estimator.fit(X_train, y_train, **_fit_params)
     return estimator
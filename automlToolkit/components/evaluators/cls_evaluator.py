@@ -3,8 +3,12 @@ import numpy as np
 from sklearn.metrics.scorer import balanced_accuracy_scorer
 
 from automlToolkit.utils.logging_utils import get_logger
+from automlToolkit.utils.tracing import traced
 from automlToolkit.components.evaluators.base_evaluator import _BaseEvaluator
-from automlToolkit.components.evaluators.evaluate_func import holdout_validation, cross_validation, partial_validation
+from automlToolkit.components.evaluators.evaluate_func import holdout_validation, cross_validation, \
+    partial_validation, FoldRace
+from automlToolkit.components.evaluators.prediction_store import get_trial_key
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 def get_estimator(config):
@@ -18,13 +22,15 @@ def get_estimator(config):
     except:
         estimator = _addons.components[classifier_type](**config_)
     if hasattr(estimator, 'n_jobs'):
-        setattr(estimator, 'n_jobs', 4)
+        # The share of the core budget for the current trial.
+        setattr(estimator, 'n_jobs', get_resource_manager().get_n_jobs())
     return classifier_type, estimator
 
 
 class ClassificationEvaluator(_BaseEvaluator):
     def __init__(self, clf_config, scorer=None, data_node=None, name=None,
-                 resampling_strategy='cv', resampling_params=None, seed=1):
+                 resampling_strategy='cv', resampling_params=None, seed=1, prediction_store=None,
+                 early_stopping_rounds=20):
         self.resampling_strategy = resampling_strategy
         self.resampling_params = resampling_params
         self.clf_config = clf_config
@@ -32,6 +38,12 @@ class ClassificationEvaluator(_BaseEvaluator):
         self.data_node = data_node
         self.name = name
         self.seed = seed
+        self.prediction_store = prediction_store
+        # The patience of the boosting models on the validation set, None disables the early stopping.
+        self.early_stopping_rounds = early_stopping_rounds
+        # Race the folds of the cross-validation against the incumbent, if a racing rule is given.
+        racing = None if resampling_params is None else resampling_params.get('racing')
+        self.fold_race = None if racing is None else FoldRace(rule=racing)
         self.eval_id = 0
         self.logger = get_logger('Evaluator-%s' % self.name)
         self.init_params = None
@@ -44,6 +56,7 @@ class ClassificationEvaluator(_BaseEvaluator):
         self.init_params = _init_params
         self.fit_params = _fit_params
 
+    @traced('evaluator', category='evaluator')
     def __call__(self, config, **kwargs):
         start_time = time.time()
         if self.name is None:
@@ -74,17 +87,28 @@ class ClassificationEvaluator(_BaseEvaluator):
 
         classifier_id, clf = get_estimator(config_dict)
 
+        # Record the validation predictions for the ensembles.
+        store_params = dict()
+        if self.prediction_store is not None:
+            store_params = {'prediction_store': self.prediction_store,
+                            'trial_key': get_trial_key(data_node, config)}
+
         try:
             if self.resampling_strategy == 'cv':
                 if self.resampling_params is None or 'folds' not in self.resampling_params:
                     folds = 5
                 else:
                     folds = self.resampling_params['folds']
+                cv_n_jobs = 1 if self.resampling_params is None else self.resampling_params.get('n_jobs', 1)
                 score = cross_validation(clf, self.scorer, X_train, y_train,
                                          n_fold=folds,
+                                         n_jobs=cv_n_jobs,
+                                         fold_race=self.fold_race,
                                          random_state=self.seed,
                                          if_stratify=True,
-                                         fit_params=self.fit_params)
+                                         fit_params=self.fit_params,
+                                         early_stopping_rounds=self.early_stopping_rounds,
+                                         **store_params)
             elif self.resampling_strategy == 'holdout':
                 if self.resampling_params is None or 'test_size' not in self.resampling_params:
                     test_size = 0.33
@@ -94,7 +118,9 @@ class ClassificationEvaluator(_BaseEvaluator):
                                            test_size=test_size,
                                            random_state=self.seed,
                                            if_stratify=True,
-                                           fit_params=self.fit_params)
+                                           fit_params=self.fit_params,
+                                           early_stopping_rounds=self.early_stopping_rounds,
+                                           **store_params)
             elif self.resampling_strategy == 'partial':
                 if self.resampling_params is None or 'test_size' not in self.resampling_params:
                     test_size = 0.33
@@ -104,19 +130,25 @@ class ClassificationEvaluator(_BaseEvaluator):
                                            test_size=test_size,
                                            random_state=self.seed,
                                            if_stratify=True,
-                                           fit_params=self.fit_params)
+                                           fit_params=self.fit_params,
+                                           early_stopping_rounds=self.early_stopping_rounds,
+                                           **store_params)
             else:
                 raise ValueError('Invalid resampling strategy: %s!' % self.resampling_strategy)
+            best_iteration = getattr(clf, 'best_iteration_', None)
+            if best_iteration is not None and downsample_ratio == 1 and self.prediction_store is not None:
+                # The refit of this trial trains as many rounds, see fetch_predict_estimator.
+                self.prediction_store.add_best_iteration(store_params['trial_key'], best_iteration)
         except Exception as e:
             if self.name == 'fe':
                 raise e
-            self.logger.info('%s-evaluator: %s' % (self.name, str(e)))
+            self.logger.info('%s-evaluator: %s', self.name, str(e))
             score = 0.
 
         fmt_str = '\n' + ' ' * 5 + '==> '
-        self.logger.debug('%s%d-Evaluation<%s> | Score: %.4f | Time cost: %.2f seconds | Shape: %s' %
-                          (fmt_str, self.eval_id, classifier_id,
-                           score, time.time() - start_time, X_train.shape))
+        self.logger.debug('%s%d-Evaluation<%s> | Score: %.4f | Time cost: %.2f seconds | Shape: %s',
+                          fmt_str, self.eval_id, classifier_id,
+                          score, time.time() - start_time, X_train.shape)
         self.eval_id += 1
 
         if self.name == 'hpo':
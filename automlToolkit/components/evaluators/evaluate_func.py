@@ -1,13 +1,164 @@
+import copy
 import warnings
+import threading
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sklearn.model_selection import StratifiedKFold, KFold, StratifiedShuffleSplit, ShuffleSplit
 from sklearn.utils.testing import ignore_warnings
 from sklearn.exceptions import ConvergenceWarning
 
+from automlToolkit.utils.tracing import span
+from automlToolkit.components.computation.resource_manager import get_resource_manager, get_available_memory
+
+
+def _fit(estimator, scorer, train_x, train_y, valid_x, valid_y, fit_params, early_stopping_rounds=None):
+    """
+    Fit the estimator, the boosting models stop early on the validation set if early_stopping_rounds is set.
+    :return: the best iteration, or None.
+    """
+    if early_stopping_rounds is not None and hasattr(estimator, 'fit_with_early_stopping'):
+        estimator.fit_with_early_stopping(train_x, train_y, valid_x, valid_y, scorer=scorer,
+                                          patience=early_stopping_rounds, **fit_params)
+        return estimator.best_iteration_
+    estimator.fit(train_x, train_y, **fit_params)
+    return None
+
+
+class FoldRace(object):
+    """
+    Race the folds of each configuration against the per-fold scores of the incumbent,
+    and stop the cross-validation of a configuration once it cannot win.
+    The rules, on the completed folds, with the scores higher-is-better:
+        'bound': even if the remaining folds reach score_bound, the mean stays below the incumbent's.
+        'ttest': a one-sided paired t-test says the configuration is worse, at level alpha.
+    A stopped configuration gets a censored score, the paired estimate of its mean capped by the incumbent's.
+    """
+
+    def __init__(self, rule='ttest', alpha=0.05, min_folds=2, score_bound=1.):
+        """
+        :param min_folds: the number of folds before the t-test may stop a configuration.
+        :param score_bound: the best score on a fold, 1 for the scorers of this package.
+        """
+        if rule not in ['bound', 'ttest']:
+            raise ValueError('Invalid racing rule: %s!' % rule)
+        self.rule = rule
+        self.alpha = alpha
+        self.min_folds = min_folds
+        self.score_bound = score_bound
+        self.incumbent_scores = None
+        self.race_cnt = 0
+        self.stop_cnt = 0
+        self.saved_fold_cnt = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get_incumbent_scores(self, n_fold):
+        with self._lock:
+            if self.incumbent_scores is None or len(self.incumbent_scores) != n_fold:
+                return None
+            return self.incumbent_scores.copy()
+
+    def should_stop(self, fold_scores, incumbent_scores):
+        """
+        :param fold_scores: dict, the scores of the completed folds by fold index.
+        :param incumbent_scores: the scores of the incumbent on all the folds.
+        """
+        if incumbent_scores is None or len(fold_scores) == len(incumbent_scores):
+            return False
+        n_fold = len(incumbent_scores)
+        folds = sorted(fold_scores.keys())
+        if self.rule == 'bound':
+            best_mean = (sum(fold_scores.values()) + (n_fold - len(folds)) * self.score_bound) / n_fold
+            return best_mean < np.mean(incumbent_scores)
+
+        if len(folds) < self.min_folds:
+            return False
+        diff = np.array([fold_scores[i] - incumbent_scores[i] for i in folds])
+        if np.all(diff == diff[0]):
+            # No variance, the configuration is worse if it lost every fold.
+            return diff[0] < 0
+        from scipy.stats import t
+        t_stat = np.mean(diff) / (np.std(diff, ddof=1) / np.sqrt(len(diff)))
+        return t.cdf(t_stat, df=len(diff) - 1) < self.alpha
+
+    def get_censored_score(self, fold_scores, incumbent_scores):
+        folds = sorted(fold_scores.keys())
+        incumbent_mean = np.mean(incumbent_scores)
+        estimate = incumbent_mean + np.mean([fold_scores[i] - incumbent_scores[i] for i in folds])
+        return min(estimate, incumbent_mean)
+
+    def update(self, fold_scores, n_fold):
+        """
+        Record the outcome of a cross-validation, the configuration becomes the incumbent if it wins.
+        :param fold_scores: dict, the scores of the completed folds by fold index.
+        """
+        with self._lock:
+            self.race_cnt += 1
+            if len(fold_scores) < n_fold:
+                self.stop_cnt += 1
+                self.saved_fold_cnt += n_fold - len(fold_scores)
+                return
+            scores = np.array([fold_scores[i] for i in range(n_fold)])
+            if self.incumbent_scores is None or len(self.incumbent_scores) != n_fold or \
+                    np.mean(scores) > np.mean(self.incumbent_scores):
+                self.incumbent_scores = scores
+
+
+def _get_fold_parallelism(X, n_fold, n_jobs):
+    n_parallel = min(get_resource_manager().get_n_jobs(n_jobs), n_fold)
+    if n_parallel <= 1:
+        return 1
+    nbytes = X.nbytes if hasattr(X, 'nbytes') else getattr(getattr(X, 'data', None), 'nbytes', 0)
+    available_memory = get_available_memory()
+    if nbytes > 0 and available_memory is not None:
+        # A fold holds a copy of its training rows, and its model and buffers take about as much again.
+        n_parallel = min(n_parallel, max(1, int(available_memory * 0.5 // (2 * nbytes))))
+    return n_parallel
+
+
+def _evaluate_fold(estimator, scorer, X, y, train_idx, valid_idx, fit_params=None, early_stopping_rounds=None,
+                   prediction_store=None):
+    train_x, valid_x = X[train_idx], X[valid_idx]
+    train_y, valid_y = y[train_idx], y[valid_idx]
+    _fit_params = dict()
+    if fit_params:
+        _fit_params['sample_weight'] = fit_params['sample_weight'][train_idx]
+    with span('estimator.fit', category='evaluator', shape=train_x.shape):
+        best_iteration = _fit(estimator, scorer, train_x, train_y, valid_x, valid_y, _fit_params,
+                              early_stopping_rounds=early_stopping_rounds)
+    with span('estimator.score', category='evaluator'):
+        score = scorer(estimator, valid_x, valid_y)
+    predictions, model = None, None
+    if prediction_store is not None:
+        predictions = prediction_store.predict(estimator, valid_x)
+        if prediction_store.save_model:
+            model = copy.deepcopy(estimator)
+    return score, best_iteration, predictions, model
+
+
+def _evaluate_fold_with_allotment(n_parallel, *args, **kwargs):
+    with get_resource_manager().allot(n_parallel=n_parallel):
+        return _evaluate_fold(*args, **kwargs)
+
 
 @ignore_warnings(category=ConvergenceWarning)
 def cross_validation(estimator, scorer, X, y, n_fold=5, shuffle=True, fit_params=None, if_stratify=True,
-                     random_state=1):
+                     random_state=1, prediction_store=None, trial_key=None, early_stopping_rounds=None,
+                     n_jobs=1, fold_race=None):
+    """
+    :param n_jobs: the number of folds fitted concurrently, limited by the core budget of the trial and the memory;
+        -1 means as many as the core budget allows.
+    :param fold_race: a FoldRace, which stops the remaining folds once the configuration cannot win.
+    :return: the mean score on the folds, or the censored score if the race stopped the configuration.
+    """
     with warnings.catch_warnings():
         # ignore all caught warnings
         warnings.filterwarnings("ignore")
@@ -15,20 +166,62 @@ def cross_validation(estimator, scorer, X, y, n_fold=5, shuffle=True, fit_params
             kfold = StratifiedKFold(n_splits=n_fold, random_state=random_state, shuffle=shuffle)
         else:
             kfold = KFold(n_splits=n_fold, random_state=random_state, shuffle=shuffle)
-        scores = list()
-        for train_idx, valid_idx in kfold.split(X, y):
-            train_x, valid_x = X[train_idx], X[valid_idx]
-            train_y, valid_y = y[train_idx], y[valid_idx]
-            _fit_params = dict()
-            if fit_params:
-                _fit_params['sample_weight'] = fit_params['sample_weight'][train_idx]
-            estimator.fit(train_x, train_y, **_fit_params)
-            scores.append(scorer(estimator, valid_x, valid_y))
-        return np.mean(scores)
+        splits = list(kfold.split(X, y))
+        incumbent_scores = None if fold_race is None else fold_race.get_incumbent_scores(n_fold)
+        fold_params = {'fit_params': fit_params, 'early_stopping_rounds': early_stopping_rounds,
+                       'prediction_store': prediction_store}
+        results, stopped = dict(), False
+
+        n_parallel = _get_fold_parallelism(X, n_fold, n_jobs)
+        if n_parallel == 1:
+            for fold_id, (train_idx, valid_idx) in enumerate(splits):
+                results[fold_id] = _evaluate_fold(estimator, scorer, X, y, train_idx, valid_idx, **fold_params)
+                if fold_race is not None and fold_race.should_stop(
+                        {i: result[0] for i, result in results.items()}, incumbent_scores):
+                    stopped = True
+                    break
+        else:
+            with ThreadPoolExecutor(max_workers=n_parallel) as executor:
+                futures = dict()
+                for fold_id, (train_idx, valid_idx) in enumerate(splits):
+                    # Each fold fits its own copy of the unfitted estimator.
+                    future = executor.submit(_evaluate_fold_with_allotment, n_parallel, copy.deepcopy(estimator),
+                                             scorer, X, y, train_idx, valid_idx, **fold_params)
+                    futures[future] = fold_id
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    if fold_race is not None and fold_race.should_stop(
+                            {i: result[0] for i, result in results.items()}, incumbent_scores):
+                        stopped = True
+                        for _future in futures:
+                            _future.cancel()
+                        break
+
+        fold_scores = {fold_id: result[0] for fold_id, result in results.items()}
+        if fold_race is not None:
+            fold_race.update(fold_scores, n_fold)
+        if stopped:
+            if hasattr(estimator, 'best_iteration_'):
+                # The rounds of a stopped configuration are not kept for the refit.
+                estimator.best_iteration_ = None
+            return fold_race.get_censored_score(fold_scores, incumbent_scores)
+
+        folds = sorted(results.keys())
+        if prediction_store is not None:
+            # The out-of-fold predictions cover all the rows.
+            models = [results[i][3] for i in folds] if prediction_store.save_model else list()
+            prediction_store.add(trial_key, np.concatenate([splits[i][1] for i in folds]),
+                                 np.concatenate([results[i][2] for i in folds]), models)
+        best_iterations = [results[i][1] for i in folds]
+        if None not in best_iterations:
+            # The rounds for the refit on all the folds.
+            estimator.best_iteration_ = int(round(np.mean(best_iterations)))
+        return np.mean([fold_scores[i] for i in folds])
 
 
 @ignore_warnings(category=ConvergenceWarning)
-def holdout_validation(estimator, scorer, X, y, test_size=0.33, fit_params=None, if_stratify=True, random_state=1):
+def holdout_validation(estimator, scorer, X, y, test_size=0.33, fit_params=None, if_stratify=True, random_state=1,
+                       prediction_store=None, trial_key=None, early_stopping_rounds=None):
     with warnings.catch_warnings():
         # ignore all caught warnings
         warnings.filterwarnings("ignore")
@@ -42,13 +235,19 @@ def holdout_validation(estimator, scorer, X, y, test_size=0.33, fit_params=None,
             _fit_params = dict()
             if fit_params:
                 _fit_params['sample_weight'] = fit_params['sample_weight'][train_index]
-            estimator.fit(X_train, y_train, **_fit_params)
-            return scorer(estimator, X_test, y_test)
+            with span('estimator.fit', category='evaluator', shape=X_train.shape):
+                _fit(estimator, scorer, X_train, y_train, X_test, y_test, _fit_params,
+                     early_stopping_rounds=early_stopping_rounds)
+            with span('estimator.score', category='evaluator'):
+                score = scorer(estimator, X_test, y_test)
+            if prediction_store is not None:
+                prediction_store.add(trial_key, test_index, prediction_store.predict(estimator, X_test), [estimator])
+            return score
 
 
 @ignore_warnings(category=ConvergenceWarning)
 def partial_validation(estimator, scorer, X, y, data_subsample_ratio, test_size=0.33, fit_params=None, if_stratify=True,
-                       random_state=1):
+                       random_state=1, prediction_store=None, trial_key=None, early_stopping_rounds=None):
     with warnings.catch_warnings():
         # ignore all caught warnings
         warnings.filterwarnings("ignore")
@@ -74,5 +273,12 @@ def partial_validation(estimator, scorer, X, y, data_subsample_ratio, test_size=
                     if fit_params:
                         _fit_params['sample_weight'] = fit_params['sample_weight'][_test_index]
 
-            estimator.fit(_X_train, _y_train, **_fit_params)
-            return scorer(estimator, X_test, y_test)
+            with span('estimator.fit', category='evaluator', shape=_X_train.shape):
+                _fit(estimator, scorer, _X_train, _y_train, X_test, y_test, _fit_params,
+                     early_stopping_rounds=early_stopping_rounds)
+            with span('estimator.score', category='evaluator'):
+                score = scorer(estimator, X_test, y_test)
+            # The models trained on a subsample are not kept for the ensembles.
+            if prediction_store is not None and data_subsample_ratio == 1:
+                prediction_store.add(trial_key, test_index, prediction_store.predict(estimator, X_test), [estimator])
+            return score
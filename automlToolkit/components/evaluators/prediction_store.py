@@ -0,0 +1,149 @@
+import os
+import shutil
+import pickle
+import hashlib
+import weakref
+import tempfile
+import threading
+import numpy as np
+
+from automlToolkit.components.utils.constants import CLS_TASKS
+from automlToolkit.components.feature_engineering.feature_store import get_feature_key
+
+
+def get_trial_key(data_node, config):
+    """
+    The id of a trial: the fingerprint of its training data and its configuration.
+    The fingerprint of the data is computed once and kept on the node, see get_feature_key.
+    """
+    hasher = hashlib.sha1(get_feature_key(data_node).encode())
+    config_dict = config.get_dictionary() if hasattr(config, 'get_dictionary') else dict(config)
+    hasher.update(repr(sorted(config_dict.items())).encode())
+    return hasher.hexdigest()
+
+
+class PredictionStore(object):
+    """
+    Keep the holdout/out-of-fold predictions of the evaluated trials, so that the ensembles
+    are built from the models trained during the search instead of refitting them.
+    A record holds the row indices of the validation samples, their predictions in float32,
+    the fitted models if save_model is set, and the boosting rounds kept by the early stopping.
+    The records are files in a shared directory,
+    so the evaluators in worker processes add records too.
+    """
+
+    def __init__(self, task_type, output_dir=None, save_model=False):
+        """
+        :param output_dir: the parent directory of the records, the system temporary directory by default.
+        :param save_model: whether to keep the fitted models of each trial.
+        """
+        self.task_type = task_type
+        self.save_model = save_model
+        if output_dir is not None and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        self.store_dir = tempfile.mkdtemp(prefix='predictions_', dir=output_dir)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.store_dir, True)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The copies in the worker processes never remove the directory.
+        state.pop('_finalizer')
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._finalizer = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return os.path.exists(self._get_path(key, 'pred'))
+
+    def _get_path(self, key, kind):
+        suffix = {'model': 'pkl', 'iteration': 'txt'}.get(kind, 'npy')
+        return os.path.join(self.store_dir, '%s.%s.%s' % (key, kind, suffix))
+
+    def predict(self, estimator, X):
+        if self.task_type in CLS_TASKS:
+            return estimator.predict_proba(X)
+        return estimator.predict(X)
+
+    def add(self, key, index, predictions, models=None):
+        """
+        Record the predictions of a trial on the validation rows.
+        :param index: the row indices of the predictions in the training data.
+        :param models: the fitted models, e.g., one per fold.
+        """
+        index = np.asarray(index, dtype=np.int64)
+        order = np.argsort(index, kind='stable')
+        predictions = np.asarray(predictions, dtype=np.float32)[order]
+
+        tmp_suffix = '.%d-%d.tmp' % (os.getpid(), threading.get_ident())
+        with self._lock:
+            with open(self._get_path(key, 'index') + tmp_suffix, 'wb') as f:
+                np.save(f, index[order])
+            os.replace(self._get_path(key, 'index') + tmp_suffix, self._get_path(key, 'index'))
+            if self.save_model and models is not None:
+                with open(self._get_path(key, 'model') + tmp_suffix, 'wb') as f:
+                    pickle.dump(list(models), f)
+                os.replace(self._get_path(key, 'model') + tmp_suffix, self._get_path(key, 'model'))
+            pred_path = self._get_path(key, 'pred')
+            mmap = np.lib.format.open_memmap(pred_path + tmp_suffix, mode='w+',
+                                             dtype=np.float32, shape=predictions.shape)
+            mmap[:] = predictions
+            mmap.flush()
+            del mmap
+            # The predictions come last, a record exists once they are in place.
+            os.replace(pred_path + tmp_suffix, pred_path)
+
+    def get_index(self, key):
+        if key not in self:
+            return None
+        return np.load(self._get_path(key, 'index'))
+
+    def get_predictions(self, key, index=None):
+        """
+        :param index: the requested rows, all the recorded rows by default.
+        :return: the predictions on the requested rows, or None if the record does not cover them.
+        """
+        if key not in self:
+            return None
+        predictions = np.load(self._get_path(key, 'pred'), mmap_mode='r')
+        if index is None:
+            return predictions
+        recorded_index = self.get_index(key)
+        index = np.asarray(index, dtype=np.int64)
+        if len(recorded_index) == 0:
+            return None
+        pos = np.minimum(np.searchsorted(recorded_index, index), len(recorded_index) - 1)
+        if not np.array_equal(recorded_index[pos], index):
+            return None
+        return predictions[pos]
+
+    def add_best_iteration(self, key, best_iteration):
+        """
+        Record the number of boosting rounds the early stopping kept in a trial.
+        """
+        path = self._get_path(key, 'iteration')
+        tmp_path = path + '.%d-%d.tmp' % (os.getpid(), threading.get_ident())
+        with open(tmp_path, 'w') as f:
+            f.write(str(int(best_iteration)))
+        os.replace(tmp_path, path)
+
+    def get_best_iteration(self, key):
+        path = self._get_path(key, 'iteration')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return int(f.read())
+
+    def get_models(self, key):
+        path = self._get_path(key, 'model')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def close(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
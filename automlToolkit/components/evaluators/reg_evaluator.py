@@ -1,8 +1,12 @@
 import time
 import numpy as np
 from automlToolkit.utils.logging_utils import get_logger
+from automlToolkit.utils.tracing import traced
 from automlToolkit.components.evaluators.base_evaluator import _BaseEvaluator
-from automlToolkit.components.evaluators.evaluate_func import holdout_validation, cross_validation, partial_validation
+from automlToolkit.components.evaluators.evaluate_func import holdout_validation, cross_validation, \
+    partial_validation, FoldRace
+from automlToolkit.components.evaluators.prediction_store import get_trial_key
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 def get_estimator(config):
@@ -16,14 +20,15 @@ def get_estimator(config):
     except:
         estimator = _addons.components[regressor_type](**config_)
     if hasattr(estimator, 'n_jobs'):
-        setattr(estimator, 'n_jobs', 4)
+        # The share of the core budget for the current trial.
+        setattr(estimator, 'n_jobs', get_resource_manager().get_n_jobs())
     return regressor_type, estimator
 
 
 class RegressionEvaluator(_BaseEvaluator):
     def __init__(self, reg_config, scorer=None, data_node=None, name=None,
                  resampling_strategy='holdout', resampling_params=None, seed=1,
-                 estimator=None):
+                 estimator=None, prediction_store=None, early_stopping_rounds=20):
         self.reg_config = reg_config
         self.scorer = scorer
         self.data_node = data_node
@@ -32,9 +37,16 @@ class RegressionEvaluator(_BaseEvaluator):
         self.resampling_strategy = resampling_strategy
         self.resampling_params = resampling_params
         self.seed = seed
+        self.prediction_store = prediction_store
+        # The patience of the boosting models on the validation set, None disables the early stopping.
+        self.early_stopping_rounds = early_stopping_rounds
+        # Race the folds of the cross-validation against the incumbent, if a racing rule is given.
+        racing = None if resampling_params is None else resampling_params.get('racing')
+        self.fold_race = None if racing is None else FoldRace(rule=racing)
         self.eval_id = 0
         self.logger = get_logger('RegressionEvaluator-%s' % self.name)
 
+    @traced('evaluator', category='evaluator')
     def __call__(self, config, **kwargs):
         start_time = time.time()
         if self.name is None:
@@ -57,16 +69,27 @@ class RegressionEvaluator(_BaseEvaluator):
 
         config_dict = config.get_dictionary().copy()
         regressor_id, reg = get_estimator(config_dict)
+        # Record the validation predictions for the ensembles.
+        store_params = dict()
+        if self.prediction_store is not None:
+            store_params = {'prediction_store': self.prediction_store,
+                            'trial_key': get_trial_key(data_node, config)}
+
         try:
             if self.resampling_strategy == 'cv':
                 if self.resampling_params is None or 'folds' not in self.resampling_params:
                     folds = 5
                 else:
                     folds = self.resampling_params['folds']
+                cv_n_jobs = 1 if self.resampling_params is None else self.resampling_params.get('n_jobs', 1)
                 score = cross_validation(reg, self.scorer, X_train, y_train,
                                          n_fold=folds,
+                                         n_jobs=cv_n_jobs,
+                                         fold_race=self.fold_race,
                                          random_state=self.seed,
-                                         if_stratify=False)
+                                         if_stratify=False,
+                                         early_stopping_rounds=self.early_stopping_rounds,
+                                         **store_params)
             elif self.resampling_strategy == 'holdout':
                 if self.resampling_params is None or 'test_size' not in self.resampling_params:
                     test_size = 0.33
@@ -75,7 +98,9 @@ class RegressionEvaluator(_BaseEvaluator):
                 score = holdout_validation(reg, self.scorer, X_train, y_train,
                                            test_size=test_size,
                                            random_state=self.seed,
-                                           if_stratify=False)
+                                           if_stratify=False,
+                                           early_stopping_rounds=self.early_stopping_rounds,
+                                           **store_params)
             elif self.resampling_strategy == 'partial':
                 if self.resampling_params is None or 'test_size' not in self.resampling_params:
                     test_size = 0.33
@@ -84,19 +109,25 @@ class RegressionEvaluator(_BaseEvaluator):
                 score = partial_validation(reg, self.scorer, X_train, y_train, downsample_ratio,
                                            test_size=test_size,
                                            random_state=self.seed,
-                                           if_stratify=False)
+                                           if_stratify=False,
+                                           early_stopping_rounds=self.early_stopping_rounds,
+                                           **store_params)
             else:
                 raise ValueError('Invalid resampling strategy: %s!' % self.resampling_strategy)
+            best_iteration = getattr(reg, 'best_iteration_', None)
+            if best_iteration is not None and downsample_ratio == 1 and self.prediction_store is not None:
+                # The refit of this trial trains as many rounds, see fetch_predict_estimator.
+                self.prediction_store.add_best_iteration(store_params['trial_key'], best_iteration)
         except Exception as e:
             if self.name == 'fe':
                 raise e
-            self.logger.info('%s-evaluator: %s' % (self.name, str(e)))
+            self.logger.info('%s-evaluator: %s', self.name, str(e))
             return np.inf
         # print('=' * 6 + '>', self.scorer._sign * score)
         fmt_str = '\n' + ' ' * 5 + '==> '
-        self.logger.debug('%s%d-Evaluation<%s> | Score: %.4f | Time cost: %.2f seconds | Shape: %s' %
-                          (fmt_str, self.eval_id, regressor_id,
-                           self.scorer._sign * score, time.time() - start_time, X_train.shape))
+        self.logger.debug('%s%d-Evaluation<%s> | Score: %.4f | Time cost: %.2f seconds | Shape: %s',
+                          fmt_str, self.eval_id, regressor_id,
+                          self.scorer._sign * score, time.time() - start_time, X_train.shape)
         self.eval_id += 1
         if self.name == 'hpo':
             score = 1 - score
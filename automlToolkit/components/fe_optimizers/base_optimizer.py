@@ -1,19 +1,71 @@
 import abc
 import typing
-from automlToolkit.components.feature_engineering.transformations import _transformers, _type_infos, _params_infos
+import inspect
+from automlToolkit.components.feature_engineering.transformations import _transformers, _type_infos, _params_infos, \
+    _trans_types
 from automlToolkit.components.feature_engineering.transformation_graph import DataNode, TransformationGraph
 from automlToolkit.utils.logging_utils import get_logger
 
 
+def get_constructor_args(transformer_class):
+    """
+    :return: the names of the arguments of the constructor, and whether it takes any other keyword.
+    """
+    names, var_keyword = list(), False
+    for name, param in inspect.signature(transformer_class.__init__).parameters.items():
+        if param.kind == inspect.Parameter.VAR_KEYWORD:
+            var_keyword = True
+        elif name != 'self' and param.kind != inspect.Parameter.VAR_POSITIONAL:
+            names.append(name)
+    return names, var_keyword
+
+
+def get_transformer_spec(transformer):
+    """
+    The json-serializable description of a transformer: its component id and constructor arguments.
+    """
+    transformer_class = type(transformer)
+    spec = {'id': transformer_class.__module__.split('.')[-1], 'type': transformer.type, 'config': dict()}
+    names, _ = get_constructor_args(transformer_class)
+    if hasattr(transformer_class, 'get_hyperparameter_search_space'):
+        hp_names = transformer.get_hyperparameter_search_space().get_hyperparameter_names()
+        names = [name for name in names if name in hp_names]
+    for name in names:
+        if hasattr(transformer, name):
+            value = getattr(transformer, name)
+        elif name == 'param':
+            # The components keep their single argument as params.
+            value = transformer.params
+        else:
+            continue
+        value = value.item() if hasattr(value, 'item') else value
+        # The arguments stored in another form, e.g., as a function, are left to their defaults.
+        if isinstance(value, (str, int, float, bool)):
+            spec['config'][name] = value
+    return spec
+
+
+def build_transformer(spec):
+    if spec['id'] not in _transformers:
+        raise ValueError('Invalid transformer id: %s!' % spec['id'])
+    transformer_class = _transformers[spec['id']]
+    names, var_keyword = get_constructor_args(transformer_class)
+    # The specs archived by the older versions may hold the arguments the constructor does not take.
+    config = {key: val for key, val in spec['config'].items() if var_keyword or key in names}
+    return transformer_class(**config)
+
+
 class Optimizer(object, metaclass=abc.ABCMeta):
     def __init__(self, name, task_type, datanode, seed=1):
         self.name = name
         self._seed = seed
-        self.incumbent = datanode
         self.root_node = datanode
         self.task_type = task_type
         self.graph = TransformationGraph()
         self.graph.add_node(self.root_node)
+        self.incumbent = datanode
+        # The pipelines to start from, e.g., the ones found on a similar dataset in the previous runs.
+        self.seed_pipelines = list()
         self.time_budget = None
         self.maximum_evaluation_num = None
         logger_name = '%s(%d)' % (self.name, self._seed)
@@ -27,6 +79,16 @@ class Optimizer(object, metaclass=abc.ABCMeta):
     def iterate(self):
         pass
 
+    @property
+    def incumbent(self):
+        return self._incumbent
+
+    @incumbent.setter
+    def incumbent(self, node: DataNode):
+        self._incumbent = node
+        # The bandits may apply a past incumbent to the test data, so the graph keeps its path.
+        self.graph.pin(node)
+
     def get_incumbent(self):
         return self.incumbent
 
@@ -41,9 +103,20 @@ class Optimizer(object, metaclass=abc.ABCMeta):
             edge_attrs.append(edge.transformer.get_attributes())
         return edge_attrs
 
+    def is_replayable(self, path_ids):
+        """
+        Whether a path starts from the root node only, and not from a node shared by another optimizer.
+        """
+        roots = [node_id for node_id in path_ids if len(self.graph.input_data_dict.get(node_id, list())) == 0]
+        return roots == [self.root_node.node_id]
+
     def apply(self, data_node: DataNode, ref_node: DataNode):
         path_ids = self.graph.get_path_nodes(ref_node)
         self.logger.info('The path ids: %s' % str(path_ids))
+        if len(path_ids) == 0:
+            raise ValueError('Invalid reference node: it is not in the graph!')
+        if not self.is_replayable(path_ids):
+            raise ValueError('Invalid reference node: its path starts from a node of another optimizer!')
         inputnode = self.graph.get_node(path_ids[0])
         inputnode.set_values(data_node)
 
@@ -73,6 +146,68 @@ class Optimizer(object, metaclass=abc.ABCMeta):
             edge_attrs.append(edge_attr)
         return edge_attrs
 
+    def get_pipeline_spec(self, ref_node: DataNode):
+        """
+        :return: the transformer specs on the path to ref_node, None if the path cannot be replayed.
+        """
+        path_ids = self.graph.get_path_nodes(ref_node)
+        if len(path_ids) == 0 or not self.is_replayable(path_ids):
+            return None
+        specs = list()
+        for node_id in path_ids[1:]:
+            if len(self.graph.input_data_dict[node_id]) != 1:
+                # The merged nodes have more than one input.
+                return None
+            edge = self.graph.get_edge(self.graph.input_edge_dict[node_id])
+            specs.append(get_transformer_spec(edge.transformer))
+        return specs
+
+    def replay_pipeline(self, specs):
+        """
+        Apply a pipeline of transformer specs to the root node, and add the nodes to the graph.
+        :return: the output node.
+        """
+        node = self.root_node
+        for spec in specs:
+            transformer = build_transformer(spec)
+            output_node = transformer.operate(node)
+            # Avoid self-loop.
+            if transformer.type == 0 or output_node.node_id == node.node_id:
+                continue
+            output_node.depth = node.depth + 1
+            output_node.trans_hist.append(transformer.type)
+            self.graph.add_node(output_node)
+            self.graph.add_trans_in_graph(node, output_node, transformer)
+            node = output_node
+        return node
+
+    def evaluate_seed_pipelines(self, **kwargs):
+        """
+        Replay and evaluate the seed pipelines, for the evaluation-based optimizers.
+        :param kwargs: the extra arguments of the evaluator.
+        :return: the output nodes, the best first.
+        """
+        seed_nodes = list()
+        for specs in self.seed_pipelines:
+            try:
+                node = self.replay_pipeline(specs)
+                node.score = self.evaluator(self.hp_config, data_node=node, name='fe', **kwargs)
+            except Exception as e:
+                self.logger.error('evaluating seed pipeline %s: %s' % (str(specs), str(e)))
+                continue
+            if node.score is None:
+                continue
+            seed_nodes.append(node)
+            self.node_store.add(node)
+            if node.score > self.incumbent_score:
+                self.incumbent_score = node.score
+                self.incumbent = node
+        if len(self.seed_pipelines) > 0:
+            self.logger.info('Evaluated %d seed pipelines, scores: %s' % (
+                len(self.seed_pipelines), str([node.score for node in seed_nodes])))
+        self.seed_pipelines = list()
+        return TransformationGraph.sort_nodes_by_score(seed_nodes)
+
     def get_available_transformations(self, node: DataNode, trans_types: typing.List):
         return self.get_transformations(list(set(node.feature_types)), trans_types)
 
@@ -88,7 +223,7 @@ class Optimizer(object, metaclass=abc.ABCMeta):
         transformers = list()
 
         for id in trans_ids:
-            if _transformers[id]().type not in trans_types:
+            if _trans_types[id] not in trans_types:
                 continue
 
             params = _params_infos[id]
@@ -1,12 +1,13 @@
-import gc
 import time
 from collections import namedtuple
 from automlToolkit.components.feature_engineering.transformation_graph import *
 from automlToolkit.components.fe_optimizers import Optimizer
 from automlToolkit.components.fe_optimizers.transformer_manager import TransformerManager
+from automlToolkit.components.feature_engineering.node_store import NodeStore
 from automlToolkit.components.evaluators.base_evaluator import _BaseEvaluator
 from automlToolkit.components.utils.constants import SUCCESS, ERROR, TIMEOUT, CLS_TASKS
 from automlToolkit.utils.decorators import time_limit, TimeoutException
+from automlToolkit.utils.tracing import traced
 from automlToolkit.components.feature_engineering import TRANS_CANDIDATES
 
 EvaluationResult = namedtuple('EvaluationResult', 'status duration score extra')
@@ -18,7 +19,7 @@ class EvaluationBasedOptimizer(Optimizer):
                  mem_limit_per_trans: int,
                  seed: int, shared_mode: bool = False,
                  batch_size: int = 2, beam_width: int = 3, n_jobs=1,
-                 number_of_unit_resource=4, trans_set=None):
+                 number_of_unit_resource=4, trans_set=None, memory_budget=None, output_dir=None):
         super().__init__(str(__class__.__name__), task_type, input_data, seed)
         self.transformer_manager = TransformerManager(random_state=seed)
         self.number_of_unit_resource = number_of_unit_resource
@@ -62,6 +63,8 @@ class EvaluationBasedOptimizer(Optimizer):
         self.local_datanodes = list()
         self.global_datanodes = list()
         self.shared_mode = shared_mode
+        # The nodes beyond the memory budget (in MB) are spilled to output_dir.
+        self.node_store = NodeStore(memory_budget, output_dir)
 
         # Avoid transformations, which would take too long
         # Combinations of non-linear models with feature learning.
@@ -82,11 +85,12 @@ class EvaluationBasedOptimizer(Optimizer):
             if self.early_stopped_flag:
                 break
             self.logger.debug('=' * 50)
-            self.logger.debug('Start the ITERATION: %d' % self.iteration_id)
+            self.logger.debug('Start the ITERATION: %d', self.iteration_id)
             self.logger.debug('=' * 50)
             self.iterate()
         return self.incumbent
 
+    @traced('fe_optimizer.iterate', category='optimizer')
     def iterate(self):
         result = None
         for _ in range(self.number_of_unit_resource):
@@ -120,6 +124,11 @@ class EvaluationBasedOptimizer(Optimizer):
             self.root_node.score = self.incumbent_score
             _evaluation_cnt += 1
             self.beam_set.append(self.root_node)
+            self.node_store.add(self.root_node)
+            # Expand the seed pipelines first.
+            seed_nodes = self.evaluate_seed_pipelines()
+            _evaluation_cnt += len(seed_nodes)
+            self.beam_set = seed_nodes + self.beam_set
 
         if len(self.beam_set) == 0 or self.early_stopped_flag:
             self.early_stopped_flag = True
@@ -128,9 +137,10 @@ class EvaluationBasedOptimizer(Optimizer):
             # Get one node in the beam set.
             node_ = self.beam_set[0]
             del self.beam_set[0]
+            self.node_store.load(node_)
 
         self.logger.debug('=' * 50)
-        self.logger.info('Start %d-th FE iteration.' % self.iteration_id)
+        self.logger.info('Start %d-th FE iteration.', self.iteration_id)
 
         # Limit the maximum depth in graph.
         # Avoid the too complex features.
@@ -144,12 +154,12 @@ class EvaluationBasedOptimizer(Optimizer):
             trans_set = self.transformer_manager.get_transformations(
                 node_, trans_types=_trans_types, batch_size=self.hpo_batch_size
             )
-            self.logger.info('The number of transformations is: %d' % len(trans_set))
+            self.logger.info('The number of transformations is: %d', len(trans_set))
             if len(trans_set) == 1 and trans_set[0].type == 0:
                 return self.incumbent.score, 0, self.incumbent
 
             for transformer in trans_set:
-                self.logger.debug('[%s][%s]' % (self.model_id, transformer.name))
+                self.logger.debug('[%s][%s]', self.model_id, transformer.name)
 
                 if transformer.type != 0:
                     self.transformer_manager.add_execution_record(node_.node_id, transformer.type)
@@ -159,9 +169,9 @@ class EvaluationBasedOptimizer(Optimizer):
                 try:
                     # Limit the execution and evaluation time for each transformation.
                     with time_limit(self.time_limit_per_trans):
-                        self.logger.info('%s - %s' % (transformer.name, str(node_.shape)))
+                        self.logger.info('%s - %s', transformer.name, str(node_.shape))
                         output_node = transformer.operate(node_)
-                        self.logger.info('after %s - %s' % (transformer.name, str(output_node.shape)))
+                        self.logger.info('after %s - %s', transformer.name, str(output_node.shape))
                         # Evaluate this node.
                         if transformer.type != 0:
                             output_node.depth = node_.depth + 1
@@ -175,6 +185,7 @@ class EvaluationBasedOptimizer(Optimizer):
                         status = ERROR
                     else:
                         self.temporary_nodes.append(output_node)
+                        self.node_store.add(output_node)
                         self.graph.add_node(output_node)
                         # Avoid self-loop.
                         if transformer.type != 0 and node_.node_id != output_node.node_id:
@@ -205,7 +216,6 @@ class EvaluationBasedOptimizer(Optimizer):
                         '[Budget Runs Out]: %s, %s\n' % (self.maximum_evaluation_num, self.time_budget))
                     self.is_ended = True
                     break
-                gc.collect()
 
             # Memory Save: free the data in the unpromising nodes.
             _scores = list()
@@ -219,7 +229,6 @@ class EvaluationBasedOptimizer(Optimizer):
                          (self.incumbent_score, self.incumbent_score - self.baseline_score))
 
         self.evaluation_num_last_iteration = max(self.evaluation_num_last_iteration, _evaluation_cnt)
-        gc.collect()
 
         # Update the beam set according to their performance.
         if len(self.beam_set) == 0:
@@ -231,14 +240,14 @@ class EvaluationBasedOptimizer(Optimizer):
                     self.local_datanodes.append(node_)
 
             if self.shared_mode:
-                self.logger.info('The number of local nodes: %d' % len(self.local_datanodes))
-                self.logger.info('The local scores are: %s' % str([node.score for node in self.local_datanodes]))
+                self.logger.info('The number of local nodes: %d', len(self.local_datanodes))
+                self.logger.info('The local scores are: %s', str([node.score for node in self.local_datanodes]))
 
             # Add the original dataset into the beam set.
             for _ in range(1 + self.beam_width - len(self.beam_set)):
                 self.beam_set.append(self.root_node)
             self.temporary_nodes = list()
-            self.logger.info('Finish one level in beam search: %d: %d' % (self.iteration_id, len(self.beam_set)))
+            self.logger.info('Finish one level in beam search: %d: %d', self.iteration_id, len(self.beam_set))
 
         # Maintain the local incumbent data node.
         if self.shared_mode:
@@ -247,11 +256,20 @@ class EvaluationBasedOptimizer(Optimizer):
             if len(self.local_datanodes) > self.beam_width:
                 self.local_datanodes = TransformationGraph.sort_nodes_by_score(self.local_datanodes)[:self.beam_width]
 
+        # Free the nodes that are out of the beam.
+        alive_nodes = self.get_alive_nodes()
+        self.node_store.retain(alive_nodes)
+        # Drop the pruned branches and their transformers from the graph.
+        self.graph.compact(alive_nodes)
         self.iteration_id += 1
         self.execution_history[self.iteration_id] = execution_status
         iteration_cost = time.time() - _iter_start_time
         return self.incumbent.score, iteration_cost, self.incumbent
 
+    def get_alive_nodes(self):
+        return [self.root_node, self.incumbent] + self.beam_set + self.temporary_nodes + \
+               self.features_hist + self.local_datanodes + self.global_datanodes
+
     def refresh_beam_set(self):
         if len(self.global_datanodes) > 0:
             self.logger.info('Sync the global nodes!')
@@ -7,7 +7,7 @@ from automlToolkit.components.fe_optimizers.hyperband_evaluation_based_optimizer
 def build_fe_optimizer(eval_type, task_type, input_data, evaluator,
                        model_id: str, time_limit_per_trans: int,
                        mem_limit_per_trans: int, seed: int,
-                       shared_mode: bool = False, n_jobs=4):
+                       shared_mode: bool = False, n_jobs=4, memory_budget=None, output_dir=None):
     if eval_type == 'partial':
         optimizer_class = HyperbandOptimizer
     elif n_jobs == 1:
@@ -18,4 +18,5 @@ def build_fe_optimizer(eval_type, task_type, input_data, evaluator,
                            evaluator=evaluator, model_id=model_id,
                            time_limit_per_trans=time_limit_per_trans,
                            mem_limit_per_trans=mem_limit_per_trans,
-                           seed=seed, shared_mode=shared_mode, n_jobs=n_jobs)
+                           seed=seed, shared_mode=shared_mode, n_jobs=n_jobs,
+                           memory_budget=memory_budget, output_dir=output_dir)
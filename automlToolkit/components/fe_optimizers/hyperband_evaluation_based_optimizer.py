@@ -1,17 +1,19 @@
 from collections import namedtuple
 from concurrent.futures import ThreadPoolExecutor
 
-import gc
 import time
 from math import log, ceil
 
 from automlToolkit.components.fe_optimizers import Optimizer
 from automlToolkit.components.fe_optimizers.transformer_manager import TransformerManager
+from automlToolkit.components.feature_engineering.node_store import NodeStore
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 from automlToolkit.components.evaluators.base_evaluator import _BaseEvaluator
 from automlToolkit.components.feature_engineering import TRANS_CANDIDATES
 from automlToolkit.components.feature_engineering.transformation_graph import *
 from automlToolkit.components.utils.constants import SUCCESS, ERROR, TIMEOUT, CLS_TASKS
 from automlToolkit.utils.decorators import time_limit, TimeoutException
+from automlToolkit.utils.tracing import traced
 
 EvaluationResult = namedtuple('EvaluationResult', 'status duration score extra')
 
@@ -21,7 +23,8 @@ class HyperbandOptimizer(Optimizer):
                  model_id: str, time_limit_per_trans: int,
                  mem_limit_per_trans: int,
                  seed: int, shared_mode: bool = False, n_jobs=1,
-                 batch_size: int = 5, beam_width: int = 3, trans_set=None, eta=3):
+                 batch_size: int = 5, beam_width: int = 3, trans_set=None, eta=3,
+                 memory_budget=None, output_dir=None):
         super().__init__(str(__class__.__name__), task_type, input_data, seed)
         self.transformer_manager = TransformerManager(random_state=seed)
         self.time_limit_per_trans = time_limit_per_trans
@@ -63,6 +66,8 @@ class HyperbandOptimizer(Optimizer):
         self.local_datanodes = list()
         self.global_datanodes = list()
         self.shared_mode = shared_mode
+        # The nodes beyond the memory budget (in MB) are spilled to output_dir.
+        self.node_store = NodeStore(memory_budget, output_dir)
 
         # Avoid transformations, which would take too long
         # Combinations of non-linear models with feature learning.
@@ -85,11 +90,12 @@ class HyperbandOptimizer(Optimizer):
             if self.early_stopped_flag:
                 break
             self.logger.debug('=' * 50)
-            self.logger.debug('Start the ITERATION: %d' % self.iteration_id)
+            self.logger.debug('Start the ITERATION: %d', self.iteration_id)
             self.logger.debug('=' * 50)
             self.iterate()
         return self.incumbent
 
+    @traced('fe_optimizer.iterate', category='optimizer')
     def iterate(self):
         _iter_start_time = time.time()
         _evaluation_cnt = 0
@@ -118,6 +124,11 @@ class HyperbandOptimizer(Optimizer):
             self.root_node.score = self.incumbent_score
             _evaluation_cnt += 1
             self.beam_set.append(self.root_node)
+            self.node_store.add(self.root_node)
+            # Expand the seed pipelines first.
+            seed_nodes = self.evaluate_seed_pipelines(data_subsample_ratio=1.0)
+            _evaluation_cnt += len(seed_nodes)
+            self.beam_set = seed_nodes + self.beam_set
 
         if len(self.beam_set) == 0 or self.early_stopped_flag:
             self.early_stopped_flag = True
@@ -126,9 +137,10 @@ class HyperbandOptimizer(Optimizer):
             # Get one node in the beam set.
             node_ = self.beam_set[0]
             del self.beam_set[0]
+            self.node_store.load(node_)
 
         self.logger.debug('=' * 50)
-        self.logger.info('Start %d-th FE iteration.' % self.iteration_id)
+        self.logger.info('Start %d-th FE iteration.', self.iteration_id)
 
         # Limit the maximum depth in graph.
         # Avoid the too complex features.
@@ -152,26 +164,27 @@ class HyperbandOptimizer(Optimizer):
                 dataset_size = r * self.eta ** i
 
                 score_list = []
-                self.logger.info('The total number of transformations is: %d' % len(trans_set))
+                self.logger.info('The total number of transformations is: %d', len(trans_set))
                 pool = ThreadPoolExecutor(max_workers=self.n_jobs)
                 tasks = []
                 for transformer in trans_set:
-                    self.logger.debug('[%s][%s]' % (self.model_id, transformer.name))
-                    self.logger.info('Dataset size: %f' % dataset_size)
+                    self.logger.debug('[%s][%s]', self.model_id, transformer.name)
+                    self.logger.info('Dataset size: %f', dataset_size)
                     if transformer.type != 0 and dataset_size == R:
                         self.transformer_manager.add_execution_record(node_.node_id, transformer.type)
 
                     def evaluate(tran, node, subsample_size):
                         start_time = time.time()
-                        output_node = tran.operate(node)
-                        if tran.type != 0:
-                            output_node.depth = node.depth + 1
-                            output_node.trans_hist.append(tran.type)
-                            score = self.evaluator(self.hp_config, data_node=output_node, name='fe',
-                                                   data_subsample_ratio=subsample_size)
-                            output_node.score = score
-                        else:
-                            score = output_node.score
+                        with get_resource_manager().allot(n_parallel=self.n_jobs):
+                            output_node = tran.operate(node)
+                            if tran.type != 0:
+                                output_node.depth = node.depth + 1
+                                output_node.trans_hist.append(tran.type)
+                                score = self.evaluator(self.hp_config, data_node=output_node, name='fe',
+                                                       data_subsample_ratio=subsample_size)
+                                output_node.score = score
+                            else:
+                                score = output_node.score
                         return output_node, score, time.time() - start_time
 
                     tasks.append(pool.submit(evaluate, transformer, node_, dataset_size))
@@ -202,6 +215,7 @@ class HyperbandOptimizer(Optimizer):
                             score_list.append(_score)
                             if dataset_size == R:
                                 self.temporary_nodes.append(output_node)
+                                self.node_store.add(output_node)
                                 self.graph.add_node(output_node)
                                 # Avoid self-loop.
                                 if transformer.type != 0 and node_.node_id != output_node.node_id:
@@ -236,7 +250,6 @@ class HyperbandOptimizer(Optimizer):
                             '[Budget Runs Out]: %s, %s\n' % (self.maximum_evaluation_num, self.time_budget))
                         self.is_ended = True
                         break
-                    gc.collect()
 
                 trans_next_iter = max(self.beam_width, int(len(trans_set) / self.eta))
                 assert len(score_list) == len(trans_set)
@@ -263,7 +276,6 @@ class HyperbandOptimizer(Optimizer):
                          (self.incumbent_score, self.incumbent_score - self.baseline_score))
 
         self.evaluation_num_last_iteration = max(self.evaluation_num_last_iteration, _evaluation_cnt)
-        gc.collect()
 
         # Update the beam set according to their performance.
         if len(self.beam_set) == 0:
@@ -275,14 +287,14 @@ class HyperbandOptimizer(Optimizer):
                     self.local_datanodes.append(node_)
 
             if self.shared_mode:
-                self.logger.info('The number of local nodes: %d' % len(self.local_datanodes))
-                self.logger.info('The local scores are: %s' % str([node.score for node in self.local_datanodes]))
+                self.logger.info('The number of local nodes: %d', len(self.local_datanodes))
+                self.logger.info('The local scores are: %s', str([node.score for node in self.local_datanodes]))
 
             # Add the original dataset into the beam set.
             for _ in range(1 + self.beam_width - len(self.beam_set)):
                 self.beam_set.append(self.root_node)
             self.temporary_nodes = list()
-            self.logger.info('Finish one level in beam search: %d: %d' % (self.iteration_id, len(self.beam_set)))
+            self.logger.info('Finish one level in beam search: %d: %d', self.iteration_id, len(self.beam_set))
 
         # Maintain the local incumbent data node.
         if self.shared_mode:
@@ -291,11 +303,20 @@ class HyperbandOptimizer(Optimizer):
             if len(self.local_datanodes) > self.beam_width:
                 self.local_datanodes = TransformationGraph.sort_nodes_by_score(self.local_datanodes)[:self.beam_width]
 
+        # Free the nodes that are out of the beam.
+        alive_nodes = self.get_alive_nodes()
+        self.node_store.retain(alive_nodes)
+        # Drop the pruned branches and their transformers from the graph.
+        self.graph.compact(alive_nodes)
         self.iteration_id += 1
         self.execution_history[self.iteration_id] = execution_status
         iteration_cost = time.time() - _iter_start_time
         return self.incumbent.score, iteration_cost, self.incumbent
 
+    def get_alive_nodes(self):
+        return [self.root_node, self.incumbent] + self.beam_set + self.temporary_nodes + \
+               self.features_hist + self.local_datanodes + self.global_datanodes
+
     def refresh_beam_set(self):
         if len(self.global_datanodes) > 0:
             self.logger.info('Sync the global nodes!')
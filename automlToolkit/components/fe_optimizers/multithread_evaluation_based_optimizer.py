@@ -1,32 +1,126 @@
-from collections import namedtuple
-from concurrent.futures import ThreadPoolExecutor
-
-import gc
+import os
 import time
+import shutil
+import weakref
+import tempfile
+from collections import namedtuple, OrderedDict
 
 from automlToolkit.components.fe_optimizers.evaluation_based_optimizer import EvaluationBasedOptimizer
 from automlToolkit.components.evaluators.base_evaluator import _BaseEvaluator
 from automlToolkit.components.feature_engineering.transformation_graph import *
-from automlToolkit.components.utils.constants import SUCCESS, ERROR, TIMEOUT
+from automlToolkit.components.utils.constants import SUCCESS, ERROR
+from automlToolkit.components.computation.process_pool import KillableProcessPool
+from automlToolkit.components.computation.resource_manager import get_resource_manager
+from automlToolkit.utils.tracing import traced
 
 EvaluationResult = namedtuple('EvaluationResult', 'status duration score extra')
 
+# The shared nodes loaded in a worker process.
+_shared_nodes = OrderedDict()
+
+
+def _load_shared_node(node_ref):
+    path, X, y, (feature_types, task_type, depth, trans_hist, score) = node_ref
+    if path is not None:
+        if path not in _shared_nodes:
+            _shared_nodes[path] = np.load(path, mmap_mode='c')
+            if len(_shared_nodes) > 4:
+                _shared_nodes.popitem(last=False)
+        X = _shared_nodes[path]
+    node = DataNode([X, y], list(feature_types), task_type)
+    node.depth = depth
+    node.trans_hist = list(trans_hist)
+    node.score = score
+    return node
+
+
+def _evaluate_transformation(transformer, node_ref, evaluator, hp_config, n_parallel=1):
+    node = _load_shared_node(node_ref)
+    # The worker processes share the core budget.
+    with get_resource_manager().allot(n_parallel=n_parallel):
+        output = transformer.operate(node)
+
+        # Evaluate this node.
+        if transformer.type != 0:
+            output.depth = node.depth + 1
+            output.trans_hist.append(transformer.type)
+            score = evaluator(hp_config, data_node=output, name='fe')
+            output.score = score
+        else:
+            score = output.score
+    return output, score, transformer
+
 
 class MultiThreadEvaluationBasedOptimizer(EvaluationBasedOptimizer):
+    """
+    Evaluate the candidate transformations in a pool of n_jobs worker processes.
+    The candidates over time_limit_per_trans are killed, and the queued ones are cancelled
+    once the budget runs out.
+    """
+
     def __init__(self, task_type, input_data: DataNode, evaluator: _BaseEvaluator,
                  model_id: str, time_limit_per_trans: int,
                  mem_limit_per_trans: int,
                  seed: int, shared_mode: bool = False,
-                 batch_size: int = 2, beam_width: int = 3, trans_set=None, n_jobs=4):
+                 batch_size: int = 2, beam_width: int = 3, trans_set=None, n_jobs=4,
+                 memory_budget=None, output_dir=None):
         super().__init__(task_type, input_data, evaluator, model_id, time_limit_per_trans,
-                         mem_limit_per_trans, seed, shared_mode, batch_size, beam_width, trans_set)
+                         mem_limit_per_trans, seed, shared_mode, batch_size, beam_width,
+                         trans_set=trans_set, memory_budget=memory_budget, output_dir=output_dir)
         self.n_jobs = n_jobs
+        # The worker processes live across iterations, and are started at the first one.
+        self.pool = None
+        self.share_dir = None
+        self.share_cnt = 0
+        self.shared_files = list()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pool'] = None
+        return state
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = KillableProcessPool(self.n_jobs)
+            weakref.finalize(self, self.pool.shutdown)
+        return self.pool
 
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def share_node(self, node: DataNode):
+        """
+        Save the features of a node to a file, which the workers map instead of receiving a copy with each task.
+        :return: the reference to the node, passed to the workers.
+        """
+        X, y = node.data
+        attrs = (node.feature_types, node.task_type, node.depth, node.trans_hist, node.score)
+        if not isinstance(X, np.ndarray) or X.dtype.hasobject:
+            return None, X, y, attrs
+        if self.share_dir is None:
+            self.share_dir = tempfile.mkdtemp(prefix='fe_shared_', dir=self.node_store.output_dir)
+            weakref.finalize(self, shutil.rmtree, self.share_dir, True)
+        path = os.path.join(self.share_dir, 'node_%d.npy' % self.share_cnt)
+        self.share_cnt += 1
+        np.save(path, X)
+        self.shared_files.append(path)
+        return path, None, y, attrs
+
+    def release_shared_nodes(self):
+        for path in self.shared_files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.shared_files = list()
+
+    @traced('fe_optimizer.iterate', category='optimizer')
     def iterate(self):
         _iter_start_time = time.time()
         _evaluation_cnt = 0
         execution_status = list()
-        tasks = list()
 
         if self.iteration_id == 0:
             # Evaluate the original features.
@@ -49,22 +143,32 @@ class MultiThreadEvaluationBasedOptimizer(EvaluationBasedOptimizer):
             self.root_node.score = self.incumbent_score
             _evaluation_cnt += 1
             self.beam_set.append(self.root_node)
+            self.node_store.add(self.root_node)
+            # Expand the seed pipelines first.
+            seed_nodes = self.evaluate_seed_pipelines()
+            _evaluation_cnt += len(seed_nodes)
+            self.beam_set = seed_nodes + self.beam_set
 
         if len(self.beam_set) == 0 or self.early_stopped_flag:
             self.early_stopped_flag = True
             return self.incumbent.score, time.time() - _iter_start_time, self.incumbent
-        else:
-            # Get one node in the beam set.
-            node_ = self.beam_set[0]
-            del self.beam_set[0]
 
         self.logger.debug('=' * 50)
-        self.logger.info('Start %d-th FE iteration.' % self.iteration_id)
+        self.logger.info('Start %d-th FE iteration.', self.iteration_id)
 
-        # Limit the maximum depth in graph.
-        # Avoid the too complex features.
+        # Expand several nodes in the beam set at once, until there are enough candidates for all the workers.
+        pool = self.get_pool()
+        tasks = dict()
+        expanded_num = 0
+        while len(self.beam_set) > 0 and (expanded_num == 0 or len(tasks) < self.n_jobs):
+            node_ = self.beam_set.pop(0)
+            expanded_num += 1
+            self.node_store.load(node_)
+            # Limit the maximum depth in graph.
+            # Avoid the too complex features.
+            if node_.depth > self.max_depth:
+                continue
 
-        if node_.depth <= self.max_depth:
             # The polynomial and cross features are eliminated in the latter transformations.
             _trans_types = self.trans_types.copy()
             if node_.depth > 1 and 17 in _trans_types:
@@ -73,107 +177,78 @@ class MultiThreadEvaluationBasedOptimizer(EvaluationBasedOptimizer):
             trans_set = self.transformer_manager.get_transformations(
                 node_, trans_types=_trans_types, batch_size=self.hpo_batch_size
             )
-            self.logger.info('The number of transformations is: %d' % len(trans_set))
             if len(trans_set) == 1 and trans_set[0].type == 0:
-                return self.incumbent.score, 0, self.incumbent
+                continue
 
-            pool = ThreadPoolExecutor(max_workers=self.n_jobs)
+            node_ref = self.share_node(node_)
             for transformer in trans_set:
-                self.logger.debug('[%s][%s]' % (self.model_id, transformer.name))
-
+                self.logger.debug('[%s][%s]', self.model_id, transformer.name)
                 if transformer.type != 0:
                     self.transformer_manager.add_execution_record(node_.node_id, transformer.type)
+                task_id = pool.submit(_evaluate_transformation, transformer, node_ref,
+                                      self.evaluator, self.hp_config, self.n_jobs)
+                tasks[task_id] = (node_, transformer)
+        self.logger.info('The number of transformations is: %d', len(tasks))
 
-                # @timeout(self.time_limit_per_trans, use_signals=True)
-                def evaluate(tran, node):
-                    start_time = time.time()
-                    output = tran.operate(node)
-
-                    # Evaluate this node.
-                    if tran.type != 0:
-                        output.depth = node.depth + 1
-                        output.trans_hist.append(tran.type)
-                        score = self.evaluator(self.hp_config, data_node=output, name='fe')
-                        output.score = score
-                    else:
-                        score = output.score
-                    return output, score, time.time() - start_time
-
-                # Limit the execution and evaluation time for each transformation.
-                tasks.append(pool.submit(evaluate, transformer, node_))
-
-            # Wait until all tasks finish
-            all_completed = False
-            while not all_completed:
-                all_completed = True
-                eval_cnt = 0
-                for task in tasks:
-                    if not task.done():
-                        all_completed = False
-                    else:
-                        eval_cnt += 1
-                self.logger.debug("Evaluated transformations: %d/%s" % (eval_cnt, len(tasks)))
-                # Cancel waited threads if budget runs out
-                if (self.maximum_evaluation_num is not None and
-                    self.evaluation_count + eval_cnt > self.maximum_evaluation_num) or \
-                        (self.time_budget is not None and
-                         time.time() >= self.start_time + self.time_budget):
-                    self.logger.debug(
-                        '[Budget Runs Out]: %s, %s\n' % (self.maximum_evaluation_num, self.time_budget))
-                    self.is_ended = True
-                    for task in tasks:
-                        task.cancel()
-                    break
-                time.sleep(0.2)
-
-            for i, task in enumerate(tasks):
-                duration, status, _score = -1, SUCCESS, -1
-                transformer = trans_set[i]
-                extra = ['%d' % _evaluation_cnt, self.model_id, transformer.name]
-                try:
-                    output_node, _score, duration = task.result()
-                    if _score is None:
-                        status = ERROR
-                    else:
-                        self.temporary_nodes.append(output_node)
-                        self.graph.add_node(output_node)
-                        # Avoid self-loop.
-                        if transformer.type != 0 and node_.node_id != output_node.node_id:
-                            self.graph.add_trans_in_graph(node_, output_node, transformer)
-                        if _score > self.incumbent_score:
-                            self.incumbent_score = _score
-                            self.incumbent = output_node
-                            self.features_hist.append(output_node)
-
-                except Exception as e:
-                    extra.append(str(e))
-                    self.logger.error('%s: %s' % (transformer.name, str(e)))
+        # Handle the candidates in the order of completion, the runaway ones are killed after the time limit.
+        for task_id, status, result, duration in pool.as_completed(time_limit=self.time_limit_per_trans):
+            node_, transformer = tasks[task_id]
+            _score = -1
+            extra = ['%d' % _evaluation_cnt, self.model_id, transformer.name]
+            if status == SUCCESS:
+                # The transformer is fitted in the worker.
+                output_node, _score, transformer = result
+                if _score is None:
                     status = ERROR
-                    if isinstance(e, TimeoutError):
-                        status = TIMEOUT
-
-                execution_status.append(
-                    EvaluationResult(status=status,
-                                     duration=duration if duration != -1 else self.time_limit_per_trans,
-                                     score=_score,
-                                     extra=extra))
-                _evaluation_cnt += 1
-                self.evaluation_count += 1
-            pool.shutdown(wait=True)
-
-            # Memory Save: free the data in the unpromising nodes.
-            _scores = list()
-            for tmp_node in self.temporary_nodes:
-                _score = tmp_node.score if tmp_node.score is not None else 0.0
-                _scores.append(_score)
-            _idxs = np.argsort(-np.array(_scores))[:self.beam_width + 1]
-            self.temporary_nodes = [self.temporary_nodes[_idx] for _idx in _idxs]
+                else:
+                    self.temporary_nodes.append(output_node)
+                    self.node_store.add(output_node)
+                    self.graph.add_node(output_node)
+                    # Avoid self-loop.
+                    if transformer.type != 0 and node_.node_id != output_node.node_id:
+                        self.graph.add_trans_in_graph(node_, output_node, transformer)
+                    if _score > self.incumbent_score:
+                        self.incumbent_score = _score
+                        self.incumbent = output_node
+                        self.features_hist.append(output_node)
+            else:
+                extra.append(result)
+                self.logger.error('%s: %s', transformer.name, result)
+
+            execution_status.append(
+                EvaluationResult(status=status,
+                                 duration=duration,
+                                 score=_score,
+                                 extra=extra))
+            _evaluation_cnt += 1
+            self.evaluation_count += 1
+
+            if (self.maximum_evaluation_num is not None
+                and self.evaluation_count > self.maximum_evaluation_num) or \
+                    (self.time_budget is not None
+                     and time.time() >= self.start_time + self.time_budget):
+                self.logger.debug('[Budget Runs Out]: %s, %s\n', self.maximum_evaluation_num, self.time_budget)
+                self.is_ended = True
+                # Drop the queued candidates and stop the running ones.
+                cancelled = pool.cancel_pending() + pool.kill_running()
+                self.logger.debug('Cancel %d transformations.', len(cancelled))
+                break
+        self.release_shared_nodes()
+        if self.is_ended:
+            self.shutdown()
+
+        # Memory Save: free the data in the unpromising nodes.
+        _scores = list()
+        for tmp_node in self.temporary_nodes:
+            _score = tmp_node.score if tmp_node.score is not None else 0.0
+            _scores.append(_score)
+        _idxs = np.argsort(-np.array(_scores))[:self.beam_width + 1]
+        self.temporary_nodes = [self.temporary_nodes[_idx] for _idx in _idxs]
 
         self.logger.info('\n [Current Inc]: %.4f, [Improvement]: %.5f' %
                          (self.incumbent_score, self.incumbent_score - self.baseline_score))
 
         self.evaluation_num_last_iteration = max(self.evaluation_num_last_iteration, _evaluation_cnt)
-        gc.collect()
 
         # Update the beam set according to their performance.
         if len(self.beam_set) == 0:
@@ -185,14 +260,14 @@ class MultiThreadEvaluationBasedOptimizer(EvaluationBasedOptimizer):
                     self.local_datanodes.append(node_)
 
             if self.shared_mode:
-                self.logger.info('The number of local nodes: %d' % len(self.local_datanodes))
-                self.logger.info('The local scores are: %s' % str([node.score for node in self.local_datanodes]))
+                self.logger.info('The number of local nodes: %d', len(self.local_datanodes))
+                self.logger.info('The local scores are: %s', str([node.score for node in self.local_datanodes]))
 
             # Add the original dataset into the beam set.
             for _ in range(1 + self.beam_width - len(self.beam_set)):
                 self.beam_set.append(self.root_node)
             self.temporary_nodes = list()
-            self.logger.info('Finish one level in beam search: %d: %d' % (self.iteration_id, len(self.beam_set)))
+            self.logger.info('Finish one level in beam search: %d: %d', self.iteration_id, len(self.beam_set))
 
         # Maintain the local incumbent data node.
         if self.shared_mode:
@@ -201,6 +276,12 @@ class MultiThreadEvaluationBasedOptimizer(EvaluationBasedOptimizer):
             if len(self.local_datanodes) > self.beam_width:
                 self.local_datanodes = TransformationGraph.sort_nodes_by_score(self.local_datanodes)[:self.beam_width]
 
+        # Free the nodes that are out of the beam.
+        alive_nodes = self.get_alive_nodes()
+        self.node_store.retain(alive_nodes)
+        # Drop the pruned branches and their transformers from the graph.
+        self.graph.compact(alive_nodes)
+
         self.iteration_id += 1
         self.execution_history[self.iteration_id] = execution_status
         iteration_cost = time.time() - _iter_start_time
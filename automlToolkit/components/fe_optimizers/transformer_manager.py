@@ -1,7 +1,7 @@
 import abc
 import typing
 from automlToolkit.components.feature_engineering.transformation_graph import DataNode
-from automlToolkit.components.feature_engineering.transformations import _transformers, _type_infos
+from automlToolkit.components.feature_engineering.transformations import _transformers, _type_infos, _trans_types
 from automlToolkit.components.utils.configspace_utils import sample_configurations
 
 
@@ -45,7 +45,7 @@ class TransformerManager(object, metaclass=abc.ABCMeta):
             if id not in self.hyper_configs:
                 self.hyper_configs[id] = list()
 
-            trans_type = _transformers[id]().type
+            trans_type = _trans_types[id]
             if trans_type not in trans_types:
                 continue
 
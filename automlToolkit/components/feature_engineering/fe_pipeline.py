@@ -122,17 +122,14 @@ class FEPipeline(object, metaclass=abc.ABCMeta):
         return input_node
 
     def preprocess(self, input_node: DataNode, train_phase=True):
-        print('=' * 20)
-        print(input_node.shape)
+        self._logger.debug('Shape before pre-processing: %s', input_node.shape)
         input_node = self.remove_uninf_cols(input_node, train_phase)
-        print(input_node.shape)
+        self._logger.debug('Shape after removing uninformative columns: %s', input_node.shape)
         input_node = self.impute_cols(input_node)
-        print(input_node.shape)
         input_node = self.one_hot(input_node)
-        print(input_node.shape)
+        self._logger.debug('Shape after one-hot encoding: %s', input_node.shape)
         input_node = self.remove_cols_with_same_values(input_node)
-        print(input_node.shape)
-        print('=' * 20)
+        self._logger.debug('Shape after removing constant columns: %s', input_node.shape)
         if self.task_type in CLS_TASKS:
             # Label encoding.
             input_node = self.encode_label(input_node)
@@ -148,7 +145,7 @@ class FEPipeline(object, metaclass=abc.ABCMeta):
 
     def fit(self, data_node: DataNode):
         preprocessed_node = self.preprocess(data_node, train_phase=True)
-        print('After pre-processing, the shape is', preprocessed_node.shape)
+        self._logger.info('After pre-processing, the shape is %s', preprocessed_node.shape)
 
         # TODO: dtype is object.
         if self.fe_enabled:
@@ -167,7 +164,7 @@ class FEPipeline(object, metaclass=abc.ABCMeta):
 
     def transform(self, test_data: DataNode):
         preprocessed_node = self.preprocess(test_data, train_phase=False)
-        print('After pre-processing, the shape is', preprocessed_node.shape)
+        self._logger.info('After pre-processing, the shape is %s', preprocessed_node.shape)
         if not self.fe_enabled:
             return preprocessed_node
         return self.optimizer.apply(preprocessed_node, self.optimizer.incumbent)
@@ -0,0 +1,172 @@
+import threading
+import numpy as np
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+
+
+class _CachedScores(object):
+    """
+    A score function that answers with the scores computed before, for the univariate selectors.
+    """
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def __call__(self, X, y):
+        return self.scores
+
+
+class FeatureStats(object):
+    """
+    The statistics of the features of a data node: the moments, the sorted columns as a quantile sketch,
+    and the univariate scores of each score function. They are computed at the first request and
+    shared by all the transformers fitted on the node, e.g., a batch of selectors that differ only in
+    the percentile scores the features once. The statistics are keyed by the target fields.
+    """
+
+    def __init__(self):
+        self.cache = dict()
+        self._lock = threading.Lock()
+        self._key_locks = dict()
+
+    def __getstate__(self):
+        # The copies in the worker processes compute their own statistics.
+        return dict()
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def _get(self, key, compute):
+        if key in self.cache:
+            return self.cache[key]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # The concurrent requests of one statistic wait for the first one, the others go on.
+        with key_lock:
+            if key not in self.cache:
+                self.cache[key] = compute()
+        return self.cache[key]
+
+    def get_moments(self, X, fields):
+        """
+        :param X: the values of the target fields, used on the first request.
+        :return: dict of the columnwise min, max, max_abs, mean and var, NaNs ignored.
+        """
+
+        def compute():
+            _X = np.asarray(X, dtype=np.float64)
+            return {'min': np.nanmin(_X, axis=0), 'max': np.nanmax(_X, axis=0),
+                    'max_abs': np.nanmax(np.abs(_X), axis=0),
+                    'mean': np.nanmean(_X, axis=0), 'var': np.nanvar(_X, axis=0)}
+
+        return self._get(('moments', tuple(fields)), compute)
+
+    def get_sorted_columns(self, X, fields):
+        """
+        :return: the sorted values of each column, NaNs last.
+        """
+        return self._get(('sorted', tuple(fields)), lambda: np.sort(np.asarray(X, dtype=np.float64), axis=0))
+
+    def get_percentiles(self, X, fields, q):
+        """
+        :param q: the percentiles in [0, 100].
+        :return: the columnwise percentiles with shape (len(q), n_fields), NaNs ignored.
+        """
+        q = tuple(float(val) for val in q)
+
+        def compute():
+            # Selecting from the sorted columns takes linear time.
+            return np.nanpercentile(self.get_sorted_columns(X, fields), q, axis=0)
+
+        return self._get(('percentiles', tuple(fields), q), compute)
+
+    def get_scores(self, X, y, fields, score_func, name=None):
+        """
+        :param name: the id of the score function, its name by default.
+        :return: the output of score_func(X, y), e.g., the scores and the p-values.
+        """
+        name = score_func.__name__ if name is None else name
+        return self._get(('scores', tuple(fields), name), lambda: score_func(X, y))
+
+    def fit_selector(self, selector, X, y, fields, name=None):
+        """
+        Fit a univariate selector of scikit-learn, e.g., SelectPercentile, with the cached scores.
+        """
+        score_func = selector.score_func
+        selector.score_func = _CachedScores(self.get_scores(X, y, fields, score_func, name))
+        try:
+            selector.fit(X, y)
+        finally:
+            selector.score_func = score_func
+        return selector
+
+    def fit_scaler(self, scaler, X, fields):
+        """
+        Fit a scaler of scikit-learn on a few rows with the same statistics as X.
+        A RobustScaler with a quantile range inside (25, 75) is fitted on X.
+        :param scaler: one of MinMaxScaler, MaxAbsScaler, StandardScaler and RobustScaler.
+        """
+        name = type(scaler).__name__
+        if name == 'MinMaxScaler':
+            moments = self.get_moments(X, fields)
+            summary = np.vstack([moments['min'], moments['max']])
+        elif name == 'MaxAbsScaler':
+            summary = self.get_moments(X, fields)['max_abs'].reshape(1, -1)
+        elif name == 'StandardScaler':
+            moments = self.get_moments(X, fields)
+            std = np.sqrt(moments['var'])
+            summary = np.vstack([moments['mean'] - std, moments['mean'] + std])
+        elif name == 'RobustScaler':
+            q_min, q_max = scaler.quantile_range
+            if q_min > 25. or q_max < 75.:
+                return scaler.fit(X)
+            lower, median, upper = self.get_percentiles(X, fields, (q_min, 50., q_max))
+            # On these five rows, the percentiles up to 25 are lower, and the ones from 75 are upper.
+            # So the median and the quantiles are exactly the ones of X as long as the range covers (25, 75).
+            summary = np.vstack([lower, lower, median, upper, upper])
+        else:
+            raise ValueError('Invalid scaler: %s!' % name)
+        return scaler.fit(summary)
+
+    def fit_discretizer(self, discretizer, X, fields):
+        """
+        Fit a KBinsDiscretizer of scikit-learn with the cached moments or quantiles.
+        The kmeans strategy is fitted on X.
+        """
+        if discretizer.strategy == 'kmeans':
+            return discretizer.fit(X)
+        n_bins = discretizer.n_bins
+        if discretizer.strategy == 'uniform':
+            moments = self.get_moments(X, fields)
+            return discretizer.fit(np.vstack([moments['min'], moments['max']]))
+
+        bin_edges = self.get_percentiles(X, fields, np.linspace(0, 100, n_bins + 1))
+        discretizer.fit(bin_edges)
+        # Set the quantile edges of X, without the bins too small.
+        edges, n_bins_ = np.zeros(bin_edges.shape[1], dtype=object), np.zeros(bin_edges.shape[1], dtype=int)
+        for idx in range(bin_edges.shape[1]):
+            column_edges = bin_edges[:, idx]
+            if column_edges[0] == column_edges[-1]:
+                column_edges = np.array([-np.inf, np.inf])
+            else:
+                column_edges = column_edges[np.ediff1d(column_edges, to_begin=np.inf) > 1e-8]
+            edges[idx], n_bins_[idx] = column_edges, len(column_edges) - 1
+        discretizer.bin_edges_, discretizer.n_bins_ = edges, n_bins_
+        return discretizer
+
+
+_stats_lock = threading.Lock()
+
+
+def get_feature_stats(node: DataNode):
+    """
+    :return: the statistics cache of a data node, created at the first call.
+    """
+    if node.feature_stats is None:
+        with _stats_lock:
+            if node.feature_stats is None:
+                node.feature_stats = FeatureStats()
+    return node.feature_stats
@@ -0,0 +1,144 @@
+import pickle
+import hashlib
+import threading
+import numpy as np
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.utils.logging_utils import get_logger
+
+
+def get_feature_key(node: DataNode):
+    """
+    The content hash of a data node: its features, labels and feature types.
+    The key is kept on the node, the data of a node never changes once it is built.
+    """
+    if node.feature_key is not None:
+        return node.feature_key
+    hasher = hashlib.sha1()
+    for array in node.data[:2]:
+        if array is None:
+            hasher.update(b'None')
+            continue
+        array = np.asarray(array)
+        hasher.update(str((array.dtype, array.shape)).encode())
+        if array.dtype.hasobject:
+            hasher.update(pickle.dumps(array.tolist()))
+        else:
+            hasher.update(np.ascontiguousarray(array).tobytes())
+    hasher.update(repr(None if node.feature_types is None else list(node.feature_types)).encode())
+    node.feature_key = hasher.hexdigest()
+    return node.feature_key
+
+
+def _read_only(array):
+    if not isinstance(array, np.ndarray):
+        return array
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class _FeatureEntry(object):
+    def __init__(self, node: DataNode):
+        self.data = [_read_only(val) for val in node.data[:2]]
+        self.feature_types = list(node.feature_types)
+        self.task_type = node.task_type
+        # The lineage: the transformations that built the features, and the arms that produced them.
+        self.trans_hist = list(node.trans_hist)
+        self.depth = node.depth
+        self.score = node.score
+        self.sources = list()
+        self.ref_cnt = 0
+
+
+class FeatureStore(object):
+    """
+    Hold each distinct engineered feature matrix of a run once. The sub-bandits share the global
+    data nodes through the store: a node is added once by content hash, and each consumer acquires a
+    lightweight node whose arrays are read-only views of the stored ones, instead of a deep copy.
+    The transformers never write into their input, so the views are safe to expand.
+    An entry is dropped when its last reference is released.
+    Usage:
+        key = store.add(node, source=arm)
+        shared_node = store.acquire(key)
+        ...
+        store.release(key)
+    """
+
+    def __init__(self):
+        self.entries = dict()
+        self.hit_cnt = 0
+        self._lock = threading.Lock()
+        self.logger = get_logger('FeatureStore')
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def nbytes(self):
+        return sum(val.nbytes for entry in self.entries.values()
+                   for val in entry.data if isinstance(val, np.ndarray))
+
+    def add(self, node: DataNode, source=None):
+        """
+        Store the features of a node, unless the same features are stored already.
+        :param source: the producer of the node, e.g., the algorithm id of the sub-bandit.
+        :return: the key of the features.
+        """
+        key = get_feature_key(node)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = _FeatureEntry(node)
+                self.entries[key] = entry
+                self.logger.debug('Stored the features %s of shape %s.', key[:8], node.data[0].shape)
+            else:
+                self.hit_cnt += 1
+            if source is not None and source not in entry.sources:
+                entry.sources.append(source)
+        return key
+
+    def acquire(self, key):
+        """
+        Take a reference to the stored features.
+        :return: a new data node that shares the stored arrays.
+        """
+        with self._lock:
+            if key not in self.entries:
+                raise ValueError('Invalid feature key: %s!' % key)
+            entry = self.entries[key]
+            entry.ref_cnt += 1
+        node = DataNode(list(entry.data), entry.feature_types.copy(), entry.task_type)
+        node.trans_hist = entry.trans_hist.copy()
+        node.depth = entry.depth
+        node.feature_key = key
+        return node
+
+    def release(self, key):
+        """
+        Drop a reference to the stored features, and the features themselves with the last one.
+        The nodes acquired before keep their arrays until they are freed.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry.ref_cnt -= 1
+            if entry.ref_cnt <= 0:
+                del self.entries[key]
+
+    def get_lineage(self, key):
+        """
+        :return: the transformations, depth, score and producers of the stored features.
+        """
+        entry = self.entries[key]
+        return {'trans_hist': entry.trans_hist.copy(), 'depth': entry.depth,
+                'score': entry.score, 'sources': entry.sources.copy()}
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
@@ -0,0 +1,158 @@
+import os
+import shutil
+import weakref
+import tempfile
+import numpy as np
+from collections import OrderedDict
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.utils.logging_utils import get_logger
+
+
+def get_node_nbytes(node: DataNode):
+    if node.data is None:
+        return 0
+    if isinstance(node.data[0], np.ndarray) and not node.data[0].flags.writeable:
+        # The read-only features are held by the feature store, not by this node.
+        return 0
+    return sum(val.nbytes for val in node.data[:2] if isinstance(val, np.ndarray))
+
+
+class NodeStore(object):
+    """
+    Track the memory held by the data nodes of a feature engineering optimizer.
+    When the resident size exceeds the budget, the features of the least recently used nodes
+    are spilled to memory-mapped files. A spilled node stays usable, its features are read from the file,
+    and `load` brings them back to memory before the node is expanded.
+    """
+
+    def __init__(self, memory_budget=None, output_dir=None):
+        """
+        :param memory_budget: the budget for the resident features in MB, None means no limit.
+        :param output_dir: the directory for the spill files, a temporary directory by default.
+        """
+        self.memory_budget = None if memory_budget is None else int(memory_budget * 1024 * 1024)
+        self.output_dir = output_dir
+        # id(node) -> node, in the order of the last access.
+        self.nodes = OrderedDict()
+        self.nbytes = dict()
+        self.spill_files = dict()
+        self.resident_bytes = 0
+        self.spill_cnt = 0
+        self.spill_dir = None
+        self.logger = get_logger('NodeStore')
+
+    def __contains__(self, node):
+        return id(node) in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def is_spilled(self, node):
+        return id(node) in self.spill_files
+
+    def add(self, node: DataNode):
+        """
+        Track a node, or mark it as recently used, then spill other nodes if the budget is exceeded.
+        """
+        key = id(node)
+        if key in self.nodes:
+            self.nodes.move_to_end(key)
+        else:
+            self.nodes[key] = node
+            self.nbytes[key] = get_node_nbytes(node)
+            self.resident_bytes += self.nbytes[key]
+        self._enforce_budget(exclude=key)
+
+    def load(self, node: DataNode):
+        """
+        Bring the features of a node back to memory, and track it.
+        """
+        key = id(node)
+        if key in self.spill_files:
+            X, y = node.data[0], node.data[1]
+            node.data = [np.array(X), y]
+            del X
+            self._remove_file(self.spill_files.pop(key))
+            self.resident_bytes -= self.nbytes[key]
+            self.nbytes[key] = get_node_nbytes(node)
+            self.resident_bytes += self.nbytes[key]
+        self.add(node)
+
+    def release(self, node: DataNode):
+        """
+        Stop tracking a node and remove its spill file. The data is freed once the caller drops the node.
+        """
+        key = id(node)
+        if key not in self.nodes:
+            return
+        del self.nodes[key]
+        if key in self.spill_files:
+            self._remove_file(self.spill_files.pop(key))
+        self.resident_bytes -= self.nbytes.pop(key)
+
+    def retain(self, nodes):
+        """
+        Release all the tracked nodes, except the given ones.
+        """
+        keep = set(id(node) for node in nodes)
+        for key in [key for key in self.nodes if key not in keep]:
+            self.release(self.nodes[key])
+
+    def _enforce_budget(self, exclude=None):
+        if self.memory_budget is None or self.resident_bytes <= self.memory_budget:
+            return
+        for key in list(self.nodes.keys()):
+            if self.resident_bytes <= self.memory_budget:
+                break
+            if key == exclude or key in self.spill_files:
+                continue
+            self._spill(self.nodes[key])
+        if self.resident_bytes > self.memory_budget:
+            self.logger.warning('The resident nodes take %.1fMB, more than the budget %.1fMB.',
+                                self.resident_bytes / 1024 ** 2, self.memory_budget / 1024 ** 2)
+
+    def _spill(self, node: DataNode):
+        key = id(node)
+        X = node.data[0]
+        # Only dense numerical arrays can be memory-mapped.
+        if not isinstance(X, np.ndarray) or X.dtype.hasobject or X.size == 0:
+            return
+        if not X.flags.writeable:
+            # Shared through the feature store, spilling it frees nothing.
+            return
+        if self.spill_dir is None:
+            if self.output_dir is not None and not os.path.exists(self.output_dir):
+                os.makedirs(self.output_dir)
+            self.spill_dir = tempfile.mkdtemp(prefix='fe_nodes_', dir=self.output_dir)
+            weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+
+        path = os.path.join(self.spill_dir, 'node_%d.npy' % self.spill_cnt)
+        self.spill_cnt += 1
+        mmap = np.lib.format.open_memmap(path, mode='w+', dtype=X.dtype, shape=X.shape)
+        mmap[:] = X
+        mmap.flush()
+        del mmap
+        # Copy-on-write, so the in-place updates of the transformers never reach the file.
+        node.data = [np.load(path, mmap_mode='c'), node.data[1]]
+        self.spill_files[key] = path
+        # The labels stay in memory, they are small compared to the features.
+        self.nbytes[key] -= X.nbytes
+        self.resident_bytes -= X.nbytes
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            # On Windows, a file cannot be removed while it is mapped.
+            pass
+
+    def close(self):
+        self.nodes.clear()
+        self.nbytes.clear()
+        self.spill_files.clear()
+        self.resident_bytes = 0
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
@@ -12,6 +12,10 @@ class DataNode(object):
         self.score = None
         self.trans_hist = list()
         self.enable_balance = False
+        # The content hash of the features, set at its first use, see get_feature_key.
+        self.feature_key = None
+        # The statistics of the features shared by the transformers, see feature_stats.
+        self.feature_stats = None
 
     def __eq__(self, node):
         """Overrides the default implementation"""
@@ -56,6 +60,8 @@ class DataNode(object):
             self.data.append(val.copy() if val is not None else None)
         self.feature_types = node.feature_types.copy()
         self.task_type = node.task_type
+        self.feature_key = None
+        self.feature_stats = None
 
     @property
     def node_id(self):
@@ -98,22 +104,39 @@ class TransformationEdge(object):
 
 
 class TransformationGraph(object):
+    """
+    The data nodes and the transformations between them. The graph keeps the rank of each node
+    in a topological order, updated as the edges are added, and the ancestor path of each node,
+    so that the path of a node is found in O(path length).
+    """
+
     def __init__(self):
-        # Store the data nodes.
-        self.nodes = list()
-        # Store the edge information.
-        self.edges = list()
+        # Store the data nodes and the edges by id, the ids are not reused after a compaction.
+        self.nodes = dict()
+        self.edges = dict()
         self.node_size = 0
         self.edge_size = 0
+        # The parents and the children of each node.
         self.input_data_dict = dict()
         self.input_edge_dict = dict()
         self.adjacent_list = dict()
+        # The rank of each node in a topological order.
+        self.ranks = dict()
+        self.rank_cnt = 0
+        # The nodes kept by the compaction, with their ancestors.
+        self.pinned = set()
+        self._path_cache = dict()
 
     def add_edge(self, input, output, transformer):
+        for node_id in [input, output]:
+            if node_id not in self.nodes:
+                raise ValueError('Invalid node: %d is not in the graph, e.g., dropped by the compaction!' % node_id)
         fields = transformer.target_fields
         edge = TransformationEdge(input, output, transformer, fields)
         edge.id = self.edge_size
-        self.edges.append(edge)
+        if self.ranks[input] > self.ranks[output]:
+            self._reorder(input, output)
+        self.edges[edge.id] = edge
         self.edge_size += 1
         if output not in self.input_data_dict:
             self.input_data_dict[output] = list()
@@ -125,15 +148,17 @@ class TransformationGraph(object):
 
         if output not in self.input_edge_dict:
             self.input_edge_dict[output] = edge.id
+        self._invalidate_paths(output)
 
     def add_trans_in_graph(self, input_datanode, output_datanode, transformer):
         if type(input_datanode) is not list:
-            input_ids = [input_datanode.node_id]
-        else:
-            input_ids = [node.node_id for node in input_datanode]
+            input_datanode = [input_datanode]
+        # The nodes from outside the graph, e.g., the global nodes of the other optimizers, become roots.
+        input_ids = [self.add_node(node) for node in input_datanode]
+        output_id = self.add_node(output_datanode)
 
         for input_id in input_ids:
-            self.add_edge(input_id, output_datanode.node_id, transformer)
+            self.add_edge(input_id, output_id, transformer)
 
     def add_node(self, data_node: DataNode):
         # Avoid adding the same node into the graph multiple times.
@@ -142,11 +167,14 @@ class TransformationGraph(object):
 
         node_id = self.node_size
         data_node._node_id = node_id
-        image_node = data_node.copy_()
         # Image node does not store the data in the graph.
-        image_node.data = None
+        image_node = DataNode(None, data_node.feature_types.copy(), data_node.task_type)
+        image_node.trans_hist = data_node.trans_hist.copy()
+        image_node.depth = data_node.depth
         image_node._node_id = node_id
-        self.nodes.append(image_node)
+        self.nodes[node_id] = image_node
+        self.ranks[node_id] = self.rank_cnt
+        self.rank_cnt += 1
         self.node_size += 1
         return node_id
 
@@ -156,44 +184,109 @@ class TransformationGraph(object):
     def get_edge(self, edge_id):
         return self.edges[edge_id]
 
-    def topological_sort(self):
-        for i in range(self.node_size):
-            if i not in self.adjacent_list:
-                self.adjacent_list[i] = list()
-
-        is_visited = [False] * self.node_size
-        result = []
+    def _reorder(self, input, output):
+        """
+        Restore the topological order before adding the edge input -> output, where input ranks after output.
+        Only the nodes ranked between them are moved (Pearce and Kelly, 2006).
+        """
+        lower, upper = self.ranks[output], self.ranks[input]
+        forward, stack = set(), [output]
+        while len(stack) > 0:
+            node_id = stack.pop()
+            if node_id == input:
+                raise ValueError('Invalid edge: %d -> %d makes a cycle!' % (input, output))
+            if node_id in forward:
+                continue
+            forward.add(node_id)
+            stack.extend(child for child in self.adjacent_list.get(node_id, list()) if self.ranks[child] <= upper)
+        backward, stack = set(), [input]
+        while len(stack) > 0:
+            node_id = stack.pop()
+            if node_id in backward:
+                continue
+            backward.add(node_id)
+            stack.extend(parent for parent in self.input_data_dict.get(node_id, list())
+                         if self.ranks[parent] >= lower)
+        # The ancestors of input take the lowest of the freed ranks, then the descendants of output.
+        moved = sorted(backward, key=self.ranks.get) + sorted(forward, key=self.ranks.get)
+        freed_ranks = sorted(self.ranks[node_id] for node_id in moved)
+        for node_id, rank in zip(moved, freed_ranks):
+            self.ranks[node_id] = rank
+
+    def _invalidate_paths(self, node_id):
+        visited, stack = set(), [node_id]
+        while len(stack) > 0:
+            node_id = stack.pop()
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+            self._path_cache.pop(node_id, None)
+            stack.extend(self.adjacent_list.get(node_id, list()))
+
+    def _get_path(self, node_id):
+        if node_id in self._path_cache:
+            return self._path_cache[node_id]
+        # Walk up the chain of single parents, until a cached path, the root or a merge of several parents.
+        chain, top_id = list(), node_id
+        while top_id not in self._path_cache and len(self.input_data_dict.get(top_id, list())) == 1:
+            chain.append(top_id)
+            top_id = self.input_data_dict[top_id][0]
+        parents = self.input_data_dict.get(top_id, list())
+        if top_id in self._path_cache:
+            path = self._path_cache[top_id]
+        elif len(parents) == 0:
+            path = (top_id,)
+        else:
+            ancestors = set()
+            for parent_id in parents:
+                ancestors.update(self._get_path(parent_id))
+            path = tuple(sorted(ancestors, key=self.ranks.get)) + (top_id,)
+            self._path_cache[top_id] = path
+        path = path + tuple(reversed(chain))
+        self._path_cache[node_id] = path
+        return path
 
-        def dfs(v, visited, stack):
-            visited[v] = True
-            for i in self.adjacent_list[v]:
-                if not visited[i]:
-                    dfs(i, visited, stack)
-            stack.insert(0, v)
+    def topological_sort(self):
+        return sorted(self.nodes.keys(), key=self.ranks.get)
 
-        for i in range(self.node_size):
-            if not is_visited[i]:
-                dfs(i, is_visited, result)
+    def get_path_nodes(self, node: DataNode):
+        """
+        :return: the ids of the node and its ancestors, in a topological order.
+        """
+        if node.node_id not in self.nodes:
+            return list()
+        return list(self._get_path(node.node_id))
 
-        return result
+    def pin(self, node: DataNode):
+        """
+        Keep the node and its ancestors in the compaction.
+        """
+        if node.node_id in self.nodes:
+            self.pinned.add(node.node_id)
 
-    def get_path_nodes(self, node: DataNode):
-        result = set()
-
-        def traverse(node_id):
-            result.add(node_id)
-            if node_id in self.input_data_dict:
-                for parent_id in self.input_data_dict[node_id]:
-                    traverse(parent_id)
-
-        traverse(node.node_id)
-        orders = self.topological_sort()
-
-        path_ids = list()
-        for node_id in orders:
-            if node_id in result:
-                path_ids.append(node_id)
-        return path_ids
+    def compact(self, alive_nodes):
+        """
+        Drop the nodes that are neither alive, pinned, nor an ancestor of those, with their edges and transformers.
+        :return: the number of dropped nodes.
+        """
+        keep = set()
+        for node_id in list(self.pinned) + [node.node_id for node in alive_nodes]:
+            if node_id in self.nodes and node_id not in keep:
+                keep.update(self._get_path(node_id))
+        dropped = [node_id for node_id in self.nodes if node_id not in keep]
+        if len(dropped) == 0:
+            return 0
+
+        for node_id in dropped:
+            for _dict in [self.nodes, self.ranks, self.input_data_dict, self.input_edge_dict,
+                          self.adjacent_list, self._path_cache]:
+                _dict.pop(node_id, None)
+        self.pinned &= keep
+        self.edges = {edge_id: edge for edge_id, edge in self.edges.items()
+                      if edge.input_id in keep and edge.output_id in keep}
+        for node_id, children in self.adjacent_list.items():
+            self.adjacent_list[node_id] = [child for child in children if child in keep]
+        return len(dropped)
 
     @staticmethod
     def sort_nodes_by_score(nodes: DataNode):
@@ -1,21 +1,43 @@
 import os
 from automlToolkit.components.utils.constants import FEATURE_TYPES
-from automlToolkit.components.utils.utils import find_components, collect_infos
-from automlToolkit.components.feature_engineering.transformations.base_transformer import Transformer
+from automlToolkit.components.utils.utils import find_components, collect_infos, load_manifest, dump_manifest
 
 """
 Load the build-in transformers.
+The transformer modules are imported lazily with the infos in manifest.json,
+call `update_manifest()` to regenerate it after adding or changing a transformer.
 """
 transformers_directory = os.path.split(__file__)[0]
-_transformers = find_components(__package__, transformers_directory, Transformer)
-
-for sub_pkg in ['generator', 'preprocessor', 'rescaler', 'selector']:
-    tmp_directory = os.path.split(__file__)[0] + '/%s' % sub_pkg
-    transformers = find_components(__package__+'.%s' % sub_pkg, tmp_directory, Transformer)
-    for key, val in transformers.items():
-        if key not in _transformers:
-            _transformers[key] = val
-        else:
-            raise ValueError('Repeated Transformer ID: %s!' % key)
-
-_type_infos, _params_infos = collect_infos(_transformers, FEATURE_TYPES)
+sub_pkgs = ['generator', 'preprocessor', 'rescaler', 'selector']
+component_directories = [transformers_directory] + [os.path.join(transformers_directory, sub_pkg)
+                                                    for sub_pkg in sub_pkgs]
+manifest_path = os.path.join(transformers_directory, 'manifest.json')
+
+
+def load_transformers():
+    from automlToolkit.components.feature_engineering.transformations.base_transformer import Transformer
+
+    _transformers = find_components(__package__, transformers_directory, Transformer)
+    for sub_pkg in sub_pkgs:
+        tmp_directory = os.path.split(__file__)[0] + '/%s' % sub_pkg
+        transformers = find_components(__package__ + '.%s' % sub_pkg, tmp_directory, Transformer)
+        for key, val in transformers.items():
+            if key not in _transformers:
+                _transformers[key] = val
+            else:
+                raise ValueError('Repeated Transformer ID: %s!' % key)
+    return _transformers
+
+
+def update_manifest():
+    dump_manifest(manifest_path, _transformers, FEATURE_TYPES, component_directories)
+
+
+_manifest = load_manifest(manifest_path, FEATURE_TYPES, component_directories)
+if _manifest is not None:
+    _transformers, _type_infos, _params_infos, _trans_types = _manifest
+else:
+    # The manifest is missing or out of date.
+    _transformers = load_transformers()
+    _type_infos, _params_infos = collect_infos(_transformers, FEATURE_TYPES)
+    _trans_types = {key: val().type for key, val in _transformers.items()}
@@ -5,6 +5,7 @@ import pandas as pd
 from automlToolkit.components.utils.utils import *
 from automlToolkit.components.utils.constants import *
 from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.utils.tracing import span
 
 
 class Transformer(object, metaclass=abc.ABCMeta):
@@ -132,7 +133,8 @@ def ease_trans(func):
             X = X.values
 
         args = (trans, input, target_fields)
-        _X = func(*args)
+        with span('transformer.operate', category='transformer', transformer=trans.name, shape=X.shape):
+            _X = func(*args)
         if isinstance(trans.output_type, list):
             trans.output_type = trans.output_type[0]
         _types = [trans.output_type] * _X.shape[1]
@@ -1,6 +1,7 @@
 from ConfigSpace.configuration_space import ConfigurationSpace
 from ConfigSpace.hyperparameters import UniformIntegerHyperparameter, CategoricalHyperparameter
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
+from automlToolkit.components.feature_engineering.feature_stats import get_feature_stats
 
 
 class KBinsDiscretizer(Transformer):
@@ -24,7 +25,8 @@ class KBinsDiscretizer(Transformer):
         if not self.model:
             self.model = KBinsDiscretizer(
                 n_bins=self.n_bins, encode='ordinal', strategy=self.strategy)
-            self.model.fit(X_new)
+            # The uniform and quantile bins of a node share its moments and percentiles.
+            get_feature_stats(input_datanode).fit_discretizer(self.model, X_new, target_fields)
         _X = self.model.transform(X_new)
 
         return _X
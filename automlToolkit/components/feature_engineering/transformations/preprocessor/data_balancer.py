@@ -1,6 +1,9 @@
 import numpy as np
 from collections import Counter
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
+from automlToolkit.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
 
 
 class DataBalancer(Transformer):
@@ -31,7 +34,7 @@ class DataBalancer(Transformer):
                 np.random.seed(self.random_state)
                 resample_num = int(median * self.threshold)
                 copy_X, copy_y = X.copy(), y.copy()
-                print('Before balancing', Counter(y.copy()))
+                logger.debug('Before balancing: %s', Counter(y))
                 for key in label_idx_dict:
                     length = len(label_idx_dict[key])
                     if length < resample_num:
@@ -45,7 +48,7 @@ class DataBalancer(Transformer):
                         copy_X = np.vstack((copy_X, copy_X[left_idx_list].copy()))
                         copy_y = np.hstack((copy_y, copy_y[left_idx_list].copy()))
                 data = (copy_X, copy_y)
-                print('After balancing', Counter(copy_y.copy()))
+                logger.debug('After balancing: %s', Counter(copy_y))
         new_feature_types = input_datanode.feature_types.copy()
         output_datanode = DataNode(data, new_feature_types, input_datanode.task_type)
         output_datanode.trans_hist = input_datanode.trans_hist.copy()
@@ -21,15 +21,11 @@ class Image2VectorTransformation(Transformer):
         X_new = X[:, target_fields]
         if not self.pretrained_model:
             self.pretrained_model = Image2vector(model=self.method)
-        _X = None
+        _X = list()
         for i in range(X_new.shape[1]):
-            images = np.array([image for image in X_new[:, i]])
-            emb_output = self.pretrained_model.predict(images)
-            if _X is None:
-                _X = emb_output.copy()
-            else:
-                _X = np.hstack((_X, emb_output))
-        return _X
+            # Images are streamed to the model in batches, so the column is not stacked here.
+            _X.append(self.pretrained_model.predict(X_new[:, i]))
+        return np.hstack(_X)
 
     @staticmethod
     def get_hyperparameter_search_space(dataset_properties=None):
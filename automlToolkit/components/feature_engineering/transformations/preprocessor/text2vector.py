@@ -4,7 +4,7 @@ from ConfigSpace.configuration_space import ConfigurationSpace
 from ConfigSpace.hyperparameters import UniformFloatHyperparameter, CategoricalHyperparameter
 from ConfigSpace.conditions import EqualsCondition
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
-from automlToolkit.components.utils.text_util import build_embeddings_index, load_text_embeddings
+from automlToolkit.components.utils.text_util import get_embedding_store, load_text_embeddings
 
 
 class Text2VectorTransformation(Transformer):
@@ -15,22 +15,17 @@ class Text2VectorTransformation(Transformer):
         self.input_type = [TEXT]
         self.output_type = [TEXT_EMBEDDING]
         self.compound_mode = 'replace'
-        self.embedding_dict = None
 
     @ease_trans
     def operate(self, input_datanode, target_fields=None):
         X, y = input_datanode.data
         X_new = X[:, target_fields]
-        if not self.embedding_dict:
-            self.embedding_dict = build_embeddings_index()
-        _X = None
+        # The embedding store is shared in the process, and loaded only once.
+        embedding_store = get_embedding_store()
+        _X = list()
         for i in range(X_new.shape[1]):
-            emb_output = load_text_embeddings(X_new[:, i], self.embedding_dict, method=self.method, alpha=self.alpha)
-            if _X is None:
-                _X = emb_output.copy()
-            else:
-                _X = np.hstack((_X, emb_output))
-        return _X
+            _X.append(load_text_embeddings(X_new[:, i], embedding_store, method=self.method, alpha=self.alpha))
+        return np.hstack(_X)
 
     @staticmethod
     def get_hyperparameter_search_space(dataset_properties=None):
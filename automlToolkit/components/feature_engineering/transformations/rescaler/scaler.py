@@ -1,6 +1,7 @@
 from ConfigSpace.configuration_space import ConfigurationSpace
 from ConfigSpace.hyperparameters import CategoricalHyperparameter
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
+from automlToolkit.components.feature_engineering.feature_stats import get_feature_stats
 
 
 class ScaleTransformation(Transformer):
@@ -31,18 +32,16 @@ class ScaleTransformation(Transformer):
         import numpy as np
         X, y = input_data.data
         X_new = X[:, target_fields]
+        # The scalers of a node share its moments and percentiles.
+        feature_stats = get_feature_stats(input_data)
 
         if not self.model:
             self.model = self.get_model(self.scaler)
-            self.model.fit(X_new)
+            feature_stats.fit_scaler(self.model, X_new, target_fields)
 
         if self.scaler == 'robust':
-            _flag = False
-            for _id in range(X_new.shape[1]):
-                _data = X_new[:, _id]
-                if (np.percentile(_data, 0.75) - np.percentile(_data, 0.25)) > 5.:
-                    _flag = True
-            if not _flag:
+            lower, upper = feature_stats.get_percentiles(X_new, target_fields, (0.25, 0.75))
+            if not np.any((upper - lower) > 5.):
                 self.ignore_flag = True
 
         if not self.ignore_flag:
@@ -4,6 +4,7 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
     UnParametrizedHyperparameter, Constant
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
 from automlToolkit.components.utils.configspace_utils import check_none, check_for_bool
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 class ExtraTreeBasedSelector(Transformer):
@@ -83,7 +84,7 @@ class ExtraTreeBasedSelector(Transformer):
                 max_leaf_nodes=self.max_leaf_nodes,
                 min_impurity_decrease=self.min_impurity_decrease,
                 oob_score=self.oob_score,
-                n_jobs=self.n_jobs,
+                n_jobs=get_resource_manager().get_n_jobs(self.n_jobs),
                 verbose=self.verbose,
                 random_state=self.random_state,
                 class_weight=self.class_weight)
@@ -4,6 +4,7 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
     UnParametrizedHyperparameter, Constant
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
 from automlToolkit.components.utils.configspace_utils import check_none, check_for_bool
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 class ExtraTreeBasedSelectorRegression(Transformer):
@@ -85,7 +86,7 @@ class ExtraTreeBasedSelectorRegression(Transformer):
                 max_features=max_features,
                 max_leaf_nodes=self.max_leaf_nodes,
                 oob_score=self.oob_score,
-                n_jobs=self.n_jobs,
+                n_jobs=get_resource_manager().get_n_jobs(self.n_jobs),
                 verbose=self.verbose,
                 random_state=self.random_state)
             estimator.fit(X_new, y, sample_weight=sample_weight)
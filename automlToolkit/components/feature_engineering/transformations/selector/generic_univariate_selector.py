@@ -2,6 +2,7 @@ from ConfigSpace.configuration_space import ConfigurationSpace
 from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
     CategoricalHyperparameter, Constant
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
+from automlToolkit.components.feature_engineering.feature_stats import get_feature_stats
 
 
 class GenericUnivariateSelector(Transformer):
@@ -44,7 +45,7 @@ class GenericUnivariateSelector(Transformer):
         if self.model is None:
             self.model = GenericUnivariateSelect(
                 score_func=self.call_func, param=self.alpha, mode=self.mode)
-            self.model.fit(X_new, y)
+            get_feature_stats(input_datanode).fit_selector(self.model, X_new, y, target_fields)
 
         _X = self.model.transform(X_new)
         is_selected = self.model.get_support()
@@ -1,6 +1,7 @@
 from ConfigSpace.configuration_space import ConfigurationSpace
 from ConfigSpace.hyperparameters import UniformFloatHyperparameter, CategoricalHyperparameter, Constant
 from automlToolkit.components.feature_engineering.transformations.base_transformer import *
+from automlToolkit.components.feature_engineering.feature_stats import get_feature_stats
 
 
 class PercentileSelector(Transformer):
@@ -45,7 +46,7 @@ class PercentileSelector(Transformer):
         if self.model is None:
             from sklearn.feature_selection import SelectPercentile
             self.model = SelectPercentile(self.get_score_func(), percentile=self.percentile)
-            self.model.fit(X_new, y)
+            get_feature_stats(input_datanode).fit_selector(self.model, X_new, y, target_fields)
 
         _X = self.model.transform(X_new)
         is_selected = self.model.get_support()
@@ -4,14 +4,19 @@ from automlToolkit.components.hpo_optimizer.mfse_optimizer import MfseOptimizer
 
 def build_hpo_optimizer(eval_type, evaluator, config_space,
                         per_run_time_limit=600, per_run_mem_limit=1024,
-                        output_dir='./', trials_per_iter=1, seed=1, n_jobs=1):
+                        output_dir='./', trials_per_iter=1, seed=1, n_jobs=1, executor=None, initial_configs=None):
+    executor_params = dict()
     if eval_type == 'partial':
         optimizer_class = MfseOptimizer
+        # The execution backend of the trials, e.g., a DistributedExecutor.
+        executor_params['executor'] = executor
     else:
         # TODO: Support asynchronous BO
+        if executor is not None:
+            raise ValueError('Invalid eval_type for an executor: %s!' % eval_type)
         optimizer_class = SMACOptimizer
     return optimizer_class(evaluator, config_space,
                            output_dir=output_dir,
                            per_run_time_limit=per_run_time_limit,
                            trials_per_iter=trials_per_iter,
-                           seed=seed, n_jobs=n_jobs)
+                           seed=seed, n_jobs=n_jobs, initial_configs=initial_configs, **executor_params)
@@ -6,10 +6,12 @@ from sklearn.model_selection import KFold
 from automlToolkit.components.hpo_optimizer.base_optimizer import BaseHPOptimizer
 from automlToolkit.components.computation.parallel_func import ParallelExecutor
 from automlToolkit.components.hpo_optimizer.utils.acquisition import EI
-from automlToolkit.components.hpo_optimizer.utils.acq_optimizer import RandomSampling
+from automlToolkit.components.hpo_optimizer.utils.acq_optimizer import InterleavedLocalSearch
 from automlToolkit.components.hpo_optimizer.utils.prob_rf import RandomForestWithInstances
 from automlToolkit.components.hpo_optimizer.utils.prob_rf_cluster import WeightedRandomForestCluster
-from automlToolkit.components.hpo_optimizer.utils.funcs import get_types, minmax_normalization
+from automlToolkit.components.hpo_optimizer.utils.funcs import minmax_normalization
+from automlToolkit.components.hpo_optimizer.utils.config_space_analysis import get_config_space_analysis
+from automlToolkit.utils.tracing import traced
 from automlToolkit.components.hpo_optimizer.utils.config_space_utils import convert_configurations_to_array, \
     sample_configurations, expand_configurations
 
@@ -17,7 +19,7 @@ from automlToolkit.components.hpo_optimizer.utils.config_space_utils import conv
 class MfseOptimizer(BaseHPOptimizer):
     def __init__(self, evaluator, config_space, time_limit=None, evaluation_limit=None,
                  per_run_time_limit=600, per_run_mem_limit=1024, output_dir='./', trials_per_iter=1, seed=1,
-                 R=81, eta=3, n_jobs=1):
+                 R=81, eta=3, n_jobs=1, async_mode=None, executor=None, initial_configs=None):
         super().__init__(evaluator, config_space, seed)
         self.time_limit = time_limit
         self.evaluation_num_limit = evaluation_limit
@@ -25,7 +27,10 @@ class MfseOptimizer(BaseHPOptimizer):
         self.per_run_time_limit = per_run_time_limit
         self.per_run_mem_limit = per_run_mem_limit
         self.config_space = config_space
-        self.n_workers = n_jobs
+        # An executor, e.g., a DistributedExecutor, replaces the local worker threads.
+        self.n_workers = n_jobs if executor is None else executor.n_worker
+        # Asynchronous successive halving keeps the workers busy, it is used with more than one worker by default.
+        self.async_mode = self.n_workers > 1 if async_mode is None else async_mode
 
         self.trial_cnt = 0
         self.configs = list()
@@ -34,6 +39,8 @@ class MfseOptimizer(BaseHPOptimizer):
         self.incumbent_config = self.config_space.get_default_configuration()
         self.incumbent_configs = []
         self.incumbent_perfs = []
+        # The configurations to try first, e.g., the best ones on a similar dataset in the previous runs.
+        self.initial_configs = list() if initial_configs is None else list(initial_configs)
 
         # Parameters in Hyperband framework.
         self.restart_needed = True
@@ -57,7 +64,8 @@ class MfseOptimizer(BaseHPOptimizer):
             self.target_x[r] = []
             self.target_y[r] = []
 
-        types, bounds = get_types(config_space)
+        analysis = get_config_space_analysis(config_space)
+        types, bounds = analysis.types, analysis.bounds
         self.num_config = len(bounds)
         init_weight = [0.]
         init_weight.extend([1. / self.s_max] * self.s_max)
@@ -65,14 +73,15 @@ class MfseOptimizer(BaseHPOptimizer):
                                                               self.eta, init_weight, 'gpoe')
         self.weight_changed_cnt = 0
         self.hist_weights = list()
-        self.executor = ParallelExecutor(self.evaluator, n_worker=n_jobs)
+        self.executor = ParallelExecutor(self.evaluator, n_worker=n_jobs) if executor is None else executor
         # TODO: need to improve with lite-bo.
         self.weighted_acquisition_func = EI(model=self.weighted_surrogate)
-        self.weighted_acq_optimizer = RandomSampling(self.weighted_acquisition_func,
-                                                     config_space,
-                                                     n_samples=max(500, 50 * self.num_config),
-                                                     rng=np.random.RandomState(seed))
+        self.weighted_acq_optimizer = InterleavedLocalSearch(self.weighted_acquisition_func,
+                                                             config_space,
+                                                             n_samples=max(5000, 50 * self.num_config),
+                                                             rng=np.random.RandomState(seed))
 
+    @traced('hpo_optimizer.iterate', category='optimizer')
     def iterate(self, num_iter=1):
         '''
             Iterate a SH procedure (inner loop) in Hyperband.
@@ -80,11 +89,14 @@ class MfseOptimizer(BaseHPOptimizer):
         '''
         _start_time = time.time()
         for _ in range(num_iter):
-            self._iterate(self.s_values[self.inner_iter_id])
+            if self.async_mode:
+                self._iterate_async(self.s_values[self.inner_iter_id])
+            else:
+                self._iterate(self.s_values[self.inner_iter_id])
             self.inner_iter_id = (self.inner_iter_id + 1) % (self.s_max + 1)
 
         iteration_cost = time.time() - _start_time
-        inc_idx = np.argmin(np.array(self.incumbent_perf))
+        inc_idx = np.argmin(np.array(self.incumbent_perfs))
 
         self.incumbent_perf = 1 - self.incumbent_perfs[inc_idx]
         self.incumbent_config = self.incumbent_configs[inc_idx]
@@ -135,37 +147,73 @@ class MfseOptimizer(BaseHPOptimizer):
                 T = T[0:reduced_num]
             else:
                 T = [T[indices[0]]]
+        self.update_surrogate(r)
+
+    def _iterate_async(self, s):
+        '''
+            Run a bracket of asynchronous successive halving (ASHA):
+            a configuration is promoted as soon as it ranks in the top 1/eta of its rung so far,
+            so a free worker never waits for the whole rung to finish.
+        '''
+        if self.weight_update_id > self.s_max:
+            self.update_weight()
+        self.weight_update_id += 1
+
+        n = int(ceil(self.B / self.R / (s + 1) * self.eta ** s))
+        r = int(self.R * self.eta ** (-s))
+        resources = [r * self.eta ** i for i in range(s + 1)]
+
+        start_time = time.time()
+        T = self.fetch_candidate_configurations(n)
+        time_elapsed = time.time() - start_time
+        self.logger.info("Choosing next configurations took %.2f sec." % time_elapsed)
+
+        def record(rung_id, idx, val_loss):
+            n_resource = int(resources[rung_id])
+            self.target_x[n_resource].append(T[idx])
+            self.target_y[n_resource].append(val_loss)
+            if n_resource == self.R:
+                self.incumbent_configs.append(T[idx])
+                self.incumbent_perfs.append(val_loss)
+
+        rungs, busy_time = run_async_successive_halving(T, resources, self.R, self.eta, self.n_workers,
+                                                        self.executor, callback=record)
+
+        time_elapsed = time.time() - start_time
+        self.logger.info('MFSE-ASHA: %d configurations, %s evaluations per rung, worker utilization %.1f%%.',
+                         n, [len(rung) for rung in rungs],
+                         100. * busy_time / max(self.n_workers * time_elapsed, 1e-8))
+        self.update_surrogate(r)
+
+    def update_surrogate(self, r):
         for item in self.iterate_r[self.iterate_r.index(r):]:
+            if len(self.target_y[item]) == 0:
+                continue
             # NORMALIZE Objective value: MinMax linear normalization
             normalized_y = minmax_normalization(self.target_y[item])
             self.weighted_surrogate.train(convert_configurations_to_array(self.target_x[item]),
                                           np.array(normalized_y, dtype=np.float64), r=item)
 
     def fetch_candidate_configurations(self, num_config):
+        if len(self.initial_configs) > 0:
+            configs = self.initial_configs[:num_config]
+            self.initial_configs = self.initial_configs[num_config:]
+            return expand_configurations(configs, self.config_space, num_config)
         if len(self.target_y[self.iterate_r[-1]]) == 0:
             return sample_configurations(self.config_space, num_config)
 
-        config_cnt = 0
-        config_candidates = list()
-        total_sample_cnt = 0
-
-        while config_cnt < num_config and total_sample_cnt < 3 * num_config:
-            incumbent = dict()
-            max_r = self.iterate_r[-1]
-            best_index = np.argmin(self.target_y[max_r])
-            incumbent['config'] = self.target_x[max_r][best_index]
-            approximate_obj = self.weighted_surrogate.predict(convert_configurations_to_array([incumbent['config']]))[0]
-            incumbent['obj'] = approximate_obj
-
-            self.weighted_acquisition_func.update(model=self.weighted_surrogate, eta=incumbent)
-            _config = self.weighted_acq_optimizer.maximize(batch_size=1)[0]
+        incumbent = dict()
+        max_r = self.iterate_r[-1]
+        best_index = np.argmin(self.target_y[max_r])
+        incumbent['config'] = self.target_x[max_r][best_index]
+        approximate_obj = self.weighted_surrogate.predict(convert_configurations_to_array([incumbent['config']]))[0]
+        incumbent['obj'] = approximate_obj
+        self.weighted_acquisition_func.update(model=self.weighted_surrogate, eta=incumbent)
 
-            if _config not in config_candidates:
-                config_candidates.append(_config)
-                config_cnt += 1
-            total_sample_cnt += 1
+        # Score one candidate pool with all the base surrogates, then take a diverse top-n.
+        config_candidates = self.weighted_acq_optimizer.maximize(batch_size=num_config)
 
-        if config_cnt < num_config:
+        if len(config_candidates) < num_config:
             config_candidates = expand_configurations(config_candidates, self.config_space, num_config)
         return config_candidates
 
@@ -197,11 +245,12 @@ class MfseOptimizer(BaseHPOptimizer):
                     else:
                         # 5-fold cross validation.
                         kfold = KFold(n_splits=fold_num)
-                        cv_pred = np.array([0] * len(test_y))
+                        cv_pred = np.zeros(len(test_y))
                         for train_idx, valid_idx in kfold.split(test_x):
                             train_configs, train_y = test_x[train_idx], test_y[train_idx]
                             valid_configs, valid_y = test_x[valid_idx], test_y[valid_idx]
-                            types, bounds = get_types(self.config_space)
+                            analysis = get_config_space_analysis(self.config_space)
+                            types, bounds = analysis.types, analysis.bounds
                             _surrogate = RandomForestWithInstances(types=types, bounds=bounds)
                             _surrogate.train(train_configs, train_y)
                             pred, _ = _surrogate.predict(valid_configs)
@@ -229,14 +278,93 @@ class MfseOptimizer(BaseHPOptimizer):
         self.hist_weights.append(new_weights)
 
     @staticmethod
-    def calculate_preserving_order_num(y_pred, y_true):
+    def calculate_preserving_order_num(y_pred, y_true, chunk_size=1024):
+        """
+        Count the pairs (i < j) on which y_pred and y_true agree about whether y[i] > y[j].
+        :return: the number of order-preserving pairs and the number of pairs.
+        """
+        y_pred = np.asarray(y_pred, dtype=np.float64).reshape(-1)
+        y_true = np.asarray(y_true, dtype=np.float64).reshape(-1)
         array_size = len(y_pred)
         assert len(y_true) == array_size
 
-        total_pair_num, order_preserving_num = 0, 0
-        for idx in range(array_size):
-            for inner_idx in range(idx + 1, array_size):
-                if bool(y_true[idx] > y_true[inner_idx]) == bool(y_pred[idx] > y_pred[inner_idx]):
-                    order_preserving_num += 1
-                total_pair_num += 1
+        total_pair_num = array_size * (array_size - 1) // 2
+        order_preserving_num = 0
+        # Compare the blocks of rows with all the later entries, which bounds the memory usage.
+        for start in range(0, array_size, chunk_size):
+            rows = np.arange(start, min(start + chunk_size, array_size))
+            agree = (y_true[rows, None] > y_true[None, :]) == (y_pred[rows, None] > y_pred[None, :])
+            upper = rows[:, None] < np.arange(array_size)[None, :]
+            order_preserving_num += int(np.count_nonzero(agree & upper))
         return order_preserving_num, total_pair_num
+
+
+def run_async_successive_halving(T, resources, R, eta, n_workers, executor, callback=None):
+    """
+    Run a bracket of asynchronous successive halving on the configurations T.
+    A configuration is promoted as soon as it ranks in the top 1/eta of its rung so far, and at most 1/eta
+    of a rung is promoted. Once a rung is
+    complete and has fewer than eta results, its best one is promoted, as in the synchronous version,
+    so the rungs end up with the same sizes whatever the order the evaluations finish in.
+    :param resources: the resource of each rung, the last one is R.
+    :param executor: a ParallelExecutor or an executor with the same submit and wait_any.
+    :param callback: called with (rung id, index in T, loss) when an evaluation finishes.
+    :return: the (loss, index in T) of each rung, and the total busy time of the workers.
+    """
+    s = len(resources) - 1
+    # rungs[i]: the (loss, index in T) finished with resources[i].
+    rungs = [list() for _ in resources]
+    promoted = [set() for _ in resources]
+    running = dict()
+    n_running = [0] * len(resources)
+    n_sampled = 0
+
+    def is_complete(i):
+        # Every configuration that will ever reach rung i has finished there.
+        if i == 0:
+            return n_sampled == len(T) and n_running[0] == 0
+        n_promoted = len(rungs[i - 1]) // eta or min(len(rungs[i - 1]), 1)
+        return is_complete(i - 1) and len(promoted[i - 1]) == n_promoted and n_running[i] == 0
+
+    def get_job():
+        # Promote from the highest rung first, so the configurations reach the full budget early.
+        for i in reversed(range(s)):
+            ranked = sorted(rungs[i], key=lambda x: x[0])
+            n_promotable = len(ranked) // eta
+            if n_promotable == 0 and len(ranked) > 0 and is_complete(i):
+                n_promotable = 1
+            # At most 1/eta of a rung goes on, even if the ranking changes after a promotion.
+            if len(promoted[i]) >= n_promotable:
+                continue
+            for _, idx in ranked[:n_promotable]:
+                if idx not in promoted[i]:
+                    promoted[i].add(idx)
+                    return i + 1, idx
+        if n_sampled < len(T):
+            return 0, n_sampled
+        return None
+
+    busy_time = 0.
+    while True:
+        while len(running) < n_workers:
+            job = get_job()
+            if job is None:
+                break
+            rung_id, idx = job
+            if rung_id == 0:
+                n_sampled += 1
+            n_running[rung_id] += 1
+            future = executor.submit(T[idx], subsample_ratio=float(resources[rung_id] / R))
+            running[future] = job
+        if len(running) == 0:
+            break
+
+        for future in executor.wait_any(list(running.keys())):
+            rung_id, idx = running.pop(future)
+            n_running[rung_id] -= 1
+            val_loss, time_taken = future.result()
+            busy_time += time_taken
+            rungs[rung_id].append((val_loss, idx))
+            if callback is not None:
+                callback(rung_id, idx, val_loss)
+    return rungs, busy_time
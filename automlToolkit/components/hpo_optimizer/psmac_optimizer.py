@@ -1,14 +1,18 @@
 import multiprocessing
+import queue
 import time
+import weakref
 import datetime
 import numpy as np
-import os
-import pickle
+from ConfigSpace import Configuration
 from smac.scenario.scenario import Scenario
 from smac.facade.smac_facade import SMAC
-from smac.optimizer import pSMAC
+from smac.runhistory.runhistory import DataOrigin
 
 from automlToolkit.components.hpo_optimizer.base_optimizer import BaseHPOptimizer
+from automlToolkit.components.hpo_optimizer.utils.config_space_analysis import get_config_space_analysis
+from automlToolkit.components.computation.resource_manager import get_resource_manager
+from automlToolkit.utils.tracing import traced
 
 
 class PSMACOptimizer(BaseHPOptimizer):
@@ -29,32 +33,30 @@ class PSMACOptimizer(BaseHPOptimizer):
         output_dir += "psmac3_output_%s" % (datetime.datetime.fromtimestamp(
             time.time()).strftime('%Y-%m-%d_%H:%M:%S_%f'))
         self.output_dir = output_dir
+        # The run histories are shared through queues instead of the pSMAC output files.
         self.scenario_dict = {'abort_on_first_run_crash': False,
                               "run_obj": "quality",
                               "cs": self.config_space,
                               "deterministic": "true",
-                              "shared-model": True,  # PSMAC Entry
                               "runcount-limit": self.evaluation_num_limit,
                               "output_dir": output_dir,
                               "cutoff_time": self.per_run_time_limit
                               }
-        self.optimizer_list = list()
-        for _ in range(self.n_jobs):
-            self.optimizer_list.append(SMAC(scenario=Scenario(self.scenario_dict),
-                                            rng=np.random.RandomState(None),  # Different seed for different optimizers
-                                            tae_runner=self.evaluator))
+        # Long-lived workers, started at the first iteration.
+        self.workers = list()
+        self.inboxes = list()
+        self.task_queue = None
+        self.result_queue = None
+        self._finalizer = None
+
         self.trial_cnt = 0
         self.configs = list()
+        self.config_set = set()
         self.perfs = list()
         self.incumbent_perf = float("-INF")
         self.incumbent_config = self.config_space.get_default_configuration()
         # Estimate the size of the hyperparameter space.
-        hp_num = len(self.config_space.get_hyperparameters())
-        if hp_num == 0:
-            self.config_num_threshold = 0
-        else:
-            _threshold = int(len(set(self.config_space.sample_configuration(12500))) * 0.8)
-            self.config_num_threshold = _threshold
+        self.config_num_threshold = get_config_space_analysis(self.config_space).get_config_num_threshold(0.8, 12500)
         self.logger.info('HP_THRESHOLD is: %d' % self.config_num_threshold)
 
     def run(self):
@@ -69,10 +71,72 @@ class PSMACOptimizer(BaseHPOptimizer):
                 self.trials_this_run = self.evaluation_num_limit - self.trial_cnt
             self.iterate()
 
+        self.shutdown()
         return np.max(self.perfs)
 
+    def start_workers(self):
+        if len(self.workers) > 0:
+            return
+        self.task_queue = multiprocessing.Queue()
+        self.result_queue = multiprocessing.Queue()
+        for i in range(self.n_jobs):
+            inbox = multiprocessing.Queue()
+            # Different seed for different optimizers.
+            worker = multiprocessing.Process(target=_worker,
+                                             args=(i, self.scenario_dict, self.evaluator, self.seed + i,
+                                                   self.task_queue, inbox, self.result_queue, self.n_jobs))
+            worker.daemon = True
+            worker.start()
+            self.inboxes.append(inbox)
+            self.workers.append(worker)
+        # The bandits drive iterate() and never call shutdown, so the workers stop with the optimizer.
+        self._finalizer = weakref.finalize(self, _stop_workers, self.task_queue, self.workers)
+
+    def shutdown(self):
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self.workers = list()
+        self.inboxes = list()
+
+    def _run_trials(self, trial_num):
+        """
+        Let the workers run trial_num SMAC iterations, and broadcast each new observation
+        to the other workers as soon as it arrives.
+        """
+        self.start_workers()
+        for _ in range(trial_num):
+            self.task_queue.put(1)
+
+        finished_num = 0
+        while finished_num < trial_num:
+            try:
+                worker_id, runs, error = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in self.workers):
+                    self.logger.error('All the PSMAC workers exited!')
+                    break
+                continue
+            finished_num += 1
+            if error is not None:
+                self.logger.error('PSMAC worker %d: %s' % (worker_id, error))
+            for run in runs:
+                for i, inbox in enumerate(self.inboxes):
+                    if i != worker_id:
+                        inbox.put(run)
+                values, cost = run[0], run[1]
+                _reward = 1. - cost
+                _config = Configuration(self.config_space, values=values)
+                if _config not in self.config_set:
+                    self.config_set.add(_config)
+                    self.perfs.append(_reward)
+                    self.configs.append(_config)
+                if _reward > self.incumbent_perf:
+                    self.incumbent_perf = _reward
+                    self.incumbent_config = _config
+
+    @traced('hpo_optimizer.iterate', category='optimizer')
     def iterate(self):
-        trial_left = multiprocessing.Value('i', self.trials_this_run)
         _start_time = time.time()
         _flag = False
         if len(self.configs) >= self.config_num_threshold:
@@ -80,40 +144,7 @@ class PSMACOptimizer(BaseHPOptimizer):
             self.logger.warning('Already explored 70 percentage of the '
                                 'hp space: %d!' % self.config_num_threshold)
         else:
-            # for i in range(self.n_jobs):
-            #     self.trial_statistics.append(self.pool.submit(_iterate,
-            #                                                   self.optimizer_list[i], trial_left))
-            # self.wait_tasks_finish()
-            processes = []
-            return_hist = multiprocessing.Manager().list()
-            for i in range(self.n_jobs):
-                pSMAC.read(
-                    run_history=self.optimizer_list[i].solver.runhistory,
-                    output_dirs=self.optimizer_list[i].solver.scenario.output_dir + '/run_1',
-                    configuration_space=self.optimizer_list[i].solver.config_space,
-                    logger=self.optimizer_list[i].solver.logger,
-                )
-            for i in range(self.n_jobs):
-                p = multiprocessing.Process(
-                    target=_iterate,
-                    args=[self.optimizer_list[i], trial_left, return_hist]
-                )
-                processes.append(p)
-                p.start()
-            for p in processes:
-                p.join()
-
-            for runhistory in return_hist:
-                runkeys = list(runhistory.data.keys())
-                for key in runkeys:
-                    _reward = 1. - runhistory.data[key][0]
-                    _config = runhistory.ids_config[key[0]]
-                    if _config not in self.configs:
-                        self.perfs.append(_reward)
-                        self.configs.append(_config)
-                    if _reward > self.incumbent_perf:
-                        self.incumbent_perf = _reward
-                        self.incumbent_config = _config
+            self._run_trials(self.trials_this_run)
             self.trial_cnt += self.trials_per_iter
         if not _flag:
             iteration_cost = time.time() - _start_time
@@ -122,67 +153,59 @@ class PSMACOptimizer(BaseHPOptimizer):
         return self.incumbent_perf, iteration_cost, self.incumbent_config
 
     def optimize(self):
-        for i in range(self.n_jobs):
-            self.optimizer_list.append(SMAC(scenario=Scenario(self.scenario_dict),
-                                            rng=np.random.RandomState(None),  # Different seed for different optimizers
-                                            tae_runner=self.evaluator))
-
-        processes = []
-        return_hist = multiprocessing.Manager().list()
-        for i in range(1, self.n_jobs):
-            p = multiprocessing.Process(
-                target=self._optimize,
-                args=[self.optimizer_list[i], return_hist]
-            )
-            processes.append(p)
-            p.start()
-        self._optimize(self.optimizer_list[0], return_hist)
-        for p in processes:
-            p.join()
-
-        for runhistory in return_hist:
-            runkeys = list(runhistory.data.keys())
-            for key in runkeys:
-                _reward = 1. - runhistory.data[key][0]
-                _config = runhistory.ids_config[key[0]]
-                if _config not in self.configs:
-                    self.perfs.append(_reward)
-                    self.configs.append(_config)
-                if _reward > self.incumbent_perf:
-                    self.incumbent_perf = _reward
-                    self.incumbent_config = _config
+        self._run_trials(self.evaluation_num_limit - self.trial_cnt)
+        self.trial_cnt = self.evaluation_num_limit
+        self.shutdown()
         return self.incumbent_config, self.incumbent_perf
 
-    def _optimize(self, optimizer, hist_list):
-        optimizer.optimize()
-        pSMAC.read(
-            run_history=optimizer.solver.runhistory,
-            output_dirs=optimizer.solver.scenario.input_psmac_dirs,
-            configuration_space=optimizer.solver.config_space,
-            logger=optimizer.solver.logger,
-        )
-        hist_list.append(optimizer.solver.runhistory)
-
-    def wait_tasks_finish(self):
-        all_completed = False
-        while not all_completed:
-            all_completed = True
-            for trial in self.trial_statistics:
-                if not trial.done():
-                    all_completed = False
-                    time.sleep(0.1)
-                    break
 
+def _stop_workers(task_queue, workers):
+    for _ in workers:
+        task_queue.put(None)
+    for worker in workers:
+        worker.join(timeout=10)
+        if worker.is_alive():
+            worker.terminate()
+
+
+def _worker(worker_id, scenario_dict, evaluator, seed, task_queue, inbox, result_queue, n_parallel=1):
+    """
+    Run SMAC iterations on demand. Before each iteration, the observations of the other workers
+    are added to the local run history, so the surrogate is trained on all the runs.
+    """
+    optimizer = SMAC(scenario=Scenario(scenario_dict),
+                     rng=np.random.RandomState(seed),
+                     tae_runner=evaluator)
+    runhistory = optimizer.solver.runhistory
+    config_space = optimizer.solver.config_space
+    known_keys = set()
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        while True:
+            try:
+                values, cost, _time, status = inbox.get_nowait()
+            except queue.Empty:
+                break
+            runhistory.add(Configuration(config_space, values=values), cost, _time, status,
+                           origin=DataOrigin.EXTERNAL_SAME_INSTANCES)
+        known_keys.update(runhistory.data.keys())
+
+        error = None
+        try:
+            # The workers share the core budget.
+            with get_resource_manager().allot(n_parallel=n_parallel):
+                optimizer.iterate()
+        except Exception as e:
+            error = str(e)
 
-def _iterate(optimizer, runcount_left, return_hist):
-    while runcount_left.value > 0:
-        runcount_left.value -= 1
-        optimizer.iterate()
-    pSMAC.read(
-        run_history=optimizer.solver.runhistory,
-        output_dirs=optimizer.solver.scenario.input_psmac_dirs,
-        configuration_space=optimizer.solver.config_space,
-        logger=optimizer.solver.logger,
-    )
-    # print(optimizer.solver.runhistory.data)
-    return_hist.append(optimizer.solver.runhistory)
+        runs = list()
+        for key in runhistory.data.keys():
+            if key in known_keys:
+                continue
+            known_keys.add(key)
+            value = runhistory.data[key]
+            runs.append((runhistory.ids_config[key.config_id].get_dictionary(), value.cost, value.time, value.status))
+        result_queue.put((worker_id, runs, error))
@@ -3,12 +3,14 @@ import datetime
 import numpy as np
 from litebo.facade.bo_facade import BayesianOptimization as BO
 from automlToolkit.components.hpo_optimizer.base_optimizer import BaseHPOptimizer
+from automlToolkit.components.hpo_optimizer.utils.config_space_analysis import get_config_space_analysis
+from automlToolkit.utils.tracing import traced
 
 
 class SMACOptimizer(BaseHPOptimizer):
     def __init__(self, evaluator, config_space, time_limit=None, evaluation_limit=None,
                  per_run_time_limit=600, per_run_mem_limit=1024, output_dir='./',
-                 trials_per_iter=1, seed=1, n_jobs=1):
+                 trials_per_iter=1, seed=1, n_jobs=1, initial_configs=None):
         super().__init__(evaluator, config_space, seed)
         self.time_limit = time_limit
         self.evaluation_num_limit = evaluation_limit
@@ -17,11 +19,16 @@ class SMACOptimizer(BaseHPOptimizer):
         self.per_run_mem_limit = per_run_mem_limit
         self.output_dir = output_dir
 
+        bo_params = dict()
+        if initial_configs is not None and len(initial_configs) > 0:
+            # The initial design starts from the given configurations, e.g., the ones of the previous runs.
+            bo_params['initial_configurations'] = list(initial_configs)
         self.optimizer = BO(objective_function=self.evaluator,
                             config_space=config_space,
                             max_runs=int(1e10),
                             task_id=None,
-                            rng=np.random.RandomState(self.seed))
+                            rng=np.random.RandomState(self.seed),
+                            **bo_params)
 
         self.trial_cnt = 0
         self.configs = list()
@@ -29,12 +36,7 @@ class SMACOptimizer(BaseHPOptimizer):
         self.incumbent_perf = float("-INF")
         self.incumbent_config = self.config_space.get_default_configuration()
         # Estimate the size of the hyperparameter space.
-        hp_num = len(self.config_space.get_hyperparameters())
-        if hp_num == 0:
-            self.config_num_threshold = 0
-        else:
-            _threshold = int(len(set(self.config_space.sample_configuration(10000))) * 0.75)
-            self.config_num_threshold = _threshold
+        self.config_num_threshold = get_config_space_analysis(self.config_space).get_config_num_threshold(0.75, 10000)
         self.logger.debug('HP_THRESHOLD is: %d' % self.config_num_threshold)
         self.maximum_config_num = min(600, self.config_num_threshold)
         self.early_stopped_flag = False
@@ -49,6 +51,7 @@ class SMACOptimizer(BaseHPOptimizer):
             self.iterate()
         return np.max(self.perfs)
 
+    @traced('hpo_optimizer.iterate', category='optimizer')
     def iterate(self):
         _start_time = time.time()
         for _ in range(self.trials_per_iter):
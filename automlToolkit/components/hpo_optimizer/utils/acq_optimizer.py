@@ -3,6 +3,7 @@ from ConfigSpace.util import get_one_exchange_neighbourhood
 
 from automlToolkit.components.hpo_optimizer.utils.config_space_utils import convert_configurations_to_array, \
     sample_configurations
+from automlToolkit.components.hpo_optimizer.utils.config_space_analysis import get_config_space_analysis
 
 
 class BaseOptimizer(object):
@@ -50,49 +51,151 @@ class RandomSampling(BaseOptimizer):
         self.n_samples = n_samples
         super(RandomSampling, self).__init__(objective_function, config_space, rng)
 
-    def maximize(self, batch_size=1):
+    def maximize(self, batch_size=1, min_distance=0.05):
         """
         Maximizes the given acquisition function.
+        All the candidates are scored by one call of the acquisition function,
+        and a batch is selected greedily in the order of the acquisition value.
 
         Parameters
         ----------
         batch_size: number of maximizer returned.
+        min_distance: minimum L1 distance in the normalized space between
+            two selected configurations, which keeps the batch diverse.
 
         Returns
         -------
-        np.ndarray(N,D)
-            Point with highest acquisition value.
+        List[Configuration]
+            Configurations with the highest acquisition values.
         """
         eta = 0.3
-        incs_num = int(eta * self.n_samples)
+        n_samples = max(self.n_samples, 10 * batch_size)
         incs_configs = list(
             get_one_exchange_neighbourhood(self.objective_func.eta['config'], seed=self.rng.randint(int(1e6))))
         # TODO: need to implement
         # extra_num = incs_num - len(incs_configs)
         # if extra_num > 0:
         #     incs_configs.extend(get_random_neighborhood(self.objective_func.eta['config'], extra_num, MAXINT))
-
-        configs_list = list(incs_configs)
-        rand_incs = convert_configurations_to_array(configs_list)
+        incs_configs = incs_configs[:max(int(eta * n_samples), 1)]
 
         # Sample random points uniformly over the whole space
-        # rand_configs = self.config_space.sample_configuration(self.n_samples - rand_incs.shape[0])
-        rand_configs = sample_configurations(self.config_space, self.n_samples - rand_incs.shape[0])
-        rand = convert_configurations_to_array(rand_configs)
+        rand_configs = sample_configurations(self.config_space, n_samples - len(incs_configs))
+        configs_list = incs_configs + rand_configs
+
+        X = convert_configurations_to_array(configs_list)
+        y = self.objective_func(X).reshape(-1)
+        order = np.argsort(-y, kind='mergesort')
+        if batch_size == 1:
+            return [configs_list[order[0]]]
+        return select_diverse_batch(X, order, configs_list.__getitem__, batch_size, min_distance)
 
-        configs_list.extend(rand_configs)
 
-        # TODO: Put a Gaussian on the incumbent and sample from that (support categorical feature)
-        # loc = self.objective_func.model.get_incumbent()[0],
-        # scale = np.ones([self.lower.shape[0]]) * 0.1
-        # rand_incs = np.array([np.clip(np.random.normal(loc, scale), self.lower, self.upper)[0]
-        #                       for _ in range(int(self.n_samples * 0.3))])
-        #
+class InterleavedLocalSearch(BaseOptimizer):
 
-        X = np.concatenate((rand_incs, rand), axis=0)
-        y = self.objective_func(X)
-        if batch_size == 1:
-            return [configs_list[np.argmax(y)]]
+    def __init__(self, objective_function, config_space, n_samples=5000, n_local_starts=10,
+                 n_neighbors=50, max_steps=10, rng=None):
+        """
+        Maximizes the acquisition function in the vector encoding of the configuration space:
+        random samples and the neighbors of the incumbent are scored in one batch, then the best
+        candidates are improved by local search. Configuration objects are only built for the winners.
+
+        Parameters
+        ----------
+        objective_function: acquisition function
+            The acquisition function which will be maximized
+        n_samples: int
+            Number of random candidates
+        n_local_starts: int
+            Number of best candidates used as starting points of the local search
+        n_neighbors: int
+            Number of neighbors generated for each point in a local search step
+        max_steps: int
+            Maximum number of local search steps
+        """
+        super(InterleavedLocalSearch, self).__init__(objective_function, config_space, rng)
+        self.n_samples = n_samples
+        self.n_local_starts = n_local_starts
+        self.n_neighbors = n_neighbors
+        self.max_steps = max_steps
+        self.vector_space = get_config_space_analysis(config_space).vector_space
 
-        tmp = configs_list[np.argsort(y)[-batch_size:]]
-        return tmp
+    def _score(self, X):
+        return self.objective_func(self.vector_space.impute_default(X)).reshape(-1)
+
+    def maximize(self, batch_size=1, min_distance=0.05):
+        """
+        Maximizes the given acquisition function.
+
+        Parameters
+        ----------
+        batch_size: number of maximizer returned.
+        min_distance: minimum L1 distance in the normalized space between
+            two selected configurations, which keeps the batch diverse.
+
+        Returns
+        -------
+        List[Configuration]
+            Configurations with the highest acquisition values.
+        """
+        space = self.vector_space
+        eta = 0.3
+        n_samples = max(self.n_samples, 10 * batch_size)
+        incumbent = self.objective_func.eta['config'].get_array()[None, :]
+        n_incs = max(int(eta * n_samples), 1)
+        X = np.vstack([space.neighbors(incumbent, n_incs, self.rng),
+                       space.sample(n_samples - n_incs, self.rng)])
+        X = X[space.unique(X)]
+        y = self._score(X)
+
+        # Local search from the best candidates, all the neighbors visited join the candidate pool.
+        n_starts = min(max(self.n_local_starts, batch_size), len(X))
+        start_idx = np.argsort(-y, kind='mergesort')[:n_starts]
+        points, point_y = X[start_idx], y[start_idx]
+        pool_X, pool_y = [X], [y]
+        for _ in range(self.max_steps):
+            neighbors = space.neighbors(points, self.n_neighbors, self.rng)
+            neighbor_y = self._score(neighbors)
+            pool_X.append(neighbors)
+            pool_y.append(neighbor_y)
+            neighbor_y = neighbor_y.reshape(len(points), self.n_neighbors)
+            best = np.argmax(neighbor_y, axis=1)
+            best_y = neighbor_y[np.arange(len(points)), best]
+            improved = best_y > point_y
+            if not improved.any():
+                break
+            points[improved] = neighbors[(np.arange(len(points)) * self.n_neighbors + best)[improved]]
+            point_y[improved] = best_y[improved]
+
+        X, y = np.vstack(pool_X), np.concatenate(pool_y)
+        unique_idx = space.unique(X)
+        X, y = X[unique_idx], y[unique_idx]
+        order = np.argsort(-y, kind='mergesort')
+        return select_diverse_batch(space.impute_default(X), order,
+                                    lambda idx: space.to_configuration(X[idx], self.config_space), batch_size, min_distance)
+
+
+def select_diverse_batch(X, order, get_config, batch_size, min_distance):
+    """
+    Greedily take the candidates in the given order, skipping those within min_distance
+    of a selected one; the skipped candidates fill the batch if it is not full.
+    :param get_config: function from the index of a candidate to its configuration,
+        which returns None for an invalid candidate.
+    """
+    selected, skipped = list(), list()
+    seen = set()
+    selected_X = np.empty((batch_size, X.shape[1]))
+    for idx in order:
+        if len(selected) >= batch_size:
+            break
+        config = get_config(idx)
+        if config is None or config in seen:
+            continue
+        seen.add(config)
+        if len(selected) > 0 and \
+                np.min(np.abs(selected_X[:len(selected)] - X[idx]).sum(axis=1)) < min_distance:
+            skipped.append(config)
+            continue
+        selected_X[len(selected)] = X[idx]
+        selected.append(config)
+    selected.extend(skipped[:batch_size - len(selected)])
+    return selected
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import numpy as np
+from ConfigSpace import ConfigurationSpace
+
+from automlToolkit.components.hpo_optimizer.utils.funcs import get_types
+from automlToolkit.components.hpo_optimizer.utils.vector_space import VectorSpace, CONSTANT, CATEGORICAL, \
+    ORDINAL, FLOAT
+
+# Finite spaces up to this size are enumerated to count the configurations under the conditions.
+MAX_ENUMERATION_SIZE = 100000
+
+
+def get_config_space_signature(config_space: ConfigurationSpace):
+    return hashlib.sha1(repr(config_space).encode('utf-8')).hexdigest()
+
+
+class ConfigSpaceAnalysis(object):
+    """
+    Quantities derived from the structure of a configuration space, computed once and shared by all the
+    optimizers on the equal spaces. It does not sample: the configurations are drawn from the space
+    of each optimizer, with its own random state, see config_space_utils.sample_configurations.
+    """
+
+    def __init__(self, config_space: ConfigurationSpace):
+        self.hp_num = len(config_space.get_hyperparameters())
+        self.types, self.bounds = get_types(config_space)
+        self.vector_space = VectorSpace(config_space)
+        self.cardinality = self._compute_cardinality()
+
+    def _compute_cardinality(self):
+        """
+        :return: the number of configurations, np.inf if some hyperparameter is continuous.
+            The forbidden clauses are ignored, so the result is an upper bound when there are any.
+        """
+        space = self.vector_space
+        values = list()
+        for idx in range(space.n_dims):
+            kind = space.kinds[idx]
+            if kind == CONSTANT:
+                values.append(np.zeros(1))
+            elif kind in (CATEGORICAL, ORDINAL):
+                values.append(np.arange(space.n_choices[idx], dtype=np.float64))
+            elif kind == FLOAT or idx not in space.integer_grids:
+                return np.inf
+            else:
+                values.append(space.integer_grids[idx])
+        if len(values) == 0:
+            return 0
+
+        product = int(np.prod([len(item) for item in values], dtype=np.float64))
+        if len(space.conditions) == 0 or product > MAX_ENUMERATION_SIZE:
+            return product
+        grid = np.stack([item.reshape(-1) for item in np.meshgrid(*values, indexing='ij')], axis=1)
+        grid = space.impute_activity(grid, np.random.RandomState(1))
+        return len(space.unique(grid))
+
+    def get_config_num_threshold(self, ratio, sample_size):
+        """
+        The number of configurations an optimizer explores before stopping early,
+        i.e., ratio of the distinct configurations among sample_size random samples.
+        """
+        if self.hp_num == 0:
+            return 0
+        return int(min(self.cardinality, sample_size) * ratio)
+
+
+_analyses = dict()
+_analysis_lock = threading.Lock()
+
+
+def get_config_space_analysis(config_space: ConfigurationSpace):
+    """
+    Return the analysis of a configuration space, cached by the signature of the space.
+    """
+    signature = get_config_space_signature(config_space)
+    analysis = _analyses.get(signature)
+    if analysis is None:
+        with _analysis_lock:
+            analysis = _analyses.get(signature)
+            if analysis is None:
+                analysis = ConfigSpaceAnalysis(config_space)
+                _analyses[signature] = analysis
+    return analysis
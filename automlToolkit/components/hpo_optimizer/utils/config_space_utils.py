@@ -6,6 +6,8 @@ from ConfigSpace import Configuration, ConfigurationSpace
 from ConfigSpace.hyperparameters import CategoricalHyperparameter, \
     IntegerHyperparameter, FloatHyperparameter
 
+from automlToolkit.components.utils.configspace_utils import get_configuration_key
+
 
 def convert_configurations_to_array(configs: List[Configuration]) -> np.ndarray:
     """Impute inactive hyperparameters in configurations with their default.
@@ -165,27 +167,33 @@ def get_random_neighborhood(configuration: Configuration, num: int, seed: int) -
     return neighborhood
 
 
-# TODO: escape the bug.
-def sample_configurations(configuration_space: ConfigurationSpace, num: int) -> List[Configuration]:
-    result = []
-    cnt = 0
-    while cnt < num:
-        config = configuration_space.sample_configuration(1)
-        if config not in result:
-            result.append(config)
-            cnt += 1
+def sample_configurations(configuration_space: ConfigurationSpace, num: int,
+                          historical_configs: List[Configuration] = None, max_trials=None) -> List[Configuration]:
+    """
+    Sample num configurations from the space with its random state. The configurations are distinct and
+    not in historical_configs, until max_trials samples are drawn; the rest are filled up with the
+    repeated ones, e.g., for the small finite spaces.
+    """
+    if max_trials is None:
+        max_trials = 50 * num
+    seen = set(get_configuration_key(config) for config in historical_configs or [])
+    result = list()
+    trial_cnt = 0
+    while len(result) < num:
+        configs = configuration_space.sample_configuration(num - len(result))
+        if not isinstance(configs, list):
+            configs = [configs]
+        for config in configs:
+            key = get_configuration_key(config)
+            if key not in seen or trial_cnt >= max_trials:
+                seen.add(key)
+                result.append(config)
+        trial_cnt += len(configs)
     return result
 
 
 def expand_configurations(configs: List[Configuration], configuration_space: ConfigurationSpace, num: int):
-    num_config = len(configs)
-    num_needed = num - num_config
-    config_cnt = 0
-    while config_cnt < num_needed:
-        config = configuration_space.sample_configuration(1)
-        if config not in configs:
-            configs.append(config)
-            config_cnt += 1
+    configs.extend(sample_configurations(configuration_space, num - len(configs), historical_configs=configs))
     return configs
 
 
@@ -0,0 +1,189 @@
+import numpy as np
+from ConfigSpace import Configuration, ConfigurationSpace
+from ConfigSpace.hyperparameters import CategoricalHyperparameter, OrdinalHyperparameter, \
+    UniformFloatHyperparameter, UniformIntegerHyperparameter, Constant
+
+CONSTANT, CATEGORICAL, ORDINAL, FLOAT, INTEGER = range(5)
+# Integer hyperparameters with more values than this are treated as floats in the vector space.
+MAX_INTEGER_GRID = 10000
+
+
+def _get_condition_child(condition):
+    if hasattr(condition, 'components'):
+        return _get_condition_child(condition.components[0])
+    return condition.child
+
+
+class VectorSpace(object):
+    """
+    Sampling and mutation of configurations in the vector encoding of ConfigSpace,
+    where each row is the result of Configuration.get_array() and inactive values are NaN.
+    """
+
+    def __init__(self, config_space: ConfigurationSpace):
+        self.config_space = config_space
+        self.hyperparameters = config_space.get_hyperparameters()
+        self.n_dims = len(self.hyperparameters)
+        self.kinds = np.zeros(self.n_dims, dtype=np.int64)
+        self.n_choices = np.zeros(self.n_dims, dtype=np.int64)
+        self.defaults = np.zeros(self.n_dims, dtype=np.float64)
+        # For each integer hyperparameter: the sorted vector values of all its integers.
+        self.integer_grids = dict()
+
+        for idx, hp in enumerate(self.hyperparameters):
+            if isinstance(hp, Constant):
+                self.kinds[idx] = CONSTANT
+                self.defaults[idx] = 0.
+                continue
+            if isinstance(hp, CategoricalHyperparameter):
+                self.kinds[idx] = CATEGORICAL
+                self.n_choices[idx] = len(hp.choices)
+            elif isinstance(hp, OrdinalHyperparameter):
+                self.kinds[idx] = ORDINAL
+                self.n_choices[idx] = len(hp.sequence)
+            elif isinstance(hp, UniformIntegerHyperparameter):
+                self.kinds[idx] = INTEGER
+                if hp.upper - hp.lower < MAX_INTEGER_GRID:
+                    values = np.arange(hp.lower, hp.upper + 1)
+                    self.integer_grids[idx] = np.array([hp._inverse_transform(value) for value in values],
+                                                       dtype=np.float64)
+                    self.n_choices[idx] = len(values)
+            elif isinstance(hp, UniformFloatHyperparameter):
+                self.kinds[idx] = FLOAT
+            else:
+                raise TypeError('Unknown hyperparameter type %s' % type(hp))
+            self.defaults[idx] = hp._inverse_transform(hp.default_value)
+
+        # The conditions are evaluated in the topological order of their children.
+        hp_idx = {hp.name: idx for idx, hp in enumerate(self.hyperparameters)}
+        self.conditions = sorted([(hp_idx[_get_condition_child(cond).name], cond)
+                                  for cond in config_space.get_conditions()], key=lambda item: item[0])
+        self.hp_idx = hp_idx
+
+    def _sample_column(self, idx, n, rng):
+        kind = self.kinds[idx]
+        if kind == CONSTANT:
+            return np.zeros(n)
+        if kind in (CATEGORICAL, ORDINAL):
+            hp = self.hyperparameters[idx]
+            probabilities = getattr(hp, 'probabilities', None) if kind == CATEGORICAL else None
+            if probabilities is not None:
+                probabilities = np.asarray(probabilities, dtype=np.float64)
+                probabilities /= probabilities.sum()
+            return rng.choice(self.n_choices[idx], size=n, p=probabilities).astype(np.float64)
+        if idx in self.integer_grids:
+            # Sample on the vector scale, which handles the log scale, then snap to the nearest integer.
+            return self.snap_integers(idx, rng.uniform(0., 1., size=n))
+        return rng.uniform(0., 1., size=n)
+
+    def snap_integers(self, idx, values):
+        grid = self.integer_grids[idx]
+        pos = np.clip(np.searchsorted(grid, values), 1, len(grid) - 1)
+        left, right = grid[pos - 1], grid[pos]
+        return np.where(values - left <= right - values, left, right)
+
+    def _evaluate_condition(self, condition, X):
+        if hasattr(condition, 'components'):
+            results = [self._evaluate_condition(item, X) for item in condition.components]
+            if type(condition).__name__ == 'OrConjunction':
+                return np.logical_or.reduce(results)
+            return np.logical_and.reduce(results)
+
+        parent = condition.parent
+        column = X[:, self.hp_idx[parent.name]]
+        active = ~np.isnan(column)
+        cond_type = type(condition).__name__
+        if cond_type == 'EqualsCondition':
+            return active & (column == parent._inverse_transform(condition.value))
+        elif cond_type == 'NotEqualsCondition':
+            return active & (column != parent._inverse_transform(condition.value))
+        elif cond_type == 'InCondition':
+            values = [parent._inverse_transform(value) for value in condition.values]
+            return active & np.isin(column, values)
+        elif cond_type == 'GreaterThanCondition':
+            return active & (column > parent._inverse_transform(condition.value))
+        elif cond_type == 'LessThanCondition':
+            return active & (column < parent._inverse_transform(condition.value))
+        raise ValueError('Invalid condition: %s!' % cond_type)
+
+    def impute_activity(self, X, rng):
+        """
+        Make the rows consistent with the conditions: inactive values become NaN,
+        and newly activated hyperparameters are sampled at random.
+        """
+        for idx, condition in self.conditions:
+            active = self._evaluate_condition(condition, X)
+            X[~active, idx] = np.nan
+            missing = np.flatnonzero(active & np.isnan(X[:, idx]))
+            if len(missing) > 0:
+                X[missing, idx] = self._sample_column(idx, len(missing), rng)
+        return X
+
+    def sample(self, n, rng):
+        X = np.empty((n, self.n_dims), dtype=np.float64)
+        for idx in range(self.n_dims):
+            X[:, idx] = self._sample_column(idx, n, rng)
+        return self.impute_activity(X, rng)
+
+    def neighbors(self, X, n_neighbors, rng, stddev=0.2):
+        """
+        Generate n_neighbors one-exchange neighbors for each row of X.
+        :return: array of shape (len(X) * n_neighbors, n_dims), the neighbors of each row are contiguous.
+        """
+        neighbors = np.repeat(X, n_neighbors, axis=0)
+        n = len(neighbors)
+        # Choose one active and mutable dimension in each row.
+        mutable = ~np.isnan(neighbors) & (self.kinds != CONSTANT)[None, :]
+        mutable &= ~(((self.kinds == CATEGORICAL) | (self.kinds == ORDINAL)) & (self.n_choices < 2))[None, :]
+        scores = np.where(mutable, rng.uniform(size=neighbors.shape), -1.)
+        dims = np.argmax(scores, axis=1)
+        rows = np.flatnonzero(scores[np.arange(n), dims] >= 0)
+        dims = dims[rows]
+
+        for idx in np.unique(dims):
+            _rows = rows[dims == idx]
+            current = neighbors[_rows, idx]
+            kind = self.kinds[idx]
+            if kind == CATEGORICAL:
+                # Shift by a non-zero offset, which gives a different choice.
+                offset = rng.randint(1, self.n_choices[idx], size=len(_rows))
+                new_values = (current + offset) % self.n_choices[idx]
+            elif kind == ORDINAL:
+                step = rng.choice([-1, 1], size=len(_rows))
+                new_values = current + step
+                out_of_range = (new_values < 0) | (new_values >= self.n_choices[idx])
+                new_values[out_of_range] = current[out_of_range] - step[out_of_range]
+            else:
+                new_values = np.clip(current + rng.normal(0., stddev, size=len(_rows)), 0., 1.)
+                if idx in self.integer_grids:
+                    new_values = self.snap_integers(idx, new_values)
+            neighbors[_rows, idx] = new_values
+        return self.impute_activity(neighbors, rng)
+
+    def impute_default(self, X):
+        """
+        Impute the inactive values with the defaults, as convert_configurations_to_array does.
+        """
+        X = X.copy()
+        nan_mask = np.isnan(X)
+        X[nan_mask] = np.broadcast_to(self.defaults, X.shape)[nan_mask]
+        return X
+
+    def unique(self, X):
+        """
+        :return: indices of the distinct rows, in the order of their first occurrence.
+        """
+        _, indices = np.unique(np.nan_to_num(X, nan=-1.), axis=0, return_index=True)
+        return np.sort(indices)
+
+    def to_configuration(self, vector, config_space=None):
+        """
+        :param config_space: the space the configuration belongs to, the one of the encoding by default.
+        :return: the configuration of a vector, None if it violates the forbidden clauses.
+        """
+        try:
+            config = Configuration(self.config_space if config_space is None else config_space, vector=vector)
+            config.is_valid_configuration()
+        except ValueError:
+            return None
+        return config
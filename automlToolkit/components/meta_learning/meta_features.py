@@ -1,5 +1,9 @@
 from collections import defaultdict, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import copy
+import hashlib
+import os
+import pickle
 
 import numpy as np
 import scipy.stats
@@ -914,10 +918,10 @@ class PCAKurtosisFirstPC(MetaFeature):
         pca_ = helper_functions.get_value("PCA")
         if pca_ is None:
             return np.NaN
-        components = pca_.components_
-        pca_.components_ = components[:1]
+        # Project on a copy, as the PCA object is shared with the other metafeatures.
+        pca_ = copy.copy(pca_)
+        pca_.components_ = pca_.components_[:1]
         transformed = pca_.transform(X)
-        pca_.components_ = components
 
         kurtosis = scipy.stats.kurtosis(transformed)
         return kurtosis[0]
@@ -930,10 +934,10 @@ class PCASkewnessFirstPC(MetaFeature):
         pca_ = helper_functions.get_value("PCA")
         if pca_ is None:
             return np.NaN
-        components = pca_.components_
-        pca_.components_ = components[:1]
+        # Project on a copy, as the PCA object is shared with the other metafeatures.
+        pca_ = copy.copy(pca_)
+        pca_.components_ = pca_.components_[:1]
         transformed = pca_.transform(X)
-        pca_.components_ = components
 
         skewness = scipy.stats.skew(transformed)
         return skewness[0]
@@ -964,22 +968,111 @@ def calculate_all_metafeatures_with_labels(X, y, categorical, dataset_name,
                                       dont_calculate=dont_calculate)
 
 
+def get_dataset_hash(X, y, categorical, task_type, *args):
+    """Compute the hash of a dataset, which identifies its metafeatures."""
+    sha1 = hashlib.sha1()
+    if scipy.sparse.issparse(X):
+        X = X.tocsr()
+        arrays = [X.data, X.indices, X.indptr]
+    else:
+        arrays = [np.asarray(X)]
+    arrays.append(np.asarray(y))
+    for array in arrays:
+        sha1.update(('%s-%s' % (array.dtype.str, array.shape)).encode('utf-8'))
+        if array.dtype == object:
+            sha1.update(pickle.dumps(array.tolist()))
+        else:
+            sha1.update(np.ascontiguousarray(array).data)
+    extra_info = ([bool(item) for item in categorical], task_type) + args
+    sha1.update(repr(extra_info).encode('utf-8'))
+    return sha1.hexdigest()
+
+
+def _resolve_schedule(names):
+    """Group the metafeatures and their helper functions into waves,
+    where the items in one wave only depend on the items in the former waves."""
+    pending = list()
+    to_visit = deque(names)
+    while len(to_visit) > 0:
+        name = to_visit.popleft()
+        if name in pending:
+            continue
+        pending.append(name)
+        dependency = metafeatures.get_dependency(name) if name in metafeatures else None
+        if dependency is not None:
+            if dependency in metafeatures and dependency in helper_functions:
+                raise NotImplementedError()
+            elif dependency not in metafeatures and dependency not in helper_functions:
+                raise ValueError(dependency)
+            to_visit.append(dependency)
+
+    waves, finished = list(), set()
+    while len(pending) > 0:
+        wave = list()
+        for name in pending:
+            dependency = metafeatures.get_dependency(name) if name in metafeatures else None
+            if dependency is None or dependency in finished:
+                wave.append(name)
+        if len(wave) == 0:
+            raise ValueError('Cyclic dependency in metafeatures: %s' % pending)
+        finished.update(wave)
+        pending = [name for name in pending if name not in finished]
+        waves.append(wave)
+    return waves
+
+
+def _subsample_rows(X, y, task_type, sample_size, random_state=42):
+    if sample_size is None or X.shape[0] <= sample_size:
+        return X, y
+    if task_type in CLS_TASKS and len(y.shape) == 1:
+        from sklearn.model_selection import StratifiedShuffleSplit
+        try:
+            ss = StratifiedShuffleSplit(n_splits=1, train_size=sample_size, random_state=random_state)
+            indices, _ = next(ss.split(X, y))
+            return X[indices], y[indices]
+        except ValueError:
+            # Some class is too small to be stratified.
+            pass
+    # The rows are already shuffled.
+    return X[:sample_size], y[:sample_size]
+
+
+_metafeatures_cache = dict()
+
+
 def calculate_all_metafeatures(X, y, categorical, dataset_name, task_type,
-                               calculate=None, dont_calculate=None, densify_threshold=1000):
+                               calculate=None, dont_calculate=None, densify_threshold=1000,
+                               n_jobs=1, landmark_sample_size=10000, cache_dir=None):
+    """Calculate all metafeatures.
+
+    :param n_jobs: number of threads used to compute the independent metafeatures.
+    :param landmark_sample_size: maximum number of rows used by the landmarkers and the PCA features,
+        None to use all the rows.
+    :param cache_dir: directory to save the metafeatures of each dataset;
+        the results are also cached in the process.
+    """
     logger = get_logger(__name__)
 
-    """Calculate all metafeatures."""
+    if categorical is None:
+        categorical = [False] * X.shape[1]
+    dataset_hash = get_dataset_hash(X, y, categorical, task_type,
+                                    sorted(calculate) if calculate is not None else None,
+                                    sorted(dont_calculate) if dont_calculate is not None else None,
+                                    landmark_sample_size)
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, 'metafeatures_%s.pkl' % dataset_hash)
+    if dataset_hash not in _metafeatures_cache and cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            _metafeatures_cache[dataset_hash] = pickle.load(f)
+    if dataset_hash in _metafeatures_cache:
+        logger.info("%s: Metafeatures loaded from cache: %s", dataset_name, dataset_hash)
+        return DatasetMetafeatures(dataset_name, _metafeatures_cache[dataset_hash].copy(), task_type=task_type)
+
     helper_functions.clear()
     metafeatures.clear()
     mf_ = dict()
 
-    visited = set()
-    to_visit = deque()
-    to_visit.extend(metafeatures)
-
-    X_transformed = None
-    y_transformed = None
-
     func_cls = ['NumberOfClasses', 'LogNumberOfFeatures',
                 'ClassProbabilityMin', 'ClassProbabilityMax',
                 'ClassProbabilityMean', "ClassProbabilitySTD",
@@ -988,91 +1081,107 @@ def calculate_all_metafeatures(X, y, categorical, dataset_name, task_type,
                 'LandmarkDecisionNodeLearner', 'LandmarkRandomNodeLearner',
                 'LandmarkWorstNodeLearner', 'Landmark1NN']
 
-    # TODO calculate the numpy metafeatures after all others to consume less
-    # memory
-    while len(to_visit) > 0:
-        name = to_visit.pop()
+    names = list()
+    for name in metafeatures:
         if calculate is not None and name not in calculate:
             continue
         if dont_calculate is not None and name in dont_calculate:
             continue
         if name in func_cls and task_type not in CLS_TASKS:
             continue
+        names.append(name)
+    waves = _resolve_schedule(names)
 
-        if name in npy_metafeatures:
-            if X_transformed is None:
-                # TODO make sure this is done as efficient as possible (no copy for
-                # sparse matrices because of wrong sparse format)
-                sparse = scipy.sparse.issparse(X)
-                if any(categorical):
-                    ohe = OneHotEncoder(categorical_features=categorical, sparse=True)
-                    X_transformed = ohe.fit_transform(X)
-                else:
-                    X_transformed = X
-                imputer = SimpleImputer(strategy='mean', copy=False)
-                X_transformed = imputer.fit_transform(X_transformed)
-                center = not scipy.sparse.isspmatrix(X_transformed)
-                standard_scaler = StandardScaler(copy=False, with_mean=center)
-                X_transformed = standard_scaler.fit_transform(X_transformed)
-                categorical_transformed = [False] * X_transformed.shape[1]
-
-                # Densify the transformed matrix
-                if not sparse and scipy.sparse.issparse(X_transformed):
-                    bytes_per_float = X_transformed.dtype.itemsize
-                    num_elements = X_transformed.shape[0] * X_transformed.shape[1]
-                    megabytes_required = num_elements * bytes_per_float / 1000 / 1000
-                    if megabytes_required < densify_threshold:
-                        X_transformed = X_transformed.todense()
-
-                # This is not only important for datasets which are somehow
-                # sorted in a strange way, but also prevents lda from failing in
-                # some cases.
-                # Because this is advanced indexing, a copy of the data is returned!!!
-                X_transformed = check_array(X_transformed,
-                                            force_all_finite=True,
-                                            accept_sparse='csr')
-                rs = np.random.RandomState(42)
-                indices = np.arange(X_transformed.shape[0])
-                rs.shuffle(indices)
-                # TODO Shuffle inplace
-                X_transformed = X_transformed[indices]
-                y_transformed = y[indices]
-
-            X_ = X_transformed
-            y_ = y_transformed
-            categorical_ = categorical_transformed
-        else:
-            X_ = X
-            y_ = y
-            categorical_ = categorical
-
+    # A helper function is computed on the same data as the metafeatures depending on it.
+    data_owner = dict()
+    for name in names:
         dependency = metafeatures.get_dependency(name)
-        if dependency is not None:
-            is_metafeature = dependency in metafeatures
-            is_helper_function = dependency in helper_functions
+        if dependency in helper_functions and dependency not in data_owner:
+            data_owner[dependency] = name
 
-            if is_metafeature and is_helper_function:
-                raise NotImplementedError()
-            elif not is_metafeature and not is_helper_function:
-                raise ValueError(dependency)
-            elif is_metafeature and not metafeatures.is_calculated(dependency):
-                to_visit.appendleft(name)
-                continue
-            elif is_helper_function and not helper_functions.is_calculated(
-                    dependency):
-                logger.info("%s: Going to calculate: %s", dataset_name,
-                            dependency)
-                value = helper_functions[dependency](X_, y_, categorical_)
-                helper_functions.set_value(dependency, value)
-                mf_[dependency] = value
-
-        logger.info("%s: Going to calculate: %s", dataset_name,
-                    name)
-
-        value = metafeatures[name](X_, y_, categorical_)
-        metafeatures.set_value(name, value)
-        mf_[name] = value
-        visited.add(name)
+    X_transformed = None
+    y_transformed = None
+    categorical_transformed = None
+    if any(data_owner.get(name, name) in npy_metafeatures for wave in waves for name in wave):
+        # TODO make sure this is done as efficient as possible (no copy for
+        # sparse matrices because of wrong sparse format)
+        sparse = scipy.sparse.issparse(X)
+        if any(categorical):
+            ohe = OneHotEncoder(categorical_features=categorical, sparse=True)
+            X_transformed = ohe.fit_transform(X)
+        else:
+            X_transformed = X
+        # Copy the input once, as the scaler below works in place and X is still used afterwards.
+        imputer = SimpleImputer(strategy='mean', copy=X_transformed is X)
+        X_transformed = imputer.fit_transform(X_transformed)
+        center = not scipy.sparse.isspmatrix(X_transformed)
+        standard_scaler = StandardScaler(copy=False, with_mean=center)
+        X_transformed = standard_scaler.fit_transform(X_transformed)
+        categorical_transformed = [False] * X_transformed.shape[1]
+
+        # Densify the transformed matrix
+        if not sparse and scipy.sparse.issparse(X_transformed):
+            bytes_per_float = X_transformed.dtype.itemsize
+            num_elements = X_transformed.shape[0] * X_transformed.shape[1]
+            megabytes_required = num_elements * bytes_per_float / 1000 / 1000
+            if megabytes_required < densify_threshold:
+                X_transformed = X_transformed.todense()
+
+        # This is not only important for datasets which are somehow
+        # sorted in a strange way, but also prevents lda from failing in
+        # some cases.
+        # Because this is advanced indexing, a copy of the data is returned!!!
+        X_transformed = check_array(X_transformed,
+                                    force_all_finite=True,
+                                    accept_sparse='csr')
+        rs = np.random.RandomState(42)
+        indices = np.arange(X_transformed.shape[0])
+        rs.shuffle(indices)
+        # TODO Shuffle inplace
+        X_transformed = X_transformed[indices]
+        y_transformed = y[indices]
+
+    X_landmark, y_landmark = None, None
+    if any(data_owner.get(name, name) in landmark_metafeatures for wave in waves for name in wave):
+        X_landmark, y_landmark = _subsample_rows(X_transformed, y_transformed, task_type, landmark_sample_size)
+
+    def compute(name):
+        owner = data_owner.get(name, name)
+        if owner in landmark_metafeatures:
+            X_, y_, categorical_ = X_landmark, y_landmark, categorical_transformed
+        elif owner in npy_metafeatures:
+            X_, y_, categorical_ = X_transformed, y_transformed, categorical_transformed
+        else:
+            X_, y_, categorical_ = X, y, categorical
+        logger.info("%s: Going to calculate: %s", dataset_name, name)
+        if name in helper_functions:
+            return helper_functions[name](X_, y_, categorical_)
+        return metafeatures[name](X_, y_, categorical_)
+
+    pool = ThreadPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    try:
+        for wave in waves:
+            if pool is not None and len(wave) > 1:
+                values = list(pool.map(compute, wave))
+            else:
+                values = [compute(name) for name in wave]
+            for name, value in zip(wave, values):
+                if name in helper_functions:
+                    helper_functions.set_value(name, value)
+                else:
+                    metafeatures.set_value(name, value)
+                mf_[name] = value
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # The values of helper functions, e.g., the missing mask, can be as large as the dataset.
+    _metafeatures_cache[dataset_hash] = dict((key, val) for key, val in mf_.items()
+                                             if val.type_ == "METAFEATURE")
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(_metafeatures_cache[dataset_hash], f)
 
     mf_ = DatasetMetafeatures(dataset_name, mf_, task_type=task_type)
     return mf_
@@ -1084,6 +1193,11 @@ npy_metafeatures = {"LandmarkLDA", "LandmarkNaiveBayes", "LandmarkDecisionTree",
                     "Skewnesses", "SkewnessMin", "SkewnessMax", "SkewnessMean", "SkewnessSTD", "Kurtosisses",
                     "KurtosisMin", "KurtosisMax", "KurtosisMean", "KurtosisSTD"}
 
+# Metafeatures computed on a subsample of the rows.
+landmark_metafeatures = {"LandmarkLDA", "LandmarkNaiveBayes", "LandmarkDecisionTree", "LandmarkDecisionNodeLearner",
+                         "LandmarkRandomNodeLearner", "LandmarkWorstNodeLearner", "Landmark1NN",
+                         "PCAFractionOfComponentsFor95PercentVariance", "PCAKurtosisFirstPC", "PCASkewnessFirstPC"}
+
 subsets = dict()
 # All implemented metafeatures
 subsets["all"] = set(metafeatures.functions.keys())
@@ -0,0 +1,267 @@
+import os
+import csv
+import json
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+from automlToolkit.utils.logging_utils import get_logger
+from automlToolkit.components.utils.constants import BINARY_CLS, MULTICLASS_CLS
+from automlToolkit.components.meta_learning.meta_features import calculate_all_metafeatures
+
+META_RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'meta_resource')
+INDEX_FILE = 'meta_index.npz'
+_task_names = {BINARY_CLS: 'binary.classification',
+               MULTICLASS_CLS: 'multiclass.classification'}
+
+
+def _read_arff(path):
+    """
+    Read the attribute names and the data rows of an arff file, values are kept as strings.
+    """
+    attributes, rows = list(), list()
+    with open(path) as f:
+        in_data = False
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('%'):
+                continue
+            if in_data:
+                rows.append(next(csv.reader([line])))
+            elif line.upper().startswith('@ATTRIBUTE'):
+                attributes.append(line.split()[1])
+            elif line.upper().startswith('@DATA'):
+                in_data = True
+    return attributes, rows
+
+
+def _parse_value(value):
+    for _type in (int, float):
+        try:
+            return _type(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _read_configurations(path):
+    """
+    Read configurations.csv in the auto-sklearn format, empty cells are inactive hyperparameters.
+    """
+    configurations = dict()
+    if not os.path.exists(path):
+        return configurations
+    with open(path) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        for row in reader:
+            configurations[row[0]] = {key: _parse_value(value) for key, value in zip(header[1:], row[1:])
+                                      if value != ''}
+    return configurations
+
+
+def get_task_directory(metric, task_type, sparse=False, resource_dir=META_RESOURCE_DIR):
+    if task_type not in _task_names:
+        raise ValueError('Invalid task type: %s!' % task_type)
+    task_dir = os.path.join(resource_dir, '%s_%s_%s' % (metric, _task_names[task_type],
+                                                       'sparse' if sparse else 'dense'))
+    if not os.path.exists(task_dir):
+        raise ValueError('Invalid metric: %s!' % metric)
+    return task_dir
+
+
+def get_cache_dir():
+    """
+    The user cache directory of the indexes: $XDG_CACHE_HOME/automlToolkit, default to ~/.cache/automlToolkit,
+    or the system temporary directory if it is not writable.
+    """
+    cache_root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    for cache_dir in [os.path.join(cache_root, 'automlToolkit'), os.path.join(tempfile.gettempdir(), 'automlToolkit')]:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(cache_dir, os.W_OK):
+            return cache_dir
+    return tempfile.mkdtemp(prefix='automlToolkit_')
+
+
+def _is_fresh(index_path, task_dir):
+    sources = [os.path.join(task_dir, name) for name in ('feature_values.arff', 'algorithm_runs.arff',
+                                                         'configurations.csv')
+               if os.path.exists(os.path.join(task_dir, name))]
+    return os.path.exists(index_path) and \
+        os.path.getmtime(index_path) >= max(os.path.getmtime(path) for path in sources)
+
+
+def get_index_path(task_dir):
+    """
+    The index shipped in task_dir, e.g., built at packaging time, if it is up to date;
+    else the one in the user cache directory, as the package may be installed read-only.
+    """
+    index_path = os.path.join(task_dir, INDEX_FILE)
+    if _is_fresh(index_path, task_dir):
+        return index_path
+    task_key = hashlib.sha1(os.path.abspath(task_dir).encode()).hexdigest()[:8]
+    return os.path.join(get_cache_dir(), '%s-%s.npz' % (os.path.basename(task_dir), task_key))
+
+
+def build_meta_index(task_dir, index_path=None):
+    """
+    Parse the meta-data of one scenario into an npz file, which holds the meta-feature matrix
+    and the algorithms of each dataset ranked by the loss.
+    :param task_dir: directory of the scenario in meta_resource.
+    :param index_path: path of the index, default to task_dir/meta_index.npz, i.e., the one shipped with the package.
+    :return: path of the index.
+    """
+    if index_path is None:
+        index_path = os.path.join(task_dir, INDEX_FILE)
+
+    attributes, rows = _read_arff(os.path.join(task_dir, 'feature_values.arff'))
+    feature_names = attributes[2:]
+    instance_ids = [row[0] for row in rows]
+    features = np.array([[np.nan if value == '?' else float(value) for value in row[2:]] for row in rows],
+                        dtype=np.float64)
+
+    attributes, rows = _read_arff(os.path.join(task_dir, 'algorithm_runs.arff'))
+    instance_pos = dict(zip(instance_ids, range(len(instance_ids))))
+    runs = dict()
+    for row in rows:
+        if row[-1] != 'ok' or row[0] not in instance_pos or row[3] == '?':
+            continue
+        runs.setdefault(row[0], list()).append((float(row[3]), row[2]))
+    n_ranks = max([len(item) for item in runs.values()] + [1])
+    ranked_algorithms = np.full((len(instance_ids), n_ranks), '', dtype=object)
+    for instance_id, item in runs.items():
+        item.sort()
+        ranked_algorithms[instance_pos[instance_id], :len(item)] = [algorithm for _, algorithm in item]
+
+    configurations = _read_configurations(os.path.join(task_dir, 'configurations.csv'))
+
+    tmp_path = '%s.%d.tmp.npz' % (index_path[:-4], os.getpid())
+    np.savez(tmp_path,
+             instance_ids=np.array(instance_ids, dtype=str),
+             feature_names=np.array(feature_names, dtype=str),
+             features=features,
+             ranked_algorithms=ranked_algorithms.astype(str),
+             configurations=np.array(json.dumps(configurations)))
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+class MetaIndex(object):
+    """
+    k-nearest-dataset lookup over the meta-data of one scenario.
+    The meta-features are scaled to [0, 1] and compared with the L1 distance, as in auto-sklearn.
+    The configurations of the algorithms come from configurations.csv in the scenario directory.
+    The scenarios in meta_resource ship without it, so suggest_configs returns no configuration
+    unless it is added, and only suggest_algorithms is informative.
+    """
+
+    def __init__(self, task_dir, index_path=None):
+        """
+        :param index_path: path of the index, see get_index_path by default.
+        """
+        if index_path is None:
+            index_path = get_index_path(task_dir)
+        if not _is_fresh(index_path, task_dir):
+            build_meta_index(task_dir, index_path)
+
+        with np.load(index_path) as index:
+            self.instance_ids = index['instance_ids']
+            self.feature_names = list(index['feature_names'])
+            features = index['features']
+            self.ranked_algorithms = index['ranked_algorithms']
+            self.configurations = json.loads(str(index['configurations']))
+
+        self.feature_min = np.nanmin(features, axis=0)
+        scale = np.nanmax(features, axis=0) - self.feature_min
+        scale[~np.isfinite(scale) | (scale == 0)] = 1.
+        self.feature_scale = scale
+        self.features = self.normalize(features)
+
+    def normalize(self, features):
+        return ((features - self.feature_min) / self.feature_scale).astype(np.float32)
+
+    def kneighbors(self, metafeatures, k=None):
+        """
+        :param metafeatures: dict from the meta-feature name to its value.
+        :param k: number of neighbors, None to rank all the datasets.
+        :return: the instance ids and the distances of the nearest datasets.
+        """
+        query = np.array([metafeatures.get(name, np.nan) for name in self.feature_names], dtype=np.float64)
+        # Meta-features missing at either side do not contribute to the distance.
+        distances = np.nansum(np.abs(self.features - self.normalize(query)), axis=1)
+        n = len(distances)
+        if k is None or k >= n:
+            order = np.argsort(distances, kind='mergesort')
+        else:
+            order = np.argpartition(distances, k)[:k]
+            order = order[np.argsort(distances[order], kind='mergesort')]
+        return self.instance_ids[order], distances[order]
+
+    def suggest_algorithms(self, metafeatures, num_algorithms=5, exclude_ids=None):
+        """
+        Take the best algorithm on each neighbor dataset, from the nearest to the farthest.
+        """
+        instance_ids, _ = self.kneighbors(metafeatures)
+        exclude_ids = set() if exclude_ids is None else set(exclude_ids)
+        positions = dict(zip(self.instance_ids, range(len(self.instance_ids))))
+        algorithms = list()
+        for instance_id in instance_ids:
+            if instance_id in exclude_ids:
+                continue
+            best = str(self.ranked_algorithms[positions[instance_id], 0])
+            if best != '' and best not in algorithms:
+                algorithms.append(best)
+            if len(algorithms) >= num_algorithms:
+                break
+        return algorithms
+
+    def suggest_configs(self, metafeatures, num_cfgs=5, exclude_ids=None):
+        """
+        :return: list of configuration dicts, empty if the scenario ships no configurations.csv.
+        """
+        algorithms = self.suggest_algorithms(metafeatures, len(self.instance_ids), exclude_ids)
+        return [self.configurations[algorithm] for algorithm in algorithms
+                if algorithm in self.configurations][:num_cfgs]
+
+
+_meta_indexes = dict()
+_meta_index_lock = threading.Lock()
+
+
+def get_meta_index(metric='accuracy', task_type=BINARY_CLS, sparse=False, resource_dir=META_RESOURCE_DIR):
+    """
+    Return the process-wide index of a scenario, which is loaded at the first call.
+    """
+    task_dir = get_task_directory(metric, task_type, sparse, resource_dir)
+    index = _meta_indexes.get(task_dir)
+    if index is None:
+        with _meta_index_lock:
+            index = _meta_indexes.get(task_dir)
+            if index is None:
+                index = MetaIndex(task_dir)
+                _meta_indexes[task_dir] = index
+    return index
+
+
+def get_meta_configs(X, y, task_type, dataset_name='default', metric='accuracy', num_cfgs=5,
+                     categorical=None, sparse=False):
+    """
+    Suggest the configurations of the nearest datasets in meta_resource.
+    :return: list of configuration dicts, empty if the scenario has no configurations.csv.
+    """
+    logger = get_logger(__name__)
+    index = get_meta_index(metric, task_type, sparse)
+    if len(index.configurations) == 0:
+        # No configuration to suggest, the meta-features are not worth computing.
+        logger.info('No configurations.csv for the meta-learning scenario of %s.' % dataset_name)
+        return list()
+    metafeatures = calculate_all_metafeatures(X, y, categorical, dataset_name, task_type).load_values()
+    configs = index.suggest_configs(metafeatures, num_cfgs)
+    if len(configs) == 0:
+        logger.info('No configurations found for %s, nearest algorithms: %s' %
+                    (dataset_name, index.suggest_algorithms(metafeatures, num_cfgs)))
+    return configs
@@ -5,6 +5,7 @@ from ConfigSpace.hyperparameters import UnParametrizedHyperparameter
 
 from automlToolkit.components.evaluators.cls_evaluator import ClassificationEvaluator
 from automlToolkit.utils.metalearning import get_trans_from_str
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 def apply_metalearning_fe(optimizer, configs):
@@ -59,7 +60,12 @@ def evaluate_metalearning_configs(first_bandit, n_jobs=1):
     score_list = []
 
     def evaluate(_config):
-        _config = _config.get_dictionary()
+        with get_resource_manager().allot(n_parallel=n_jobs):
+            return _evaluate(_config)
+
+    def _evaluate(_config):
+        if hasattr(_config, 'get_dictionary'):
+            _config = _config.get_dictionary()
         # print(_config)
         arm = None
         cs = ConfigurationSpace()
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import contextlib
+import numpy as np
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.components.feature_engineering.feature_store import get_feature_key
+from automlToolkit.components.utils.constants import CLS_TASKS, CATEGORICAL
+from automlToolkit.utils.logging_utils import get_logger
+
+ARCHIVE_FILE = 'archive.db'
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT, schema_key TEXT, task_type INTEGER, metric TEXT,
+    n_samples INTEGER, n_features INTEGER, sketch_file TEXT, created REAL);
+CREATE TABLE IF NOT EXISTS solvers (
+    run_id INTEGER, estimator_id TEXT, score REAL, fe_cost REAL, hpo_cost REAL);
+CREATE TABLE IF NOT EXISTS fe_pipelines (
+    run_id INTEGER, estimator_id TEXT, score REAL, pipeline TEXT, description TEXT);
+CREATE TABLE IF NOT EXISTS hpo_configs (
+    run_id INTEGER, estimator_id TEXT, score REAL, config TEXT);
+"""
+
+
+def _to_float(X):
+    try:
+        return np.asarray(X, dtype=np.float64)
+    except (ValueError, TypeError):
+        # The columns that are not numbers yet count as nan.
+        X = np.asarray(X, dtype=object)
+        _X = np.full(X.shape, np.nan)
+        for col in range(X.shape[1]):
+            try:
+                _X[:, col] = X[:, col].astype(np.float64)
+            except (ValueError, TypeError):
+                pass
+        return _X
+
+
+def get_dataset_sketch(data_node: DataNode, task_type):
+    """
+    The summary of a dataset used to find the similar ones: a few meta-features, and the mean and
+    standard deviation of each column.
+    """
+    X, y = data_node.data[0], data_node.data[1]
+    n_samples, n_features = X.shape
+    _X = _to_float(X)
+    with np.errstate(all='ignore'):
+        column_mean = np.nan_to_num(np.nanmean(_X, axis=0)) if n_samples > 0 else np.zeros(n_features)
+        column_std = np.nan_to_num(np.nanstd(_X, axis=0)) if n_samples > 0 else np.zeros(n_features)
+    cat_ratio = sum(feature_type == CATEGORICAL for feature_type in data_node.feature_types) / max(1, n_features)
+    if task_type in CLS_TASKS:
+        _, counts = np.unique(y, return_counts=True)
+        probs = counts / counts.sum()
+        n_classes, target_stat = len(counts), float(-np.sum(probs * np.log(probs)))
+    else:
+        n_classes, target_stat = 0, float(np.log1p(np.std(y)))
+    meta_features = np.array([np.log1p(n_samples), np.log1p(n_features), cat_ratio,
+                              np.log1p(n_classes), target_stat])
+    return {'meta_features': meta_features, 'column_mean': column_mean, 'column_std': column_std}
+
+
+def get_sketch_distance(sketch1, sketch2, same_schema):
+    """
+    The mean difference of the meta-features, plus the mean standardized shift of the columns
+    for the datasets with the same columns, e.g., two versions of one table.
+    """
+    distance = float(np.mean(np.abs(sketch1['meta_features'] - sketch2['meta_features'])))
+    if not same_schema or len(sketch1['column_mean']) != len(sketch2['column_mean']):
+        return distance + 1.
+    shift = np.abs(sketch1['column_mean'] - sketch2['column_mean']) / \
+        (sketch1['column_std'] + sketch2['column_std'] + 1e-8)
+    return distance + float(np.mean(np.minimum(shift, 1.))) if len(shift) > 0 else distance
+
+
+def get_schema_key(data_node: DataNode, task_type):
+    return '%s:%s' % (task_type, ','.join(str(feature_type) for feature_type in data_node.feature_types))
+
+
+def get_solver_record(solver, n_pipelines=3, n_configs=5):
+    """
+    Collect the results of a SecondLayerBandit to archive: the best FE pipelines and HPO configurations,
+    and the time spent on each.
+    """
+    fe_optimizer, hpo_optimizer = solver.optimizer['fe'], solver.optimizer['hpo']
+    pipelines, visited = list(), set()
+    candidates = [solver.inc['fe'], fe_optimizer.incumbent] + list(fe_optimizer.beam_set) + \
+        list(fe_optimizer.local_datanodes)
+    for node in candidates:
+        if id(node) in visited or node.score is None:
+            continue
+        visited.add(id(node))
+        specs = fe_optimizer.get_pipeline_spec(node)
+        if specs is None or len(specs) == 0:
+            continue
+        pipelines.append((float(node.score), specs, fe_optimizer.get_pipeline(node)))
+    pipelines = sorted(pipelines, key=lambda x: -x[0])[:n_pipelines]
+
+    configs = [(solver.incumbent_perf, solver.inc['hpo'])] + list(zip(hpo_optimizer.perfs, hpo_optimizer.configs))
+    config_records, visited = list(), set()
+    for perf, config in sorted(configs, key=lambda x: -x[0]):
+        config_dict = config.get_dictionary()
+        key = json.dumps(config_dict, sort_keys=True)
+        if key in visited or not np.isfinite(perf):
+            continue
+        visited.add(key)
+        config_records.append((float(perf), config_dict))
+    return {'score': float(solver.incumbent_perf),
+            'fe_cost': float(np.sum(solver.evaluation_cost['fe'])),
+            'hpo_cost': float(np.sum(solver.evaluation_cost['hpo'])),
+            'fe_pipelines': pipelines,
+            'hpo_configs': config_records[:n_configs]}
+
+
+class RunArchive(object):
+    """
+    A local archive of the previous runs, to warm-start the search on recurring datasets.
+    A run records the dataset fingerprint and sketch, and for each algorithm the best FE pipelines,
+    the best HPO configurations with their scores, and the time spent. The records are kept in a
+    SQLite database and the sketches in npz files next to it.
+    Usage:
+        runs = archive.query(train_data, task_type, metric)
+        pipelines = archive.get_fe_pipelines(runs, 'lightgbm')
+        configs = archive.get_hpo_configs(runs, 'lightgbm')
+        ...
+        archive.add_run(train_data, task_type, metric, records)
+    """
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+        self.db_path = os.path.join(archive_dir, ARCHIVE_FILE)
+        self._lock = threading.Lock()
+        self.logger = get_logger('RunArchive')
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """
+        A connection in a transaction, committed on success and closed on exit.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_run(self, data_node: DataNode, task_type, metric, records):
+        """
+        :param records: dict from the algorithm id to its record, see get_solver_record.
+        :return: the id of the run.
+        """
+        fingerprint = get_feature_key(data_node)
+        sketch_file = '%s-%d.npz' % (fingerprint[:16], int(time.time() * 1000))
+        np.savez(os.path.join(self.archive_dir, sketch_file), **get_dataset_sketch(data_node, task_type))
+
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO runs (fingerprint, schema_key, task_type, metric, n_samples, n_features, '
+                'sketch_file, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (fingerprint, get_schema_key(data_node, task_type), task_type, metric,
+                 data_node.data[0].shape[0], data_node.data[0].shape[1], sketch_file, time.time()))
+            run_id = cursor.lastrowid
+            for estimator_id, record in records.items():
+                conn.execute('INSERT INTO solvers VALUES (?, ?, ?, ?, ?)',
+                             (run_id, estimator_id, record['score'], record['fe_cost'], record['hpo_cost']))
+                conn.executemany('INSERT INTO fe_pipelines VALUES (?, ?, ?, ?, ?)',
+                                 [(run_id, estimator_id, score, json.dumps(specs), json.dumps(description))
+                                  for score, specs, description in record['fe_pipelines']])
+                conn.executemany('INSERT INTO hpo_configs VALUES (?, ?, ?, ?)',
+                                 [(run_id, estimator_id, score, json.dumps(config))
+                                  for score, config in record['hpo_configs']])
+        self.logger.info('Archived run %d of dataset %s.', run_id, fingerprint[:16])
+        return run_id
+
+    def query(self, data_node: DataNode, task_type, metric, n_runs=3, max_distance=0.5):
+        """
+        Find the previous runs on the similar datasets, with the same task type and metric.
+        :return: list of (run id, distance, whether the columns are the same), the nearest first.
+        """
+        schema_key = get_schema_key(data_node, task_type)
+        with self._connect() as conn:
+            rows = conn.execute('SELECT run_id, schema_key, sketch_file FROM runs WHERE task_type = ? AND metric = ?',
+                                (task_type, metric)).fetchall()
+        if len(rows) == 0:
+            return list()
+
+        sketch = get_dataset_sketch(data_node, task_type)
+        runs = list()
+        for run_id, _schema_key, sketch_file in rows:
+            path = os.path.join(self.archive_dir, sketch_file)
+            if not os.path.exists(path):
+                continue
+            with np.load(path) as f:
+                _sketch = {key: f[key] for key in f.files}
+            same_schema = _schema_key == schema_key
+            distance = get_sketch_distance(sketch, _sketch, same_schema)
+            if distance <= max_distance:
+                runs.append((run_id, distance, same_schema))
+        # The latest run comes first among the equally distant ones.
+        runs = sorted(runs, key=lambda x: (x[1], -x[0]))[:n_runs]
+        self.logger.info('Found %d similar runs: %s', len(runs), str(runs))
+        return runs
+
+    def get_fe_pipelines(self, runs, estimator_id, n_pipelines=3):
+        """
+        :return: the transformer specs of the best pipelines of the runs on the datasets with the same columns.
+        """
+        pipelines = list()
+        with self._connect() as conn:
+            for run_id, _, same_schema in runs:
+                if not same_schema:
+                    continue
+                rows = conn.execute('SELECT pipeline FROM fe_pipelines WHERE run_id = ? AND estimator_id = ? '
+                                    'ORDER BY score DESC', (run_id, estimator_id)).fetchall()
+                for row in rows:
+                    specs = json.loads(row[0])
+                    if specs not in pipelines:
+                        pipelines.append(specs)
+        return pipelines[:n_pipelines]
+
+    def get_hpo_configs(self, runs, estimator_id, n_configs=3):
+        """
+        :return: the dicts of the best configurations of the runs.
+        """
+        configs = list()
+        with self._connect() as conn:
+            for run_id, _, _ in runs:
+                rows = conn.execute('SELECT config FROM hpo_configs WHERE run_id = ? AND estimator_id = ? '
+                                    'ORDER BY score DESC', (run_id, estimator_id)).fetchall()
+                for row in rows:
+                    config = json.loads(row[0])
+                    if config not in configs:
+                        configs.append(config)
+        return configs[:n_configs]
@@ -125,6 +125,55 @@ class IterativeComponentWithSampleWeight(BaseModel):
             return False
 
 
+class BoostingComponentWithSampleWeight(IterativeComponentWithSampleWeight):
+    """
+    The gradient boosting models of scikit-learn, whose rounds can be stopped early on a validation set.
+    """
+
+    def fit_with_early_stopping(self, X, y, X_valid=None, y_valid=None, scorer=None, patience=None,
+                                sample_weight=None):
+        """
+        Add the trees round by round, and stop once the score on the validation set
+        does not improve for `patience` rounds. The model keeps the trees of the best round.
+        """
+        if X_valid is None or scorer is None or patience is None:
+            self.best_iteration_ = None
+            return self.fit(X, y, sample_weight=sample_weight)
+
+        eval_period = max(1, patience // 4)
+        self.iterative_fit(X, y, n_iter=eval_period, refit=True, sample_weight=sample_weight)
+        best_score, best_iteration = scorer(self, X_valid, y_valid), self.get_n_iter()
+        while not self.configuration_fully_fitted() and not self.time_limit_exceeded():
+            self.iterative_fit(X, y, n_iter=eval_period, sample_weight=sample_weight)
+            score = scorer(self, X_valid, y_valid)
+            if score > best_score:
+                best_score, best_iteration = score, self.get_n_iter()
+            elif self.get_n_iter() - best_iteration >= patience:
+                break
+        self.truncate(best_iteration)
+        self.best_iteration_ = best_iteration
+        return self
+
+    def get_n_iter(self):
+        return len(self.estimator.estimators_)
+
+    def truncate(self, n_iter):
+        """
+        Drop the trees after the first n_iter rounds.
+        """
+        estimator = self.estimator
+        if n_iter >= len(estimator.estimators_):
+            return
+        estimator.estimators_ = estimator.estimators_[:n_iter]
+        estimator.train_score_ = estimator.train_score_[:n_iter]
+        for attr in ['oob_improvement_', 'oob_scores_']:
+            if hasattr(estimator, attr):
+                setattr(estimator, attr, getattr(estimator, attr)[:n_iter])
+        estimator.n_estimators = n_iter
+        if hasattr(estimator, 'n_estimators_'):
+            estimator.n_estimators_ = n_iter
+
+
 class IterativeComponent(BaseModel):
     def fit(self, X, y, sample_weight=None):
         self.iterative_fit(X, y, n_iter=2, refit=True)
@@ -9,6 +9,7 @@ from automlToolkit.components.models.base_model import BaseClassificationModel,
 from automlToolkit.components.utils.configspace_utils import check_none, check_for_bool
 from automlToolkit.components.utils.constants import DENSE, SPARSE, UNSIGNED_DATA, PREDICTIONS
 from automlToolkit.components.utils.model_util import convert_multioutput_multiclass_to_multilabel
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 class ExtraTreesClassifier(IterativeComponentWithSampleWeight, BaseClassificationModel):
@@ -45,7 +46,7 @@ class ExtraTreesClassifier(IterativeComponentWithSampleWeight, BaseClassificatio
                                               max_depth=None,
                                               bootstrap=self.bootstrap,
                                               random_state=self.random_state,
-                                              n_jobs=self.n_jobs)
+                                              n_jobs=get_resource_manager().get_n_jobs(self.n_jobs))
         self.estimator.fit(X, y, sample_weight=sample_weight)
         return self
 
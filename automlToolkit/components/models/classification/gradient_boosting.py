@@ -7,12 +7,12 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
     UniformIntegerHyperparameter, UnParametrizedHyperparameter, Constant, \
     CategoricalHyperparameter
 
-from automlToolkit.components.models.base_model import BaseClassificationModel, IterativeComponentWithSampleWeight
+from automlToolkit.components.models.base_model import BaseClassificationModel, BoostingComponentWithSampleWeight
 from automlToolkit.components.utils.configspace_utils import check_none
 from automlToolkit.components.utils.constants import DENSE, UNSIGNED_DATA, PREDICTIONS
 
 
-class GradientBoostingClassifier(IterativeComponentWithSampleWeight, BaseClassificationModel):
+class GradientBoostingClassifier(BoostingComponentWithSampleWeight, BaseClassificationModel):
     def __init__(self, loss, learning_rate, n_estimators, subsample,
                  min_samples_split, min_samples_leaf,
                  min_weight_fraction_leaf, max_depth, criterion, max_features,
@@ -34,6 +34,7 @@ class GradientBoostingClassifier(IterativeComponentWithSampleWeight, BaseClassif
         self.verbose = verbose
         self.estimator = None
         self.fully_fit_ = False
+        self.best_iteration_ = None
         self.time_limit = None
         self.start_time = time.time()
 
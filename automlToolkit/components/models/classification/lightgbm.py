@@ -4,10 +4,12 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
     UniformIntegerHyperparameter, CategoricalHyperparameter, \
     UnParametrizedHyperparameter
 import numpy as np
-from lightgbm import LGBMClassifier
 
 from automlToolkit.components.utils.constants import *
 from automlToolkit.components.models.base_model import BaseClassificationModel
+from automlToolkit.components.computation.resource_manager import get_resource_manager
+from automlToolkit.components.models.lightgbm_dataset import get_booster_params, get_score_feval, \
+    train_booster
 
 
 class LightGBM(BaseClassificationModel):
@@ -25,30 +27,47 @@ class LightGBM(BaseClassificationModel):
         self.n_jobs = -1
         self.random_state = random_state
         self.estimator = None
+        self.best_iteration_ = None
 
-    def fit(self, X, y):
-        self.estimator = LGBMClassifier(num_leaves=self.num_leaves,
-                                        learning_rate=self.learning_rate,
-                                        n_estimators=self.n_estimators,
-                                        min_child_weight=self.min_child_weight,
-                                        subsample=self.subsample,
-                                        colsample_bytree=self.colsample_bytree,
-                                        reg_alpha=self.reg_alpha,
-                                        reg_lambda=self.reg_lambda,
-                                        random_state=self.random_state,
-                                        n_jobs=self.n_jobs)
-        self.estimator.fit(X, y)
+    def fit(self, X, y, sample_weight=None):
+        return self.fit_with_early_stopping(X, y, sample_weight=sample_weight)
+
+    def fit_with_early_stopping(self, X, y, X_valid=None, y_valid=None, scorer=None, patience=None,
+                                sample_weight=None):
+        """
+        Stop adding trees once the score on the validation set does not improve for `patience` rounds.
+        """
+        # Train on the shared binned Dataset of (X, y) instead of the scikit-learn wrapper.
+        self.classes_, y_encoded = np.unique(y, return_inverse=True)
+        n_classes = len(self.classes_)
+        if n_classes > 2:
+            params = get_booster_params(self, 'multiclass', get_resource_manager().get_n_jobs(self.n_jobs),
+                                        num_class=n_classes)
+        else:
+            params = get_booster_params(self, 'binary', get_resource_manager().get_n_jobs(self.n_jobs))
+
+        valid_params = dict()
+        if X_valid is not None and scorer is not None:
+            valid_params = {'X_valid': X_valid,
+                            'y_valid': np.searchsorted(self.classes_, y_valid),
+                            'feval': get_score_feval(scorer, X_valid, y_valid, classes=self.classes_),
+                            'early_stopping_rounds': patience}
+        self.estimator, self.best_iteration_ = train_booster(params, X, y_encoded, self.n_estimators,
+                                                             sample_weight=sample_weight, **valid_params)
         return self
 
     def predict(self, X):
         if self.estimator is None:
             raise NotImplementedError()
-        return self.estimator.predict(X)
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
 
     def predict_proba(self, X):
         if self.estimator is None:
             raise NotImplementedError()
-        return self.estimator.predict_proba(X)
+        proba = self.estimator.predict(X, num_iteration=self.best_iteration_)
+        if proba.ndim == 1:
+            proba = np.vstack([1. - proba, proba]).T
+        return proba
 
     @staticmethod
     def get_properties(dataset_properties=None):
@@ -5,6 +5,7 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
 
 from automlToolkit.components.models.base_model import BaseClassificationModel
 from automlToolkit.components.utils.constants import DENSE, SPARSE, UNSIGNED_DATA, PREDICTIONS
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 class Logistic_Regression(BaseClassificationModel):
@@ -30,7 +31,7 @@ class Logistic_Regression(BaseClassificationModel):
                                             C=self.C,
                                             tol=self.tol,
                                             max_iter=self.max_iter,
-                                            n_jobs=-1)
+                                            n_jobs=get_resource_manager().get_n_jobs())
         self.estimator.fit(X, Y)
         return self
 
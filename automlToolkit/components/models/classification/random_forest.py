@@ -9,6 +9,7 @@ from automlToolkit.components.models.base_model import BaseClassificationModel,
 from automlToolkit.components.utils.constants import *
 from automlToolkit.components.utils.configspace_utils import check_none, check_for_bool
 from automlToolkit.components.utils.model_util import convert_multioutput_multiclass_to_multilabel
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 class RandomForest(
@@ -81,7 +82,7 @@ class RandomForest(
                 max_leaf_nodes=self.max_leaf_nodes,
                 min_impurity_decrease=self.min_impurity_decrease,
                 random_state=self.random_state,
-                n_jobs=self.n_jobs,
+                n_jobs=get_resource_manager().get_n_jobs(self.n_jobs),
                 class_weight=self.class_weight,
                 warm_start=True)
         else:
@@ -0,0 +1,197 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+from automlToolkit.utils.logging_utils import get_logger
+
+# The parameters that decide the binned Dataset, they are the same for all the trials.
+# Without the pre-filter, a constructed Dataset serves any min_data_in_leaf.
+DATASET_PARAMS = {'max_bin': 255,
+                  'min_data_in_bin': 3,
+                  'bin_construct_sample_cnt': 200000,
+                  'feature_pre_filter': False,
+                  'verbose': -1}
+
+
+def get_array_fingerprint(*arrays):
+    """
+    The content hash of the training arrays, dense or sparse.
+    """
+    hasher = hashlib.sha1()
+    for array in arrays:
+        if array is None:
+            hasher.update(b'None')
+            continue
+        if hasattr(array, 'tocsr'):
+            array = array.tocsr()
+            hasher.update(str(('sparse', array.shape)).encode())
+            parts = [array.data, array.indices, array.indptr]
+        else:
+            parts = [np.asarray(array)]
+        for part in parts:
+            hasher.update(str((part.dtype, part.shape)).encode())
+            hasher.update(np.ascontiguousarray(part).tobytes())
+    return hasher.hexdigest()
+
+
+class LightGBMDatasetCache(object):
+    """
+    Keep the constructed LightGBM Datasets of the recent training sets. For a given data node and fold,
+    the binned Dataset is the same for all the configurations, so the trials of the search share it
+    instead of binning the raw features again. The Datasets are keyed by the content of (X, y, sample_weight),
+    which covers the data node and the fold split, and the least recently used ones are dropped.
+    """
+
+    def __init__(self, max_size=24):
+        """
+        :param max_size: the number of Datasets kept in memory, the training and validation sets of the folds.
+        """
+        self.max_size = max_size
+        self.datasets = OrderedDict()
+        self.hit_cnt = 0
+        self.miss_cnt = 0
+        self._lock = threading.Lock()
+        self.logger = get_logger('LightGBMDatasetCache')
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def get(self, X, y, sample_weight=None, reference=None):
+        """
+        :param reference: the training Dataset whose bin mappers are used, for a validation set.
+        :return: the constructed Dataset of (X, y).
+        """
+        key = get_array_fingerprint(X, y, sample_weight)
+        with self._lock:
+            if reference is not None:
+                reference_key = self._get_key(reference)
+                if reference_key is None:
+                    # The training set has been dropped, its validation set is not kept either.
+                    return self._construct(X, y, sample_weight, reference)
+                key = '%s-%s' % (key, reference_key)
+            if key in self.datasets:
+                self.datasets.move_to_end(key)
+                self.hit_cnt += 1
+                return self.datasets[key]
+            self.miss_cnt += 1
+            # Construct it under the lock, the concurrent trials then only read the bins.
+            dataset = self._construct(X, y, sample_weight, reference)
+            self.datasets[key] = dataset
+            while len(self.datasets) > self.max_size:
+                self.datasets.popitem(last=False)
+            self.logger.debug('Binned a Dataset of shape %s, hits: %d, misses: %d.',
+                              X.shape, self.hit_cnt, self.miss_cnt)
+            return dataset
+
+    def _get_key(self, dataset):
+        for key, _dataset in self.datasets.items():
+            if _dataset is dataset:
+                return key
+        return None
+
+    @staticmethod
+    def _construct(X, y, sample_weight=None, reference=None):
+        import lightgbm as lgb
+        dataset = lgb.Dataset(X, label=y, weight=sample_weight, reference=reference,
+                              params=DATASET_PARAMS, free_raw_data=True)
+        return dataset.construct()
+
+    def clear(self):
+        with self._lock:
+            self.datasets.clear()
+
+
+_dataset_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache():
+    global _dataset_cache
+    with _cache_lock:
+        if _dataset_cache is None:
+            _dataset_cache = LightGBMDatasetCache()
+        return _dataset_cache
+
+
+def get_booster_params(estimator, objective, n_jobs, **params):
+    """
+    The native parameters of the LightGBM models, equal to the ones set by the scikit-learn wrappers.
+    """
+    booster_params = {'objective': objective,
+                      'boosting_type': 'gbdt',
+                      'num_leaves': estimator.num_leaves,
+                      'learning_rate': estimator.learning_rate,
+                      'min_sum_hessian_in_leaf': estimator.min_child_weight,
+                      'min_data_in_leaf': 20,
+                      'bagging_fraction': estimator.subsample,
+                      'bagging_freq': 0,
+                      'feature_fraction': estimator.colsample_bytree,
+                      'lambda_l1': estimator.reg_alpha,
+                      'lambda_l2': estimator.reg_lambda,
+                      'num_threads': n_jobs}
+    if estimator.random_state is not None:
+        booster_params['seed'] = estimator.random_state
+    booster_params.update(DATASET_PARAMS)
+    booster_params.update(params)
+    return booster_params
+
+
+class _RoundPredictions(object):
+    """
+    Answer the scorer with the predictions of the current boosting round on the validation set.
+    """
+
+    def __init__(self, predictions, classes=None):
+        self.predictions = predictions
+        self.classes_ = classes
+        self._estimator_type = 'regressor' if classes is None else 'classifier'
+
+    def predict(self, X):
+        if self.classes_ is None:
+            return self.predictions
+        return self.classes_[np.argmax(self.predictions, axis=1)]
+
+    def predict_proba(self, X):
+        return self.predictions
+
+
+def get_score_feval(scorer, X_valid, y_valid, classes=None):
+    """
+    Wrap the scorer of the evaluator as a LightGBM evaluation function, higher is better.
+    :param classes: the class labels for classification, None for regression.
+    """
+
+    def feval(predictions, dataset):
+        if classes is not None:
+            if predictions.ndim == 1 and len(predictions) != len(y_valid):
+                # The multiclass predictions of older versions are flattened class by class.
+                predictions = predictions.reshape(len(classes), -1).T
+            elif predictions.ndim == 1:
+                predictions = np.vstack([1. - predictions, predictions]).T
+        return 'score', scorer(_RoundPredictions(predictions, classes), X_valid, y_valid), True
+
+    return feval
+
+
+def train_booster(params, X, y, num_boost_round, sample_weight=None,
+                  X_valid=None, y_valid=None, feval=None, early_stopping_rounds=None):
+    """
+    Train a booster on the cached Dataset of (X, y), and stop early if the score on the validation set
+    does not improve for early_stopping_rounds rounds.
+    :return: the booster, and its best iteration, None without early stopping.
+    """
+    import lightgbm as lgb
+
+    cache = get_dataset_cache()
+    train_set = cache.get(X, y, sample_weight=sample_weight)
+    if X_valid is None or early_stopping_rounds is None:
+        return lgb.train(params, train_set, num_boost_round=num_boost_round), None
+
+    valid_set = cache.get(X_valid, y_valid, reference=train_set)
+    params = dict(params, metric='None')
+    booster = lgb.train(params, train_set, num_boost_round=num_boost_round,
+                        valid_sets=[valid_set], feval=feval,
+                        callbacks=[lgb.early_stopping(early_stopping_rounds, first_metric_only=True, verbose=False)])
+    best_iteration = booster.best_iteration if booster.best_iteration > 0 else booster.current_iteration()
+    return booster, best_iteration
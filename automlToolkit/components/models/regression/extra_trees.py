@@ -8,6 +8,7 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
 from automlToolkit.components.models.base_model import BaseRegressionModel, IterativeComponentWithSampleWeight
 from automlToolkit.components.utils.configspace_utils import check_none, check_for_bool
 from automlToolkit.components.utils.constants import DENSE, SPARSE, UNSIGNED_DATA, PREDICTIONS
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 
 class ExtraTreesRegressor(IterativeComponentWithSampleWeight, BaseRegressionModel):
@@ -44,7 +45,7 @@ class ExtraTreesRegressor(IterativeComponentWithSampleWeight, BaseRegressionMode
                                              max_depth=None,
                                              bootstrap=self.bootstrap,
                                              random_state=self.random_state,
-                                             n_jobs=self.n_jobs)
+                                             n_jobs=get_resource_manager().get_n_jobs(self.n_jobs))
         self.estimator.fit(X, y, sample_weight=sample_weight)
         return self
 
@@ -6,12 +6,12 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
     UniformIntegerHyperparameter, UnParametrizedHyperparameter, \
     CategoricalHyperparameter
 
-from automlToolkit.components.models.base_model import BaseRegressionModel, IterativeComponentWithSampleWeight
+from automlToolkit.components.models.base_model import BaseRegressionModel, BoostingComponentWithSampleWeight
 from automlToolkit.components.utils.configspace_utils import check_none
 from automlToolkit.components.utils.constants import DENSE, UNSIGNED_DATA, PREDICTIONS
 
 
-class GradientBoostingRegressor(IterativeComponentWithSampleWeight, BaseRegressionModel):
+class GradientBoostingRegressor(BoostingComponentWithSampleWeight, BaseRegressionModel):
     def __init__(self, loss, learning_rate, n_estimators, subsample,
                  min_samples_split, min_samples_leaf,
                  min_weight_fraction_leaf, max_depth, criterion, max_features,
@@ -33,6 +33,7 @@ class GradientBoostingRegressor(IterativeComponentWithSampleWeight, BaseRegressi
         self.verbose = verbose
         self.estimator = None
         self.fully_fit_ = False
+        self.best_iteration_ = None
         self.start_time = time.time()
         self.time_limit = None
 
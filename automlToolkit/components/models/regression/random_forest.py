@@ -7,6 +7,7 @@ import numpy as np
 from automlToolkit.components.models.base_model import BaseRegressionModel, IterativeComponentWithSampleWeight
 from automlToolkit.components.utils.constants import *
 from automlToolkit.components.utils.configspace_utils import check_none, check_for_bool
+from automlToolkit.components.computation.resource_manager import get_resource_manager
 
 import time
 
@@ -79,7 +80,7 @@ class RandomForest(
                 max_leaf_nodes=self.max_leaf_nodes,
                 min_impurity_decrease=self.min_impurity_decrease,
                 random_state=self.random_state,
-                n_jobs=self.n_jobs,
+                n_jobs=get_resource_manager().get_n_jobs(self.n_jobs),
                 warm_start=True)
         else:
 
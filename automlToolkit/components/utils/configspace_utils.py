@@ -1,18 +1,30 @@
+import numpy as np
 from typing import List
 from ConfigSpace import Configuration, ConfigurationSpace
 
 
+def get_configuration_key(config: Configuration):
+    """
+    Hashable key of a configuration, built from its vector encoding.
+    """
+    return np.nan_to_num(config.get_array(), nan=-1.).tobytes()
+
+
 def sample_configurations(configuration_space: ConfigurationSpace,
                           sample_size: int, historical_configs: List[Configuration], seed=1):
     configuration_space.seed(seed)
     result = []
     sample_cnt = 0
+    seen = set(get_configuration_key(config) for config in historical_configs)
     if len(historical_configs) == 0:
         result.append(configuration_space.get_default_configuration())
+        seen.add(get_configuration_key(result[0]))
 
     while len(result) < sample_size:
         config = configuration_space.sample_configuration(1)
-        if config not in result and config not in historical_configs:
+        key = get_configuration_key(config)
+        if key not in seen:
+            seen.add(key)
             result.append(config)
         sample_cnt += 1
         if sample_cnt > 50 * sample_size:
@@ -1,36 +1,122 @@
-import numpy as np
+import os
+import hashlib
 import warnings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from PIL import Image
 except ImportError:
     warnings.warn("Pillow not installed! Image2Vector will fail!")
 
+IMAGE_SIZE = (224, 224)
+DEFAULT_CACHE_DIR = './image_embedding_cache'
+
+
+def resize(image, size=IMAGE_SIZE):
+    image = Image.fromarray(np.asarray(image).astype('uint8'))
+    return np.asarray(image.resize(size), dtype=np.uint8)
+
 
 def reshape(images):
     reshaped_array = np.zeros((len(images), 224, 224, 3))
     for i in range(len(images)):
-        image = Image.fromarray(images[i].astype('uint8'))
-        reshaped_image = image.resize((224, 224))
-        reshaped_array[i, :, :, :] = reshaped_image
+        reshaped_array[i, :, :, :] = resize(images[i])
     return reshaped_array
 
 
+def image_hash(image):
+    image = np.ascontiguousarray(image)
+    sha1 = hashlib.sha1(('%s-%s' % (image.dtype.str, image.shape)).encode('utf-8'))
+    sha1.update(image.data)
+    return sha1.hexdigest()
+
+
+class EmbeddingCache(object):
+    """
+    On-disk cache of image embeddings, keyed by the content hash of each image.
+    """
+
+    def __init__(self, cache_dir, model_name):
+        self.cache_dir = os.path.join(cache_dir, model_name)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], '%s.npy' % key)
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path)
+        except (IOError, ValueError):
+            return None
+
+    def put(self, key, embedding):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.save(f, embedding)
+        os.replace(tmp_path, path)
+
+
 class Image2vector():
-    def __init__(self, model='resnet'):
-        from keras.models import Model
-        if model == 'resnet':
-            from keras.applications import ResNet50
-            self.model = ResNet50(include_top=True)
-        elif model == 'vgg':
-            from keras.applications import VGG19
-            self.model = VGG19(include_top=True)
-        self.model = Model(inputs=self.model.input, outputs=self.model.output)
+    def __init__(self, model='resnet', batch_size=64, n_threads=4, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        :param model: 'resnet' or 'vgg'.
+        :param batch_size: number of images fed to the model at once, which bounds the memory usage.
+        :param n_threads: number of threads used to decode and resize images.
+        :param cache_dir: directory of the embedding cache, None to disable the cache.
+        """
+        self.model_name = model
+        self.batch_size = batch_size
+        self.n_threads = n_threads
+        self.cache = EmbeddingCache(cache_dir, model) if cache_dir is not None else None
+        self._model = None
+
+    @property
+    def model(self):
+        # Build the network only if some image is not in the cache.
+        if self._model is None:
+            from keras.models import Model
+            if self.model_name == 'resnet':
+                from keras.applications import ResNet50
+                model = ResNet50(include_top=True)
+            elif self.model_name == 'vgg':
+                from keras.applications import VGG19
+                model = VGG19(include_top=True)
+            else:
+                raise ValueError('Invalid model: %s!' % self.model_name)
+            self._model = Model(inputs=model.input, outputs=model.output)
+        return self._model
 
     def predict(self, images):
         """
         :param images: numpy array
         :return: numpy array of shape (n_samples,1000)
         """
-        reshaped_images = reshape(images)
-        return self.model.predict(reshaped_images, batch_size=128)
+        n_images = len(images)
+        embeddings = [None] * n_images
+        keys = [None] * n_images
+        if self.cache is not None:
+            for i in range(n_images):
+                keys[i] = image_hash(images[i])
+                embeddings[i] = self.cache.get(keys[i])
+        missing_idx = [i for i in range(n_images) if embeddings[i] is None]
+
+        if len(missing_idx) > 0:
+            batches = [missing_idx[i: i + self.batch_size] for i in range(0, len(missing_idx), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+                # Resize the next batch while the model predicts the current one.
+                pending = [pool.submit(resize, images[i]) for i in batches[0]]
+                for batch_id, batch in enumerate(batches):
+                    batch_images = np.stack([task.result() for task in pending])
+                    if batch_id + 1 < len(batches):
+                        pending = [pool.submit(resize, images[i]) for i in batches[batch_id + 1]]
+                    outputs = self.model.predict(batch_images.astype(np.float32), batch_size=len(batch))
+                    for i, output in zip(batch, outputs):
+                        embeddings[i] = output
+                        if self.cache is not None:
+                            self.cache.put(keys[i], output)
+        return np.array(embeddings)
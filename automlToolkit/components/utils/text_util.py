@@ -1,5 +1,9 @@
+import os
+import threading
 import numpy as np
 
+DEFAULT_GLOVE_PATH = './glove_data/glove.6B.50d.txt'
+
 
 def text_to_word_sequence(text,
                           filters='!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n',
@@ -15,7 +19,7 @@ def text_to_word_sequence(text,
     return [i for i in seq if i]
 
 
-def build_embeddings_index(glove_path='./glove_data/glove.6B.50d.txt'):
+def build_embeddings_index(glove_path=DEFAULT_GLOVE_PATH):
     embeddings_index = dict()
     f = open(glove_path, encoding='utf-8')
     for line in f:
@@ -27,6 +31,92 @@ def build_embeddings_index(glove_path='./glove_data/glove.6B.50d.txt'):
     return embeddings_index
 
 
+def get_embedding_cache_paths(glove_path, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.dirname(os.path.abspath(glove_path))
+    prefix = os.path.join(cache_dir, os.path.splitext(os.path.basename(glove_path))[0])
+    return prefix + '.vocab', prefix + '.npy'
+
+
+def convert_embeddings(glove_path=DEFAULT_GLOVE_PATH, cache_dir=None):
+    """
+    Convert a GloVe text file into a binary vocabulary file and a float32 matrix,
+    which can be memory-mapped instead of being parsed again.
+    :param glove_path: path of the embedding file in text format.
+    :param cache_dir: directory of the converted files, default to the directory of glove_path.
+    :return: the paths of the vocabulary file and the matrix file.
+    """
+    vocab_path, matrix_path = get_embedding_cache_paths(glove_path, cache_dir)
+    with open(glove_path, encoding='utf-8') as f:
+        n_words = 0
+        embed_size = None
+        for line in f:
+            if embed_size is None:
+                embed_size = len(line.rstrip().split(' ')) - 1
+            n_words += 1
+    if embed_size is None:
+        raise ValueError('Empty embedding file: %s!' % glove_path)
+
+    words = list()
+    tmp_matrix_path = matrix_path + '.tmp'
+    matrix = np.lib.format.open_memmap(tmp_matrix_path, mode='w+', dtype=np.float32,
+                                       shape=(n_words, embed_size))
+    with open(glove_path, encoding='utf-8') as f:
+        for idx, line in enumerate(f):
+            values = line.rstrip().split(' ')
+            words.append(values[0])
+            matrix[idx] = np.asarray(values[1:], dtype=np.float32)
+    matrix.flush()
+    del matrix
+
+    with open(vocab_path + '.tmp', 'wb') as f:
+        f.write('\n'.join(words).encode('utf-8'))
+    # Rename at last, so that a concurrent reader never sees a partial cache.
+    os.replace(tmp_matrix_path, matrix_path)
+    os.replace(vocab_path + '.tmp', vocab_path)
+    return vocab_path, matrix_path
+
+
+class EmbeddingStore(object):
+    """
+    Word embeddings backed by a memory-mapped float32 matrix.
+    The text file is converted by `convert_embeddings` at the first use.
+    """
+
+    def __init__(self, glove_path=DEFAULT_GLOVE_PATH, cache_dir=None):
+        vocab_path, matrix_path = get_embedding_cache_paths(glove_path, cache_dir)
+        if not (os.path.exists(vocab_path) and os.path.exists(matrix_path)):
+            convert_embeddings(glove_path, cache_dir)
+        with open(vocab_path, 'rb') as f:
+            words = f.read().decode('utf-8').split('\n')
+        self.word_index = dict(zip(words, range(len(words))))
+        self.matrix = np.load(matrix_path, mmap_mode='r')
+        self.embed_size = self.matrix.shape[1]
+
+    def lookup(self, tokens):
+        word_index = self.word_index
+        return [word_index[token] for token in tokens if token in word_index]
+
+
+_embedding_stores = dict()
+_embedding_lock = threading.Lock()
+
+
+def get_embedding_store(glove_path=DEFAULT_GLOVE_PATH, cache_dir=None):
+    """
+    Return the process-wide embedding store of glove_path, which is loaded at the first call.
+    """
+    key = (os.path.abspath(glove_path), cache_dir)
+    store = _embedding_stores.get(key)
+    if store is None:
+        with _embedding_lock:
+            store = _embedding_stores.get(key)
+            if store is None:
+                store = EmbeddingStore(glove_path, cache_dir)
+                _embedding_stores[key] = store
+    return store
+
+
 def load_embedding_matrix(word_index, embedding_index, if_normalize=True):
     all_embs = np.stack(embedding_index.values())
     if if_normalize:
@@ -43,34 +133,41 @@ def load_embedding_matrix(word_index, embedding_index, if_normalize=True):
     return embedding_matrix
 
 
-def load_text_embeddings(texts, embedding_index, method='average', alpha=1e-3):
-    from keras.preprocessing.text import Tokenizer
-    tok = Tokenizer()
-    tok.fit_on_texts(texts)
-    word_index = tok.word_index
-    embedding_matrix = load_embedding_matrix(word_index, embedding_index, if_normalize=False)
-    index_sequences = tok.texts_to_sequences(texts)
-    text_embeddings = []
+def load_text_embeddings(texts, embedding_store, method='average', alpha=1e-3):
+    """
+    Compute the sentence embeddings of a text column.
+    Words outside the vocabulary are ignored, and texts without known words are embedded as zeros.
+    :param texts: iterable of strings.
+    :param embedding_store: instance of EmbeddingStore.
+    :param method: 'average' or 'weighted'.
+    :param alpha: smoothing parameter in the 'weighted' method.
+    :return: array of shape (n_texts, embed_size).
+    """
+    n_texts = len(texts)
+    seqs = [embedding_store.lookup(text_to_word_sequence(str(text))) for text in texts]
+    seq_lens = np.array([len(seq) for seq in seqs], dtype=np.int64)
+    text_embeddings = np.zeros((n_texts, embedding_store.embed_size), dtype=np.float64)
+    if seq_lens.sum() == 0:
+        return text_embeddings
+
+    word_ids = np.fromiter((i for seq in seqs for i in seq), dtype=np.int64, count=int(seq_lens.sum()))
+    text_ids = np.repeat(np.arange(n_texts), seq_lens)
+
     if method == 'average':
-        for seq in index_sequences:
-            embedding = []
-            for i in seq:
-                embedding.append(embedding_matrix[i - 1])
-            text_embeddings.append(np.average(embedding, axis=0))
-        text_embeddings = np.array(text_embeddings)
+        weights = np.ones(len(word_ids))
+        norms = seq_lens.astype(np.float64)
     elif method == 'weighted':
-        from collections import Counter
-        for seq in index_sequences:
-            counter = Counter(seq)
-            embedding = []
-            for i in counter:
-                embedding.append(embedding_matrix[i - 1] * alpha / (alpha + counter[i] / len(seq)))
-            text_embeddings.append(np.average(embedding, axis=0))
-        text_embeddings = np.array(text_embeddings)
-
-        from sklearn.decomposition import TruncatedSVD
-        svd = TruncatedSVD(n_components=1, n_iter=7, random_state=0)
-        svd.fit(text_embeddings)
-        pc = svd.components_
-        test_embeddings = text_embeddings - text_embeddings.dot(pc.transpose()) * pc
-    return text_embeddings
\ No newline at end of file
+        # Each distinct word in a text contributes once, weighted by its frequency in the text.
+        vocab_size = len(embedding_store.word_index)
+        keys, counts = np.unique(text_ids * vocab_size + word_ids, return_counts=True)
+        text_ids, word_ids = keys // vocab_size, keys % vocab_size
+        weights = alpha / (alpha + counts / seq_lens[text_ids])
+        norms = np.bincount(text_ids, minlength=n_texts).astype(np.float64)
+    else:
+        raise ValueError('Invalid method: %s!' % method)
+
+    vectors = np.asarray(embedding_store.matrix[word_ids], dtype=np.float64) * weights[:, None]
+    non_empty = np.flatnonzero(norms)
+    offsets = np.searchsorted(text_ids, non_empty)
+    text_embeddings[non_empty] = np.add.reduceat(vectors, offsets, axis=0) / norms[non_empty, None]
+    return text_embeddings
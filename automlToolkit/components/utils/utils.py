@@ -1,4 +1,7 @@
+import os
 import sys
+import json
+import hashlib
 import pkgutil
 import inspect
 import importlib
@@ -36,11 +39,12 @@ def collect_infos(transformer_dict, feature_types):
     type_infos = dict()
     params_infos = dict()
 
-    transformer_list = transformer_dict.keys()
+    # Instantiate each transformer only once.
+    transformers = OrderedDict((transformer_id, transformer_dict[transformer_id]())
+                               for transformer_id in transformer_dict.keys())
     for feature_type in feature_types:
         type_infos[feature_type] = list()
-        for transformer_id in transformer_list:
-            transformer = transformer_dict[transformer_id]()
+        for transformer_id, transformer in transformers.items():
             target_fields = transformer.input_type
             if target_fields is None:
                 continue
@@ -49,9 +53,8 @@ def collect_infos(transformer_dict, feature_types):
             if feature_type in target_fields:
                 type_infos[feature_type].append(transformer_id)
 
-    for transformer_id in transformer_list:
+    for transformer_id, transformer in transformers.items():
         params_infos[transformer_id] = list()
-        transformer = transformer_dict[transformer_id]()
         optional_params = transformer.optional_params
         if optional_params is not None:
             params_infos[transformer_id].extend(optional_params)
@@ -59,6 +62,98 @@ def collect_infos(transformer_dict, feature_types):
     return type_infos, params_infos
 
 
+class LazyComponents(OrderedDict):
+    """
+    Mapping from the component id to the component class, which imports the module of a component
+    at its first access.
+    """
+
+    def __init__(self, locations):
+        """
+        :param locations: list of (component id, module name, class name).
+        """
+        super().__init__((component_id, None) for component_id, _, _ in locations)
+        self.locations = {component_id: (module_name, class_name)
+                          for component_id, module_name, class_name in locations}
+
+    def __getitem__(self, component_id):
+        component = super().__getitem__(component_id)
+        if component is None:
+            module_name, class_name = self.locations[component_id]
+            component = getattr(importlib.import_module(module_name), class_name)
+            super().__setitem__(component_id, component)
+        return component
+
+    def get(self, component_id, default=None):
+        return self[component_id] if component_id in self else default
+
+    def values(self):
+        return [self[component_id] for component_id in self.keys()]
+
+    def items(self):
+        return [(component_id, self[component_id]) for component_id in self.keys()]
+
+
+def list_component_modules(directories):
+    return sorted(module_name for directory in directories
+                  for _, module_name, ispkg in pkgutil.iter_modules([directory]) if not ispkg)
+
+
+def get_module_hashes(directories):
+    """
+    :return: dict from the name of each module in directories to the hash of its source.
+    """
+    hashes = dict()
+    for directory in directories:
+        for _, module_name, ispkg in pkgutil.iter_modules([directory]):
+            if ispkg:
+                continue
+            with open(os.path.join(directory, module_name + '.py'), 'rb') as f:
+                hashes[module_name] = hashlib.sha1(f.read()).hexdigest()
+    return hashes
+
+
+def dump_manifest(path, component_dict, feature_types, directories):
+    """
+    Write the manifest of the components: the location, the type, the input types and the optional params
+    of each component, and the hashes of the modules it is generated from.
+    """
+    type_infos, params_infos = collect_infos(component_dict, feature_types)
+    components = list()
+    for component_id, component in component_dict.items():
+        components.append({'id': component_id,
+                           'module': component.__module__,
+                           'class': component.__name__,
+                           'type': component().type,
+                           'input_types': [feature_type for feature_type in feature_types
+                                           if component_id in type_infos[feature_type]],
+                           'optional_params': params_infos[component_id]})
+    with open(path, 'w') as f:
+        json.dump({'modules': get_module_hashes(directories), 'components': components}, f, indent=1)
+
+
+def load_manifest(path, feature_types, directories):
+    """
+    :return: the lazy component dict, the type infos, the params infos and the transformation type
+        of each component; None if the manifest is missing, or some module in directories is added, removed
+        or changed since it was written.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest['modules'] != get_module_hashes(directories):
+        return None
+
+    components = manifest['components']
+    component_dict = LazyComponents([(item['id'], item['module'], item['class']) for item in components])
+    type_infos = {feature_type: [item['id'] for item in components if feature_type in item['input_types']]
+                  for feature_type in feature_types}
+    params_infos = {item['id']: list(item['optional_params']) for item in components}
+    trans_types = {item['id']: item['type'] for item in components}
+    return component_dict, type_infos, params_infos, trans_types
+
+
 def is_numeric(n):
     try:
         float(n)  # Type-casting the string to `float`.
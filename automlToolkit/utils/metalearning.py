@@ -1,11 +1,6 @@
 import os
 import functools
 
-from autosklearn.smbo import AutoMLSMBO
-from autosklearn.data.xy_data_manager import XYDataManager
-from autosklearn.util.backend import create
-from autosklearn.util import pipeline, StopWatch
-
 from automlToolkit.datasets.utils import load_data
 from automlToolkit.components.feature_engineering.transformations.empty_transformer import *
 
@@ -38,6 +33,13 @@ def partialclass(cls, *args, **kwargs):
 
 
 def get_meta_learning_configs(X, y, task_type, dataset_name='default', metric='accuracy', num_cfgs=5):
+    # Imported here, as setting up auto-sklearn is only needed by this fallback;
+    # see components/meta_learning/meta_index.py for the lookup used by the bandit.
+    from autosklearn.smbo import AutoMLSMBO
+    from autosklearn.data.xy_data_manager import XYDataManager
+    from autosklearn.util.backend import create
+    from autosklearn.util import pipeline, StopWatch
+
     if X is None or y is None:
         X, y, _ = load_data(dataset_name)
     backend = create(temporary_directory=None,
@@ -0,0 +1,152 @@
+"""
+Nested timing spans, disabled by default.
+Usage:
+    enable_tracing()
+    with span('fe_iteration', category='optimizer'):
+        ...
+    export_chrome_trace('trace.json')  # Open with chrome://tracing or ui.perfetto.dev.
+    print(format_summary())
+Only the spans in the current process are recorded.
+"""
+import os
+import json
+import time
+import functools
+import threading
+
+_enabled = False
+_events = list()
+_local = threading.local()
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class _Span(object):
+    __slots__ = ('name', 'category', 'args', 'start', 'child_time')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = list()
+        stack.append(self)
+        self.child_time = 0
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter_ns() - self.start
+        stack = _local.stack
+        stack.pop()
+        if len(stack) > 0:
+            stack[-1].child_time += duration
+        # list.append is atomic, so the spans of all the threads share one list.
+        _events.append((self.name, self.category, self.start, duration, duration - self.child_time,
+                        os.getpid(), threading.get_ident(), self.args))
+        return False
+
+
+def enable_tracing():
+    global _enabled
+    _enabled = True
+
+
+def disable_tracing():
+    global _enabled
+    _enabled = False
+
+
+def is_tracing_enabled():
+    return _enabled
+
+
+def reset_tracing():
+    del _events[:]
+
+
+def span(name, category='default', **args):
+    """
+    Context manager which records the time spent in its block, a no-op if tracing is disabled.
+    :param args: extra information shown in the trace viewer.
+    """
+    if not _enabled:
+        return _null_span
+    return _Span(name, category, args)
+
+
+def traced(name=None, category='default'):
+    """
+    Decorator which records each call of the function as a span.
+    """
+
+    def decorator(func):
+        span_name = func.__qualname__ if name is None else name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def export_chrome_trace(path):
+    """
+    Write the spans in the Chrome trace event format, which Perfetto also reads.
+    """
+    trace_events = list()
+    for name, category, start, duration, _, pid, tid, args in list(_events):
+        trace_events.append({'name': name, 'cat': category, 'ph': 'X',
+                             'ts': start / 1e3, 'dur': duration / 1e3,
+                             'pid': pid, 'tid': tid, 'args': {key: str(val) for key, val in args.items()}})
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+    return path
+
+
+def get_summary():
+    """
+    :return: list of dicts with the count, the total, self, mean and max time in seconds of each span name,
+        sorted by the total time.
+    """
+    stats = dict()
+    for name, category, _, duration, self_time, _, _, _ in list(_events):
+        if name not in stats:
+            stats[name] = {'name': name, 'category': category, 'count': 0,
+                           'total': 0., 'self': 0., 'max': 0.}
+        item = stats[name]
+        item['count'] += 1
+        item['total'] += duration / 1e9
+        item['self'] += self_time / 1e9
+        item['max'] = max(item['max'], duration / 1e9)
+    summary = sorted(stats.values(), key=lambda x: x['total'], reverse=True)
+    for item in summary:
+        item['mean'] = item['total'] / item['count']
+    return summary
+
+
+def format_summary(top_k=None):
+    summary = get_summary()[:top_k]
+    width = max([len(item['name']) for item in summary] + [4])
+    lines = ['%-*s %8s %12s %12s %12s %12s' % (width, 'name', 'count', 'total(s)', 'self(s)', 'mean(s)', 'max(s)')]
+    for item in summary:
+        lines.append('%-*s %8d %12.4f %12.4f %12.4f %12.4f' % (width, item['name'], item['count'], item['total'],
+                                                              item['self'], item['mean'], item['max']))
+    return '\n'.join(lines)
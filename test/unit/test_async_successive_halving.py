@@ -0,0 +1,55 @@
+import os
+import sys
+import numpy as np
+from concurrent.futures import Future
+sys.path.append(os.getcwd())
+
+from automlToolkit.components.hpo_optimizer.mfse_optimizer import run_async_successive_halving
+
+
+class SimulatedExecutor(object):
+    """
+    Finish the running evaluations in random batches, including all of them at once.
+    The loss of a configuration does not depend on the resource.
+    """
+
+    def __init__(self, losses, seed=1):
+        self.losses = losses
+        self.rng = np.random.RandomState(seed)
+
+    def submit(self, param, subsample_ratio=1.):
+        future = Future()
+        future.set_result((self.losses[param], 1.))
+        return future
+
+    def wait_any(self, futures, timeout=None):
+        n_done = self.rng.randint(1, len(futures) + 1)
+        return [futures[i] for i in self.rng.permutation(len(futures))[:n_done]]
+
+
+def get_sync_rung_sizes(n, s, eta):
+    sizes = [n]
+    for i in range(s):
+        sizes.append(int(n * eta ** (-i) / eta) if sizes[-1] >= eta else 1)
+    return sizes
+
+
+def test_rung_sizes_match_successive_halving():
+    R, eta = 27, 3
+    s_max = 3
+    for s in range(s_max + 1):
+        n = int(np.ceil((s_max + 1) / (s + 1) * eta ** s))
+        r = int(R * eta ** (-s))
+        resources = [r * eta ** i for i in range(s + 1)]
+        for n_workers in [1, 2, 4, 8]:
+            for seed in range(5):
+                losses = np.random.RandomState(seed).rand(n)
+                executor = SimulatedExecutor(losses, seed)
+                rungs, _ = run_async_successive_halving(list(range(n)), resources, R, eta, n_workers, executor)
+                assert [len(rung) for rung in rungs] == get_sync_rung_sizes(n, s, eta)
+                for i in range(s):
+                    assert set(idx for _, idx in rungs[i + 1]) <= set(idx for _, idx in rungs[i])
+
+
+if __name__ == '__main__':
+    test_rung_sizes_match_successive_halving()
@@ -0,0 +1,61 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+
+from automlToolkit.benchmark import suite
+from automlToolkit.benchmark.suite import register_benchmark, run_benchmarks, compare_results, get_failures
+
+
+@register_benchmark('_test_crash')
+def bench_crash(params, state):
+    raise RuntimeError('crashed')
+
+
+@register_benchmark('_test_missing_dependency')
+def bench_missing_dependency(params, state):
+    raise ModuleNotFoundError("No module named 'smac.scenario'", name='smac.scenario')
+
+
+@register_benchmark('_test_broken_import')
+def bench_broken_import(params, state):
+    raise ModuleNotFoundError("No module named 'sklearn.utils.testing'", name='sklearn.utils.testing')
+
+
+@register_benchmark('_test_ok')
+def bench_ok(params, state):
+    return {'median': 1.}
+
+
+def test_crash_is_a_failure():
+    names = ['_test_crash', '_test_missing_dependency', '_test_broken_import', '_test_ok']
+    report = run_benchmarks(names)
+    results = report['results']
+    assert results['_test_crash']['failed']
+    # Only the optional dependencies are skipped, a broken import of the toolkit fails.
+    assert results['_test_missing_dependency']['skipped']
+    assert results['_test_broken_import']['failed']
+    assert results['_test_ok']['peak_rss_growth_mb'] >= 0
+    assert list(get_failures(report).keys()) == ['_test_crash', '_test_broken_import']
+
+
+def test_skipped_and_missing_are_regressions():
+    report = run_benchmarks(['_test_missing_dependency', '_test_ok'])
+    baseline = {'results': {name: {'median': 1.} for name in ['_test_missing_dependency', '_test_ok', '_test_gone']}}
+    regressions = compare_results(baseline, report)
+    assert sorted((name, key) for name, key, _, _, _ in regressions) == \
+        [('_test_gone', 'missing'), ('_test_missing_dependency', 'skipped')]
+
+    # The benchmarks not measured in the baseline are not compared.
+    baseline['results']['_test_missing_dependency'] = {'skipped': True, 'error': 'smac'}
+    del baseline['results']['_test_gone']
+    assert compare_results(baseline, report) == []
+
+
+def teardown_module(module):
+    for name in ['_test_crash', '_test_missing_dependency', '_test_broken_import', '_test_ok']:
+        suite._benchmarks.pop(name, None)
+
+
+if __name__ == '__main__':
+    test_crash_is_a_failure()
+    test_skipped_and_missing_are_regressions()
@@ -0,0 +1,48 @@
+import os
+import sys
+import pickle
+import numpy as np
+sys.path.append(os.getcwd())
+
+from ConfigSpace.hyperparameters import UnParametrizedHyperparameter
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.components.evaluators.base_evaluator import fetch_predict_estimator
+from automlToolkit.components.evaluators.prediction_store import PredictionStore, get_trial_key
+from automlToolkit.components.models.classification import _classifiers
+from automlToolkit.components.utils.constants import NUMERICAL, BINARY_CLS
+
+
+def get_node(seed):
+    rng = np.random.RandomState(seed)
+    X = rng.rand(200, 5)
+    return DataNode([X, (X[:, 0] > 0.5).astype(int)], [NUMERICAL] * 5, BINARY_CLS)
+
+
+def test_rounds_are_kept_per_trial():
+    cs = _classifiers['gradient_boosting'].get_hyperparameter_search_space()
+    cs.add_hyperparameter(UnParametrizedHyperparameter('estimator', 'gradient_boosting'))
+    config = cs.get_default_configuration()
+    node1, node2, node3 = get_node(1), get_node(2), get_node(3)
+
+    store = PredictionStore(BINARY_CLS)
+    try:
+        store.add_best_iteration(get_trial_key(node1, config), 7)
+        # The records of the evaluators in worker processes reach the same store.
+        worker_store = pickle.loads(pickle.dumps(store))
+        worker_store.add_best_iteration(get_trial_key(node2, config), 13)
+
+        n_estimators = list()
+        for node in [node1, node2, node3]:
+            estimator = fetch_predict_estimator(BINARY_CLS, config, node.data[0], node.data[1],
+                                                prediction_store=store, data_node=node)
+            n_estimators.append(estimator.n_estimators)
+        # The same configuration on another node trains the rounds of its own trial, or the default.
+        assert n_estimators[:2] == [7, 13]
+        assert n_estimators[2] == config['n_estimators']
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    test_rounds_are_kept_per_trial()
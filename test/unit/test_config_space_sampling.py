@@ -0,0 +1,48 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+
+from ConfigSpace import ConfigurationSpace
+from ConfigSpace.hyperparameters import UniformFloatHyperparameter, CategoricalHyperparameter
+
+from automlToolkit.components.hpo_optimizer.utils.config_space_utils import sample_configurations, \
+    expand_configurations
+from automlToolkit.components.hpo_optimizer.utils.config_space_analysis import get_config_space_analysis
+
+
+def get_config_space(seed=1):
+    cs = ConfigurationSpace(seed=seed)
+    cs.add_hyperparameters([UniformFloatHyperparameter('x', 0., 1.),
+                            CategoricalHyperparameter('c', ['a', 'b', 'c'])])
+    return cs
+
+
+def get_space(config):
+    # The attribute is renamed in the recent versions of ConfigSpace.
+    return config.configuration_space if hasattr(config, 'configuration_space') else config.config_space
+
+
+def test_sample_with_own_space():
+    cs1, cs2 = get_config_space(1), get_config_space(1)
+    assert get_config_space_analysis(cs1) is get_config_space_analysis(cs2)
+    configs1, configs2 = sample_configurations(cs1, 10), sample_configurations(cs2, 10)
+    # The same seed gives the same configurations, bound to the space passed in.
+    assert [config.get_dictionary() for config in configs1] == [config.get_dictionary() for config in configs2]
+    assert all(get_space(config) is cs2 for config in configs2)
+    assert len(set(configs1)) == 10
+
+
+def test_fill_up_small_space():
+    cs = ConfigurationSpace(seed=1)
+    cs.add_hyperparameter(CategoricalHyperparameter('c', ['a', 'b', 'c']))
+    assert get_config_space_analysis(cs).cardinality == 3
+    configs = sample_configurations(cs, 5)
+    assert len(configs) == 5
+    assert len(set(configs)) == 3
+    configs = expand_configurations(configs[:1], cs, 4)
+    assert len(configs) == 4
+
+
+if __name__ == '__main__':
+    test_sample_with_own_space()
+    test_fill_up_small_space()
@@ -0,0 +1,93 @@
+import os
+import sys
+import multiprocessing
+sys.path.append(os.getcwd())
+
+import pytest
+from ConfigSpace import ConfigurationSpace
+from ConfigSpace.hyperparameters import UniformFloatHyperparameter
+
+from automlToolkit.components.computation.distributed import Coordinator, Worker, DistributedExecutor
+
+
+class QuadraticEvaluator(object):
+    def __call__(self, config, name=None, data_node=None, data_subsample_ratio=1.):
+        return -(config['x'] - 0.3) ** 2 * data_subsample_ratio
+
+
+def _run_worker(address, authkey):
+    Worker(address, authkey=authkey, heartbeat_interval=.5).run()
+
+
+def get_config_space():
+    cs = ConfigurationSpace()
+    cs.add_hyperparameter(UniformFloatHyperparameter('x', 0., 1.))
+    cs.seed(1)
+    return cs
+
+
+def test_trials_on_localhost_workers():
+    coordinator = Coordinator(authkey=b'test-key', heartbeat_timeout=10.)
+    workers = [multiprocessing.Process(target=_run_worker, args=(coordinator.address, b'test-key'), daemon=True)
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    try:
+        assert coordinator.wait_for_workers(2, timeout=30)
+        evaluator = QuadraticEvaluator()
+        executor = DistributedExecutor(evaluator, coordinator)
+        configs = get_config_space().sample_configuration(6)
+        scores = executor.parallel_execute(configs, subsample_ratio=.5)
+        assert scores == pytest.approx([evaluator(config, data_subsample_ratio=.5) for config in configs])
+    finally:
+        coordinator.close()
+        for worker in workers:
+            worker.join(timeout=10)
+    # The workers stop once the coordinator is closed.
+    assert not any(worker.is_alive() for worker in workers)
+
+
+def test_worker_with_wrong_authkey_is_rejected():
+    coordinator = Coordinator(authkey=b'test-key')
+    try:
+        worker = Worker(coordinator.address, authkey=b'wrong-key')
+        with pytest.raises(Exception):
+            worker.run()
+        assert coordinator.get_worker_count() == 0
+    finally:
+        coordinator.close()
+
+
+def test_authkey_is_required(monkeypatch, capsys):
+    monkeypatch.delenv('AUTOML_TOOLKIT_AUTHKEY', raising=False)
+    with pytest.raises(ValueError):
+        Coordinator(('0.0.0.0', 0))
+    with pytest.raises(ValueError):
+        Worker(('127.0.0.1', 9000))
+    # On loopback, a random key is generated for the local workers, and never written out.
+    coordinator = Coordinator()
+    try:
+        assert len(coordinator.authkey) == 32
+        assert coordinator.authkey.decode() not in capsys.readouterr().out
+        worker = multiprocessing.Process(target=_run_worker, args=(coordinator.address, coordinator.authkey),
+                                         daemon=True)
+        worker.start()
+        assert coordinator.wait_for_workers(1, timeout=30)
+    finally:
+        coordinator.close()
+    worker.join(timeout=10)
+
+    monkeypatch.setenv('AUTOML_TOOLKIT_AUTHKEY', 'env-key')
+    assert Worker(('127.0.0.1', 9000)).authkey == b'env-key'
+
+
+def test_executor_needs_partial_evaluation():
+    from automlToolkit.components.hpo_optimizer.hpo_optimizer_builder import build_hpo_optimizer
+    with pytest.raises(ValueError):
+        build_hpo_optimizer('holdout', QuadraticEvaluator(), get_config_space(), executor=object())
+
+
+if __name__ == '__main__':
+    test_trials_on_localhost_workers()
+    test_worker_with_wrong_authkey_is_rejected()
+    test_executor_needs_partial_evaluation()
@@ -0,0 +1,22 @@
+import os
+import sys
+import numpy as np
+sys.path.append(os.getcwd())
+
+from sklearn.preprocessing import RobustScaler
+
+from automlToolkit.components.feature_engineering.feature_stats import FeatureStats
+
+
+def test_robust_scaler_matches_full_fit():
+    X = np.random.RandomState(1).exponential(size=(101, 4))
+    fields = list(range(X.shape[1]))
+    for quantile_range in [(25., 75.), (10., 90.), (30., 70.), (5., 60.)]:
+        scaler = FeatureStats().fit_scaler(RobustScaler(quantile_range=quantile_range), X, fields)
+        expected = RobustScaler(quantile_range=quantile_range).fit(X)
+        assert np.allclose(scaler.center_, expected.center_)
+        assert np.allclose(scaler.scale_, expected.scale_)
+
+
+if __name__ == '__main__':
+    test_robust_scaler_matches_full_fit()
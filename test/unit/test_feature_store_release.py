@@ -0,0 +1,45 @@
+import os
+import sys
+import numpy as np
+sys.path.append(os.getcwd())
+
+from automlToolkit.bandits.second_layer_bandit import SecondLayerBandit
+from automlToolkit.components.feature_engineering.feature_store import FeatureStore
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.components.metrics.metric import get_metric
+from automlToolkit.components.utils.constants import NUMERICAL, CLASSIFICATION
+
+
+def get_node(seed):
+    rng = np.random.RandomState(seed)
+    return DataNode([rng.rand(100, 5), rng.randint(0, 2, 100)], [NUMERICAL] * 5, CLASSIFICATION)
+
+
+def test_rebuilt_optimizer_releases_global_nodes():
+    feature_store = FeatureStore()
+    bandit = SecondLayerBandit(CLASSIFICATION, 'random_forest', get_node(0), metric=get_metric('acc'),
+                               output_dir='/tmp', feature_store=feature_store)
+    global_nodes = [get_node(1), get_node(2)]
+    bandit.sync_global_incumbents(global_nodes)
+    assert len(feature_store) == 2
+    # Syncing again swaps the references instead of adding new ones.
+    bandit.sync_global_incumbents(global_nodes[:1])
+    assert len(feature_store) == 1
+
+    bandit.prepare_optimizer('fe')
+    assert len(feature_store) == 0
+    assert bandit.optimizer['fe'].global_datanodes == []
+
+
+def test_feature_store_per_bandit():
+    bandit1 = SecondLayerBandit(CLASSIFICATION, 'random_forest', get_node(0), metric=get_metric('acc'),
+                                output_dir='/tmp')
+    bandit2 = SecondLayerBandit(CLASSIFICATION, 'random_forest', get_node(0), metric=get_metric('acc'),
+                                output_dir='/tmp')
+    bandit1.sync_global_incumbents([get_node(1)])
+    assert len(bandit1.feature_store) == 1 and len(bandit2.feature_store) == 0
+
+
+if __name__ == '__main__':
+    test_rebuilt_optimizer_releases_global_nodes()
+    test_feature_store_per_bandit()
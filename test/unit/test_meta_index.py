@@ -0,0 +1,84 @@
+import os
+import sys
+import shutil
+import tempfile
+sys.path.append(os.getcwd())
+
+import pytest
+
+from automlToolkit.components.meta_learning import meta_index
+from automlToolkit.components.meta_learning.meta_index import MetaIndex, META_RESOURCE_DIR, INDEX_FILE
+from automlToolkit.components.utils.constants import BINARY_CLS
+
+TASK_NAME = 'accuracy_binary.classification_dense'
+
+
+def get_task_dir():
+    # A copy of a scenario without configurations.csv, as the ones in meta_resource.
+    task_dir = os.path.join(tempfile.mkdtemp(), TASK_NAME)
+    os.makedirs(task_dir)
+    for name in ['feature_values.arff', 'algorithm_runs.arff']:
+        shutil.copy(os.path.join(META_RESOURCE_DIR, TASK_NAME, name), task_dir)
+    return task_dir
+
+
+def test_index_in_cache_dir(monkeypatch):
+    cache_root = tempfile.mkdtemp()
+    monkeypatch.setenv('XDG_CACHE_HOME', cache_root)
+    task_dir = get_task_dir()
+    index = MetaIndex(task_dir)
+    # The scenario directory is left untouched, as it may be installed read-only.
+    assert not os.path.exists(os.path.join(task_dir, INDEX_FILE))
+    assert len(os.listdir(os.path.join(cache_root, 'automlToolkit'))) == 1
+
+    metafeatures = dict(zip(index.feature_names, index.features[0] * index.feature_scale + index.feature_min))
+    assert len(index.suggest_algorithms(metafeatures, 3)) == 3
+    # Without configurations.csv, no configuration is suggested.
+    assert index.suggest_configs(metafeatures, 3) == []
+
+
+def test_configs_with_configurations_csv(monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', tempfile.mkdtemp())
+    task_dir = get_task_dir()
+    index = MetaIndex(task_dir)
+    algorithms = sorted(set(index.ranked_algorithms.ravel()) - {''})
+    with open(os.path.join(task_dir, 'configurations.csv'), 'w') as f:
+        f.write('idx,classifier:__choice__,classifier:random_forest:n_estimators,classifier:random_forest:bootstrap\n')
+        for i, algorithm in enumerate(algorithms):
+            f.write('%s,random_forest,%d,\n' % (algorithm, 100 + i))
+
+    # The index is rebuilt once configurations.csv is newer.
+    index = MetaIndex(task_dir)
+    metafeatures = dict(zip(index.feature_names, index.features[0] * index.feature_scale + index.feature_min))
+    configs = index.suggest_configs(metafeatures, 3)
+    assert len(configs) == 3
+    # The empty cells are inactive hyperparameters.
+    assert all(set(config.keys()) == {'classifier:__choice__', 'classifier:random_forest:n_estimators'}
+               for config in configs)
+
+
+def test_shipped_index_is_used(monkeypatch):
+    cache_root = tempfile.mkdtemp()
+    monkeypatch.setenv('XDG_CACHE_HOME', cache_root)
+    task_dir = get_task_dir()
+    # Built at packaging time.
+    MetaIndex(task_dir, index_path=os.path.join(task_dir, INDEX_FILE))
+    MetaIndex(task_dir)
+    assert not os.path.exists(os.path.join(cache_root, 'automlToolkit')) or \
+        len(os.listdir(os.path.join(cache_root, 'automlToolkit'))) == 0
+
+
+def test_no_metafeatures_without_configurations(monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', tempfile.mkdtemp())
+    index = MetaIndex(get_task_dir())
+    monkeypatch.setattr(meta_index, 'get_meta_index', lambda *args: index)
+
+    def _calculate_all_metafeatures(*args):
+        raise AssertionError('The meta-features are computed!')
+
+    monkeypatch.setattr(meta_index, 'calculate_all_metafeatures', _calculate_all_metafeatures)
+    assert meta_index.get_meta_configs(None, None, BINARY_CLS) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
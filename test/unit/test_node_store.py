@@ -0,0 +1,42 @@
+import os
+import sys
+import numpy as np
+sys.path.append(os.getcwd())
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.components.feature_engineering.node_store import NodeStore, get_node_nbytes
+from automlToolkit.components.utils.constants import NUMERICAL, CLASSIFICATION
+
+
+def get_node(seed):
+    rng = np.random.RandomState(seed)
+    return DataNode([rng.rand(1000, 10), rng.randint(0, 2, 1000)], [NUMERICAL] * 10, CLASSIFICATION)
+
+
+def test_spill_accounting():
+    node1, node2 = get_node(1), get_node(2)
+    X_nbytes, node_nbytes = node1.data[0].nbytes, get_node_nbytes(node1)
+    # Room for one node only.
+    store = NodeStore(memory_budget=1.5 * node_nbytes / 1024 ** 2)
+    try:
+        store.add(node1)
+        store.add(node2)
+        assert store.is_spilled(node1) and not store.is_spilled(node2)
+        # The labels of the spilled node stay in memory.
+        assert store.resident_bytes == 2 * node_nbytes - X_nbytes
+
+        X = np.array(node1.data[0])
+        store.load(node1)
+        assert not store.is_spilled(node1)
+        assert np.array_equal(node1.data[0], X)
+        assert store.resident_bytes == 2 * node_nbytes - X_nbytes
+
+        store.release(node1)
+        store.release(node2)
+        assert store.resident_bytes == 0
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    test_spill_accounting()
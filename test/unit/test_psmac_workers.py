@@ -0,0 +1,37 @@
+import os
+import sys
+import gc
+sys.path.append(os.getcwd())
+
+from ConfigSpace import ConfigurationSpace
+from ConfigSpace.hyperparameters import UniformFloatHyperparameter
+
+from automlToolkit.components.hpo_optimizer import psmac_optimizer
+from automlToolkit.components.hpo_optimizer.psmac_optimizer import PSMACOptimizer
+
+
+def _idle_worker(worker_id, scenario_dict, evaluator, seed, task_queue, inbox, result_queue, n_parallel=1):
+    while task_queue.get() is not None:
+        result_queue.put((worker_id, list(), None))
+
+
+def test_workers_stop_with_optimizer():
+    _worker = psmac_optimizer._worker
+    psmac_optimizer._worker = _idle_worker
+    try:
+        cs = ConfigurationSpace()
+        cs.add_hyperparameter(UniformFloatHyperparameter('x', 0., 1.))
+        optimizer = PSMACOptimizer(None, cs, n_jobs=2, output_dir='/tmp')
+        optimizer._run_trials(2)
+        workers = list(optimizer.workers)
+        assert all(worker.is_alive() for worker in workers)
+        # The bandits only call iterate, the workers stop once the optimizer is freed.
+        del optimizer
+        gc.collect()
+        assert not any(worker.is_alive() for worker in workers)
+    finally:
+        psmac_optimizer._worker = _worker
+
+
+if __name__ == '__main__':
+    test_workers_stop_with_optimizer()
@@ -0,0 +1,48 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import numpy as np
+sys.path.append(os.getcwd())
+
+import pytest
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.components.meta_learning import run_archive
+from automlToolkit.components.meta_learning.run_archive import RunArchive
+from automlToolkit.components.utils.constants import NUMERICAL, CLASSIFICATION
+
+
+def get_node(seed):
+    rng = np.random.RandomState(seed)
+    return DataNode([rng.rand(100, 5), rng.randint(0, 2, 100)], [NUMERICAL] * 5, CLASSIFICATION)
+
+
+def test_connections_are_closed(monkeypatch):
+    connections = list()
+    connect = sqlite3.connect
+
+    def _connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(run_archive.sqlite3, 'connect', _connect)
+    archive = RunArchive(tempfile.mkdtemp())
+    records = {'random_forest': {'score': 0.9, 'fe_cost': 1., 'hpo_cost': 1.,
+                                 'fe_pipelines': [(0.9, [{'id': 'scaler', 'type': 5, 'config': {}}], 'scaler')],
+                                 'hpo_configs': [(0.9, {'n_estimators': 100})]}}
+    archive.add_run(get_node(1), CLASSIFICATION, 'acc', records)
+    runs = archive.query(get_node(1), CLASSIFICATION, 'acc')
+    assert len(runs) == 1
+    assert archive.get_hpo_configs(runs, 'random_forest') == [{'n_estimators': 100}]
+    assert len(archive.get_fe_pipelines(runs, 'random_forest')) == 1
+
+    assert len(connections) == 5
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
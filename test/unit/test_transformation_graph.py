@@ -0,0 +1,123 @@
+import os
+import sys
+import numpy as np
+sys.path.append(os.getcwd())
+
+import pytest
+
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode, TransformationGraph
+from automlToolkit.components.fe_optimizers.base_optimizer import Optimizer
+from automlToolkit.components.utils.constants import NUMERICAL, CLASSIFICATION
+
+
+class DummyTransformer(object):
+    target_fields = None
+
+
+class DummyOptimizer(Optimizer):
+    def optimize(self):
+        pass
+
+    def iterate(self):
+        pass
+
+
+def get_node():
+    return DataNode([np.zeros((4, 2)), np.zeros(4)], [NUMERICAL] * 2, CLASSIFICATION)
+
+
+def get_graph(n_nodes):
+    graph = TransformationGraph()
+    nodes = [get_node() for _ in range(n_nodes)]
+    for node in nodes:
+        graph.add_node(node)
+    return graph, nodes
+
+
+def check_order(graph):
+    for edge in graph.edges.values():
+        assert graph.ranks[edge.input_id] < graph.ranks[edge.output_id]
+
+
+def test_reorder():
+    # The edges are added against the insertion order of the nodes.
+    graph, nodes = get_graph(4)
+    graph.add_trans_in_graph(nodes[3], nodes[1], DummyTransformer())
+    graph.add_trans_in_graph(nodes[2], nodes[3], DummyTransformer())
+    graph.add_trans_in_graph(nodes[1], nodes[0], DummyTransformer())
+    check_order(graph)
+    assert graph.topological_sort() == [2, 3, 1, 0]
+    with pytest.raises(ValueError):
+        graph.add_trans_in_graph(nodes[0], nodes[2], DummyTransformer())
+
+    # Random DAGs, whose edges follow a hidden order.
+    rng = np.random.RandomState(1)
+    for _ in range(20):
+        graph, nodes = get_graph(15)
+        order = rng.permutation(15)
+        edges = [(order[i], order[j]) for i in range(15) for j in range(i + 1, 15) if rng.rand() < 0.2]
+        for idx in rng.permutation(len(edges)):
+            graph.add_trans_in_graph(nodes[edges[idx][0]], nodes[edges[idx][1]], DummyTransformer())
+            check_order(graph)
+
+
+def test_get_path():
+    # 0 -> 1 -> 2, 0 -> 3, (2, 3) -> 4.
+    graph, nodes = get_graph(5)
+    graph.add_trans_in_graph(nodes[0], nodes[1], DummyTransformer())
+    graph.add_trans_in_graph(nodes[1], nodes[2], DummyTransformer())
+    graph.add_trans_in_graph(nodes[0], nodes[3], DummyTransformer())
+    graph.add_trans_in_graph([nodes[2], nodes[3]], nodes[4], DummyTransformer())
+    assert graph.get_path_nodes(nodes[2]) == [0, 1, 2]
+    path = graph.get_path_nodes(nodes[4])
+    assert sorted(path) == [0, 1, 2, 3, 4] and path[0] == 0 and path[-1] == 4
+    assert path.index(1) < path.index(2)
+
+    # A new parent of an ancestor reaches the cached paths of the descendants.
+    new_node = get_node()
+    graph.add_node(new_node)
+    graph.add_trans_in_graph(new_node, nodes[1], DummyTransformer())
+    assert sorted(graph.get_path_nodes(nodes[2])) == [0, 1, 2, new_node.node_id]
+    assert new_node.node_id in graph.get_path_nodes(nodes[4])
+    assert graph.get_path_nodes(get_node()) == []
+
+
+def test_compact():
+    # 0 -> 1 -> 2, 0 -> 3 -> 4.
+    graph, nodes = get_graph(5)
+    for input_id, output_id in [(0, 1), (1, 2), (0, 3), (3, 4)]:
+        graph.add_trans_in_graph(nodes[input_id], nodes[output_id], DummyTransformer())
+    graph.pin(nodes[1])
+    assert graph.compact([nodes[4]]) == 1
+    assert sorted(graph.nodes.keys()) == [0, 1, 3, 4]
+    assert sorted((edge.input_id, edge.output_id) for edge in graph.edges.values()) == [(0, 1), (0, 3), (3, 4)]
+    assert graph.adjacent_list[1] == []
+    assert graph.get_path_nodes(nodes[4]) == [0, 3, 4]
+
+    # A dropped node cannot take new edges.
+    with pytest.raises(ValueError):
+        graph.add_trans_in_graph(nodes[2], get_node(), DummyTransformer())
+
+
+def test_nodes_from_outside_the_graph():
+    optimizer = DummyOptimizer('test', CLASSIFICATION, get_node())
+    graph = optimizer.graph
+    # E.g., a global node acquired from the feature store.
+    global_node, output_node = get_node(), get_node()
+    graph.add_trans_in_graph(global_node, output_node, DummyTransformer())
+    assert global_node.node_id in graph.nodes and output_node.node_id in graph.nodes
+    assert graph.get_path_nodes(output_node) == [global_node.node_id, output_node.node_id]
+
+    # Its descendants cannot be replayed from the root node.
+    assert optimizer.get_pipeline_spec(output_node) is None
+    with pytest.raises(ValueError):
+        optimizer.apply(get_node(), output_node)
+    with pytest.raises(ValueError):
+        optimizer.apply(get_node(), get_node())
+
+
+if __name__ == '__main__':
+    test_reorder()
+    test_get_path()
+    test_compact()
+    test_nodes_from_outside_the_graph()
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.getcwd())
+
+from automlToolkit.components.utils.constants import FEATURE_TYPES
+from automlToolkit.components.utils.utils import dump_manifest, load_manifest
+from automlToolkit.components.feature_engineering.transformations import manifest_path, component_directories
+
+
+def test_shipped_manifest_is_fresh():
+    assert load_manifest(manifest_path, FEATURE_TYPES, component_directories) is not None
+
+
+def test_changed_module_invalidates_manifest():
+    with tempfile.TemporaryDirectory() as directory:
+        module_path = os.path.join(directory, 'my_transformer.py')
+        with open(module_path, 'w') as f:
+            f.write('TYPE = 1\n')
+        path = os.path.join(directory, 'manifest.json')
+        dump_manifest(path, dict(), FEATURE_TYPES, [directory])
+        assert load_manifest(path, FEATURE_TYPES, [directory]) is not None
+
+        # The same module names, but a different source.
+        with open(module_path, 'w') as f:
+            f.write('TYPE = 2\n')
+        assert load_manifest(path, FEATURE_TYPES, [directory]) is None
+
+
+if __name__ == '__main__':
+    test_shipped_manifest_is_fresh()
+    test_changed_module_invalidates_manifest()
@@ -0,0 +1,31 @@
+import os
+import sys
+import json
+sys.path.append(os.getcwd())
+
+from automlToolkit.components.feature_engineering.transformations import _transformers
+from automlToolkit.components.fe_optimizers.base_optimizer import get_transformer_spec, build_transformer
+
+
+def test_spec_round_trip():
+    for transformer_id, transformer_class in _transformers.items():
+        spec = get_transformer_spec(transformer_class())
+        assert spec['id'] == transformer_id
+        # The specs are archived as json.
+        spec = json.loads(json.dumps(spec))
+        transformer = build_transformer(spec)
+        assert type(transformer) is transformer_class
+        assert get_transformer_spec(transformer) == spec
+
+
+def test_spec_keeps_arguments():
+    transformer = _transformers['imputer'](param='median')
+    assert get_transformer_spec(build_transformer(get_transformer_spec(transformer)))['config'] == {'param': 'median'}
+    # The normalizer takes no arguments, the ones of an old spec are dropped.
+    spec = {'id': 'normalizer', 'type': _transformers['normalizer']().type, 'config': {'param': {'norm': 'l2'}}}
+    assert type(build_transformer(spec)) is _transformers['normalizer']
+
+
+if __name__ == '__main__':
+    test_spec_round_trip()
+    test_spec_keeps_arguments()
@@ -0,0 +1,40 @@
+import os
+import sys
+import numpy as np
+sys.path.append(os.getcwd())
+
+from automlToolkit.components.evaluators.prediction_store import get_trial_key
+from automlToolkit.components.feature_engineering.transformation_graph import DataNode
+from automlToolkit.components.utils.constants import NUMERICAL, CLASSIFICATION
+
+
+def get_node(seed):
+    rng = np.random.RandomState(seed)
+    return DataNode([rng.rand(100, 5), rng.randint(0, 2, 100)], [NUMERICAL] * 5, CLASSIFICATION)
+
+
+def test_data_is_hashed_once():
+    node = get_node(1)
+    config = {'n_estimators': 100}
+    key = get_trial_key(node, config)
+    assert node.feature_key is not None
+
+    # The later keys reuse the fingerprint kept on the node, instead of hashing the data again.
+    node.data[0][:] = 0.
+    assert get_trial_key(node, config) == key
+    assert get_trial_key(node, {'n_estimators': 200}) != key
+
+
+def test_key_follows_content():
+    node, config = get_node(1), {'n_estimators': 100}
+    key = get_trial_key(node, config)
+    assert get_trial_key(node.copy_(), config) == key
+    assert get_trial_key(get_node(2), config) != key
+    # The fingerprint is reset with the values of the node.
+    node.set_values(get_node(2))
+    assert get_trial_key(node, config) == get_trial_key(get_node(2), config)
+
+
+if __name__ == '__main__':
+    test_data_is_hashed_once()
+    test_key_follows_content()